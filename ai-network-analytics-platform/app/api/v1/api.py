@@ -1,112 +1,341 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks
-from typing import Dict, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Response
+from typing import Dict, List, Optional, Union
 import asyncio
 from datetime import datetime
 
-from app.ml.models import analyze_network_data, train_sample_models
-from app.core.database import get_db
+from app.ml.executor import inference_executor
+from app.ml.inference import analyze_network_batch
+from app.ml.batching import inference_scheduler
+from app.ml.registry import ModelNotReady, model_registry
+from app.ml.training import training_jobs
+from app.ml.warmup import model_warmup
+from app.ingest.pipeline import IngestPayloadTooLarge, IngestQueueFull, ingest_pipeline
+from app.core.database import SessionLocal, get_async_db
+from app.storage.cache import ALL_DEVICES, result_cache
+from app.storage.repository import query_anomalies, query_anomalies_async
+from app.storage.rollups import ANOMALY_METRIC, telemetry_rollups
 from app.core.config import settings
 
 api_router = APIRouter()
 
+# Observed metrics returned by the predictions endpoint at a resolution
+PERFORMANCE_METRICS = ["latency_p95", "throughput"]
+
 
 @api_router.post("/analytics/analyze")
 async def analyze_network_telemetry(
     network_data: Dict,
 ) -> Dict:
     """Analyze network telemetry data using ML models."""
+    await model_warmup.wait()
     try:
-        result = analyze_network_data(network_data)
+        if settings.INFERENCE_BATCHING_ENABLED:
+            return await inference_scheduler.submit(network_data)
+
+        from app.ml.models import analyze_network_data
+
+        result = await inference_executor.run(analyze_network_data, network_data)
         return result
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
 
 
+@api_router.post("/analytics/analyze/batch")
+async def analyze_network_telemetry_batch(
+    network_data: Union[List[Dict], Dict[str, List]],
+) -> Dict:
+    """Analyze a batch of telemetry records (row list or columnar) in one pass.
+
+    Returns 400 for malformed records and 503 while no model is trained.
+    """
+    await model_warmup.wait()
+    try:
+        results = await inference_executor.run(analyze_network_batch, network_data)
+        return {"results": results, "count": len(results)}
+
+    except ModelNotReady as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch analysis failed: {str(e)}")
+
+
+@api_router.get("/analytics/scheduler/stats")
+async def get_scheduler_stats() -> Dict:
+    """Get micro-batching scheduler metrics."""
+    return inference_scheduler.stats()
+
+
+async def _rollup_series(
+    metrics: List[str],
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    resolution: str,
+    device_id: Optional[str],
+) -> Dict:
+    if not settings.ROLLUPS_ENABLED:
+        raise HTTPException(status_code=400, detail="Rollups are disabled")
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, telemetry_rollups.series, metrics, start_time, end_time, resolution, device_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @api_router.get("/analytics/anomalies")
 async def get_anomalies(
+    response: Response,
     start_time: Optional[datetime] = None,
     end_time: Optional[datetime] = None,
-    limit: int = 100
+    device_id: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    resolution: Optional[str] = None,
+    db=Depends(get_async_db)
 ) -> List[Dict]:
-    """Get detected network anomalies."""
-    # Implementation would query database for anomalies
-    return [
-        {
-            "id": "anomaly_001",
-            "timestamp": datetime.utcnow().isoformat(),
-            "device_id": "router_01",
-            "anomaly_score": 0.85,
-            "description": "Unusual packet rate detected",
-            "severity": "high"
-        }
-    ]
+    """Get detected network anomalies, newest first.
+
+    When more results exist, the ``X-Next-Cursor`` response header carries
+    the cursor for the next page.
+
+    With ``resolution`` (a bucket width such as ``1h``, or ``auto``) the
+    anomalies are instead counted per time bucket, oldest first, with the
+    min/max/mean/p95 of their scores, read from the coarsest rollup tier
+    that satisfies the range and resolution (``X-Rollup-Tier`` header).
+    """
+    if resolution is not None:
+        series = await _rollup_series([ANOMALY_METRIC], start_time, end_time, resolution, device_id)
+        response.headers["X-Rollup-Tier"] = series["tier"]
+        return series["buckets"]
+
+    async def query() -> Dict:
+        if db is not None:
+            anomalies, next_cursor = await query_anomalies_async(
+                db, start_time=start_time, end_time=end_time,
+                device_id=device_id, limit=limit, cursor=cursor
+            )
+        else:
+            def query_sync():
+                with SessionLocal() as sync_db:
+                    return query_anomalies(
+                        sync_db, start_time=start_time, end_time=end_time,
+                        device_id=device_id, limit=limit, cursor=cursor
+                    )
+
+            anomalies, next_cursor = await asyncio.get_running_loop().run_in_executor(None, query_sync)
+        return {"anomalies": anomalies, "next_cursor": next_cursor}
+
+    version = model_registry.active.version if model_registry.active else None
+    key = f"anomalies:{version}:{start_time}:{end_time}:{limit}:{cursor}"
+    try:
+        page = await result_cache.get_or_compute_async(device_id or ALL_DEVICES, key, query)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["anomalies"]
 
 
 @api_router.get("/analytics/predictions")
 async def get_performance_predictions(
+    response: Response,
     device_id: Optional[str] = None,
-    hours_ahead: int = 1
+    hours_ahead: int = 1,
+    limit: int = 100,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    resolution: Optional[str] = None
 ) -> List[Dict]:
-    """Get network performance predictions."""
-    # Implementation would use ML models for prediction
-    return [
-        {
-            "device_id": device_id or "router_01",
-            "predicted_latency": 45.2,
-            "predicted_throughput": 550.8,
-            "confidence": 0.87,
-            "timestamp": datetime.utcnow().isoformat()
-        }
-    ]
+    """Forecast device latency and throughput ``hours_ahead`` hours from now.
+
+    Forecasts come from each device's rolling telemetry features; without
+    ``device_id`` the ``limit`` most recently seen devices are forecast.
+
+    With ``resolution`` the observed latency and throughput between
+    ``start_time`` and ``end_time`` are returned instead, per time bucket,
+    from the coarsest rollup tier that satisfies the range and resolution.
+    """
+    if resolution is not None:
+        series = await _rollup_series(PERFORMANCE_METRICS, start_time, end_time, resolution, device_id)
+        response.headers["X-Rollup-Tier"] = series["tier"]
+        return series["buckets"]
+
+    max_hours = max(settings.FORECAST_HORIZONS_HOURS)
+    if not 1 <= hours_ahead <= max_hours:
+        raise HTTPException(status_code=400, detail=f"hours_ahead must be between 1 and {max_hours}")
+
+    await model_warmup.wait()
+    from app.ml.models import forecast_performance
+
+    key = f"predictions:{model_registry.active.version}:{hours_ahead}:{limit}"
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, result_cache.get_or_compute, device_id or ALL_DEVICES, key,
+            lambda: forecast_performance(device_id, hours_ahead, limit)
+        )
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+@api_router.get("/analytics/features/stats")
+async def get_feature_store_stats() -> Dict:
+    """Get size and configuration of the per-device feature store."""
+    from app.ml.feature_store import device_feature_store
+
+    return device_feature_store.stats()
+
 
+@api_router.get("/analytics/rollups/stats")
+async def get_rollup_stats() -> Dict:
+    """Get buffer and flush counters of the rollup tiers."""
+    return telemetry_rollups.stats()
 
-@api_router.post("/models/train")
-async def train_models(background_tasks: BackgroundTasks):
-    """Trigger training of ML models."""
-    background_tasks.add_task(train_sample_models)
-    return {"message": "Model training started", "status": "in_progress"}
+
+@api_router.get("/analytics/cache/stats")
+async def get_result_cache_stats() -> Dict:
+    """Get result cache hit/miss counters."""
+    return result_cache.stats()
+
+
+@api_router.post("/models/train", status_code=202)
+async def train_models() -> Dict:
+    """Start a model training job in a separate process."""
+    try:
+        job = training_jobs.submit()
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {"message": "Model training started", "status": job.status, "job_id": job.id}
+
+
+@api_router.get("/models/jobs")
+async def list_training_jobs() -> List[Dict]:
+    """List recent training jobs, newest first."""
+    return [job.to_dict() for job in training_jobs.list()]
+
+
+@api_router.get("/models/jobs/{job_id}")
+async def get_training_job(job_id: str) -> Dict:
+    """Get progress and timings of a training job."""
+    job = training_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job.to_dict()
+
+
+@api_router.post("/models/update")
+async def update_models_incrementally() -> Dict:
+    """Run an incremental model update on telemetry ingested since the last one.
+
+    Returns 409 while another update or a training job is running. A drift
+    refit is started as a training job, reported with status "started".
+    """
+    from app.ml.online import UpdateInProgress, model_updater
+
+    loop = asyncio.get_running_loop()
+    try:
+        summary = await loop.run_in_executor(None, model_updater.update, loop)
+    except UpdateInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if summary is None:
+        return {"message": "Not enough new telemetry for an update", "status": "skipped"}
+    if summary["mode"] == "refit":
+        return {"message": "Model refit started", "status": "started",
+                "job_id": summary["job_id"], "update": summary}
+
+    return {"message": "Models updated", "status": "completed", "update": summary}
 
 
 @api_router.get("/models/status")
 async def get_model_status() -> Dict:
     """Get status of ML models."""
-    return {
-        "anomaly_detector": {
-            "trained": True,
-            "last_updated": datetime.utcnow().isoformat(),
-            "accuracy": 0.94
-        },
-        "performance_predictor": {
-            "trained": True,
-            "last_updated": datetime.utcnow().isoformat(),
-            "accuracy": 0.89
+    def describe(model) -> Dict:
+        return {
+            "trained": model.is_trained,
+            "last_updated": model.last_updated.isoformat() if model.last_updated else None,
+            "training_duration_seconds": model.training_duration,
+            "metrics": model.metrics,
         }
+
+    bundle = model_registry.active
+    active = training_jobs.active_job
+    return {
+        "version": bundle.version if bundle else None,
+        "anomaly_detector": describe(bundle.anomaly_detector) if bundle else None,
+        "performance_predictor": describe(bundle.performance_predictor) if bundle else None,
+        "active_training_job": active.to_dict() if active else None,
+        "warmup": model_warmup.stats(),
     }
 
 
+@api_router.get("/models/versions")
+async def list_model_versions() -> List[Dict]:
+    """List stored model versions, newest first."""
+    return await asyncio.get_running_loop().run_in_executor(None, model_registry.list_versions)
+
+
+@api_router.post("/models/versions/{version}/activate")
+async def activate_model_version(version: str) -> Dict:
+    """Serve a stored model version."""
+    try:
+        bundle = await asyncio.get_running_loop().run_in_executor(None, model_registry.activate, version)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Activation failed: {str(e)}")
+
+    return {"message": "Model version activated", "version": bundle.version}
+
+
+@api_router.post("/models/rollback")
+async def rollback_model_version() -> Dict:
+    """Serve the previously active model version again."""
+    try:
+        bundle = await asyncio.get_running_loop().run_in_executor(None, model_registry.rollback)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Rollback failed: {str(e)}")
+
+    return {"message": "Rolled back model version", "version": bundle.version}
+
+
 @api_router.post("/telemetry/ingest")
 async def ingest_telemetry_data(
     telemetry_data: Dict,
-    background_tasks: BackgroundTasks
 ) -> Dict:
-    """Ingest network telemetry data for analysis."""
-    try:
-        # Process telemetry data in background
-        background_tasks.add_task(process_telemetry_data, telemetry_data)
-
-        return {
-            "message": "Telemetry data ingested successfully",
-            "timestamp": datetime.utcnow().isoformat(),
-            "data_points": len(telemetry_data)
-        }
+    """Ingest network telemetry data for analysis.
 
+    Accepts a single record, ``{"records": [...]}`` or a columnar payload.
+    Returns 503 when the ingest queue is full so collectors back off, and
+    413 for a payload with more than INGEST_MAX_PAYLOAD_ROWS rows.
+    """
+    try:
+        n_rows = ingest_pipeline.submit(telemetry_data)
+    except IngestPayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except IngestQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
 
+    return {
+        "message": "Telemetry data ingested successfully",
+        "timestamp": datetime.utcnow().isoformat(),
+        "data_points": n_rows,
+        "queue_depth": ingest_pipeline.queue_depth
+    }
+
 
-async def process_telemetry_data(telemetry_data: Dict) -> None:
-    """Process telemetry data in background."""
-    # Implementation would process and store telemetry data
-    # For now, just log the data
-    print(f"Processing telemetry data: {len(telemetry_data)} data points")
+@api_router.get("/telemetry/stats")
+async def get_ingest_stats() -> Dict:
+    """Get telemetry ingestion throughput and backpressure counters."""
+    return ingest_pipeline.stats()
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseSettings, validator
 import secrets
 
@@ -26,12 +26,78 @@ class Settings(BaseSettings):
 
     # Database Configuration
     DATABASE_URL: str = "sqlite:///./network_analytics.db"
+    DATABASE_ASYNC: bool = True  # asyncio engine (aiosqlite/asyncpg) for requests and ingest writes
+    DATABASE_POOL_SIZE: int = 10
+    DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_POOL_RECYCLE_SECONDS: int = 1800
     REDIS_URL: str = "redis://localhost:6379"
 
     # ML Configuration
     ML_MODEL_PATH: str = "./models"
+    MODEL_REGISTRY_KEEP_VERSIONS: int = 10
+    MODEL_LOAD_MMAP: bool = True  # memory-map model arrays so workers share pages
     TRAINING_DATA_PATH: str = "./data"
     MODEL_UPDATE_INTERVAL: int = 3600  # 1 hour
+    MODEL_UPDATE_MODE: str = "incremental"  # incremental, full or off
+    TRAINING_WINDOW_DAYS: int = 90
+    TRAINING_MAX_ROWS: int = 1000000
+    TRAINING_MIN_ROWS: int = 500
+    TRAINING_N_JOBS: int = -1  # cores per model while fitting, -1 for all
+    TRAINING_VALIDATION_FRACTION: float = 0.2
+
+    # Incremental Model Update Configuration
+    ONLINE_WINDOW_ROWS: int = 5000  # recent rows new trees are fitted on
+    ONLINE_RESERVOIR_ROWS: int = 20000  # uniform sample of all history for refits
+    ONLINE_TREES_PER_UPDATE: int = 10
+    ONLINE_DRIFT_THRESHOLD: float = 0.5  # feature mean shift, in std units, forcing a refit
+    ONLINE_MIN_NEW_ROWS: int = 256
+
+    # Device Feature Store Configuration (rolling per-device statistics for forecasting)
+    FEATURE_STORE_ENABLED: bool = True
+    FEATURE_STORE_WINDOWS: List[int] = [6, 30, 120]  # samples
+    FEATURE_STORE_EWMA_ALPHAS: List[float] = [0.3, 0.05]
+    FEATURE_STORE_MAX_DEVICES: int = 10000  # least recently seen devices are evicted beyond this
+    FORECAST_HORIZONS_HOURS: List[int] = [1, 2, 3, 6, 12, 24]  # horizons the forecaster is trained on
+    FORECAST_TRAINING_MAX_ROWS: int = 50000
+
+    # Telemetry Archive Configuration (columnar segments under TRAINING_DATA_PATH)
+    ARCHIVE_ENABLED: bool = True
+    ARCHIVE_SEGMENT_ROWS: int = 4096
+    ARCHIVE_SEGMENT_MAX_AGE: int = 300  # seconds
+
+    # Rollup Configuration (per-device and fleet-wide 1m/1h/1d aggregates for long-range queries)
+    ROLLUPS_ENABLED: bool = True
+    ROLLUP_RETENTION_DAYS: Dict[str, int] = {"1m": 7, "1h": 90, "1d": 0}  # per tier, 0 keeps forever
+    ROLLUP_SKETCH_ACCURACY: float = 0.01  # relative error of rolled-up percentiles
+    ROLLUP_FLUSH_ROWS: int = 500000  # buffered samples
+    ROLLUP_FLUSH_INTERVAL: float = 30.0  # seconds
+    ROLLUP_TARGET_POINTS: int = 500  # buckets per series with resolution=auto
+    ROLLUP_MAX_POINTS: int = 10000
+
+    # Inference Configuration
+    INFERENCE_EXECUTOR: str = "process"  # process, thread or inline
+    INFERENCE_WORKERS: int = 2
+    INFERENCE_ENGINE: str = "compiled"  # compiled (NumPy forest traversal) or sklearn
+    INFERENCE_COMPILED_MAX_ROWS: int = 1024  # larger batches use scikit-learn where it is loaded
+    PREDICTION_INTERVAL_COVERAGE: float = 0.9  # share of per-tree predictions inside the interval
+    INFERENCE_BATCHING_ENABLED: bool = True
+    INFERENCE_BATCH_MAX_SIZE: int = 64
+    INFERENCE_BATCH_MAX_WAIT_MS: float = 2.0
+
+    # Result Cache Configuration (dashboard reads, invalidated per device)
+    RESULT_CACHE_ENABLED: bool = True
+    RESULT_CACHE_TTL: float = 10.0  # seconds
+    RESULT_CACHE_MAX_ENTRIES: int = 10000  # in-process LRU tier
+    RESULT_CACHE_BACKEND: str = "none"  # shared tier: none, redis (REDIS_URL) or local
+
+    # Telemetry Ingestion Configuration
+    INGEST_QUEUE_MAXSIZE: int = 10000  # payloads
+    INGEST_QUEUE_MAX_ROWS: int = 1000000  # rows submitted but not yet flushed
+    INGEST_MAX_PAYLOAD_ROWS: int = 50000  # larger payloads are rejected with 413
+    INGEST_BATCH_SIZE: int = 1000  # rows per flush
+    INGEST_FLUSH_INTERVAL_MS: float = 500.0
+    INGEST_WORKERS: int = 2
 
     # Kafka Configuration
     KAFKA_BOOTSTRAP_SERVERS: str = "localhost:9092"
@@ -41,8 +107,32 @@ class Settings(BaseSettings):
         "anomaly.detection"
     ]
 
+    # Telemetry consumer (python -m app.ingest.consumer)
+    KAFKA_CONSUMER_GROUP: str = "network-analytics"
+    KAFKA_TELEMETRY_TOPIC: str = "network.telemetry"
+    KAFKA_ANOMALY_TOPIC: str = "anomaly.detection"
+    KAFKA_CONSUMER_BATCH_SIZE: int = 5000  # messages per poll, scored together
+    KAFKA_POLL_TIMEOUT_MS: float = 500.0
+    KAFKA_MODEL_REFRESH_SECONDS: float = 30.0  # how often to pick up a newly current model version
+
+    # Logging Configuration
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # json (python-json-logger) or text
+    LOG_QUEUE_ENABLED: bool = True  # write logs from a background thread
+    LOG_QUEUE_MAXSIZE: int = 10000  # records; further records are dropped
+    LOG_BATCH_SIZE: int = 256  # records written per flush
+    LOG_FLUSH_INTERVAL_MS: float = 1000.0
+    # Fraction of sub-WARNING records kept, by request path (access logs) or logger name prefix
+    LOG_SAMPLE_RATES: Dict[str, float] = {
+        "/api/v1/telemetry/ingest": 0.01,
+        "/api/v1/analytics/analyze": 0.01,
+        "/health": 0.0,
+        "/metrics": 0.0,
+    }
+
     # Monitoring Configuration
     PROMETHEUS_ENABLED: bool = True
+    PROMETHEUS_MULTIPROC_DIR: str = "./prometheus_multiproc"  # shared by worker processes; empty disables
     GRAFANA_URL: str = "http://localhost:3001"
 
     class Config:
@@ -1,30 +1,93 @@
 from sqlalchemy import create_engine, MetaData
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import logging
 
+from app.core.config import settings
+
 logger = logging.getLogger(__name__)
 
 # Database configuration
-SQLALCHEMY_DATABASE_URL = "sqlite:///./network_analytics.db"
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+# asyncio drivers for the synchronous drivers DATABASE_URL may name
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _engine_options(url: str, asyncio: bool = False) -> dict:
+    """Pooling and connection options for ``url``, for the asyncio engine if ``asyncio``."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        options = {"connect_args": {"check_same_thread": False}}
+        if parsed.database in (None, "", ":memory:"):
+            # Every connection would get its own empty in-memory database
+            return options
+        if asyncio:
+            # aiosqlite defaults to NullPool for file databases on older
+            # SQLAlchemy releases, which rejects the pool sizing below
+            options["poolclass"] = AsyncAdaptedQueuePool
+    else:
+        options = {}
+    return {
+        **options,
+        "pool_size": settings.DATABASE_POOL_SIZE,
+        "max_overflow": settings.DATABASE_MAX_OVERFLOW,
+        "pool_pre_ping": settings.DATABASE_POOL_PRE_PING,
+        "pool_recycle": settings.DATABASE_POOL_RECYCLE_SECONDS,
+    }
+
+
+def async_database_url(url: str) -> str:
+    """``url`` with its driver replaced by the asyncio driver of its backend."""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No asyncio driver known for {parsed.get_backend_name()} databases")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **_engine_options(SQLALCHEMY_DATABASE_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Request handlers and ingest sinks use the asyncio engine when enabled;
+# training and other thread-bound code keep the synchronous one
+async_engine = None
+AsyncSessionLocal = None
+if settings.DATABASE_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    async_engine = create_async_engine(
+        async_database_url(SQLALCHEMY_DATABASE_URL), **_engine_options(SQLALCHEMY_DATABASE_URL, asyncio=True)
+    )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 async def init_db():
     """Initialize database on startup."""
     try:
+        # Register table models before creating them
+        from app.storage import tables  # noqa: F401
+
         # Create tables
-        Base.metadata.create_all(bind=engine)
+        if async_engine is not None:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+        else:
+            Base.metadata.create_all(bind=engine)
         logger.info("Database initialized successfully")
     except Exception as e:
         logger.error(f"Database initialization failed: {e}")
         raise
 
+async def close_db():
+    """Close pooled connections on shutdown."""
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
 def get_db():
     """Get database session."""
     db = SessionLocal()
@@ -32,3 +95,15 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Get an asyncio database session scoped to the request.
+
+    Yields None when DATABASE_ASYNC is off; handlers then fall back to
+    synchronous sessions on a worker thread.
+    """
+    if AsyncSessionLocal is None:
+        yield None
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
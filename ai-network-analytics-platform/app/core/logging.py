@@ -1,23 +1,238 @@
+import atexit
 import logging
+import queue
 import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
 from pathlib import Path
+from typing import Dict, Optional
+
+from app.core.config import settings
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_configured = False
+_listener: Optional["BatchingQueueListener"] = None
+
+
+class PathSampler(logging.Filter):
+    """Keeps a fraction of the records below WARNING for configured paths.
+
+    The path of a uvicorn access log record is its request path; for any
+    other record it is the logger name. ``rates`` maps path prefixes to
+    the fraction kept (longest prefix wins); every n-th record is kept, so
+    a rate of 0.01 logs one request in a hundred.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self._rules = sorted(rates.items(), key=lambda rule: len(rule[0]), reverse=True)
+        self._seen: Dict[str, int] = {}
+        self.sampled_out = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self._rules:
+            return True
+        path = record.name
+        if path == "uvicorn.access" and isinstance(record.args, tuple) and len(record.args) >= 3:
+            path = str(record.args[2])
+        for prefix, rate in self._rules:
+            if path.startswith(prefix):
+                if rate >= 1.0:
+                    return True
+                seen = self._seen.get(prefix, 0)
+                self._seen[prefix] = seen + 1
+                if rate > 0.0 and seen % round(1.0 / rate) == 0:
+                    return True
+                self.sampled_out += 1
+                return False
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread without ever blocking.
+
+    Only the message arguments and traceback are rendered in the calling
+    thread; the formatter runs on the listener thread. The queue is a
+    lock-free ``SimpleQueue``; records arriving while ``max_size`` records
+    are waiting are dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, max_size: int = 10000):
+        super().__init__(log_queue)
+        self.max_size = max(1, max_size)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Keep the record's fields (for JSON output) but drop what may not
+        # survive being read later from another thread. The record is not
+        # copied: root handlers run after every other handler has seen it.
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.queue.qsize() >= self.max_size:
+            self.dropped += 1
+        else:
+            self.queue.put_nowait(record)
+
+
+class BatchFlushStreamHandler(logging.StreamHandler):
+    """Stream handler that leaves flushing to the listener, once per batch."""
+
+    def flush(self) -> None:
+        pass
+
+    def flush_batch(self) -> None:
+        with self.lock:
+            if self.stream and hasattr(self.stream, "flush"):
+                self.stream.flush()
+
+
+class BatchFlushFileHandler(logging.FileHandler, BatchFlushStreamHandler):
+    """File handler that leaves flushing to the listener, once per batch."""
+
+
+class BatchingQueueListener(QueueListener):
+    """Writes queued records on its own thread, flushing handlers per batch.
+
+    Handlers are flushed once ``batch_size`` records were written or
+    ``flush_interval`` seconds after the oldest unflushed record, instead
+    of after every record.
+    """
+
+    def __init__(self, log_queue: queue.SimpleQueue, *handlers: logging.Handler,
+                 batch_size: int = 256, flush_interval: float = 1.0):
+        super().__init__(log_queue, *handlers, respect_handler_level=True)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.0, flush_interval)
+
+    def _monitor(self) -> None:
+        q = self.queue
+        pending = 0
+        flush_at = 0.0
+        while True:
+            timeout = max(0.0, flush_at - time.monotonic()) if pending else None
+            try:
+                record = q.get(timeout=timeout)
+            except queue.Empty:
+                self._flush()
+                pending = 0
+                continue
+
+            if record is self._sentinel:
+                self._flush()
+                return
+            self.handle(record)
+            if not pending:
+                flush_at = time.monotonic() + self.flush_interval
+            pending += 1
+            if pending >= self.batch_size:
+                self._flush()
+                pending = 0
+
+    def _flush(self) -> None:
+        for handler in self.handlers:
+            if isinstance(handler, BatchFlushStreamHandler):
+                handler.flush_batch()
+            else:
+                handler.flush()
+
+
+def _formatter() -> logging.Formatter:
+    if settings.LOG_FORMAT == "json":
+        try:
+            try:
+                from pythonjsonlogger.core import RESERVED_ATTRS
+                from pythonjsonlogger.json import JsonFormatter
+            except ImportError:
+                from pythonjsonlogger.jsonlogger import RESERVED_ATTRS, JsonFormatter
+            return JsonFormatter(
+                "%(asctime)s %(name)s %(levelname)s %(message)s",
+                rename_fields={"asctime": "timestamp", "levelname": "level", "name": "logger"},
+                # uvicorn repeats its messages with terminal colour codes
+                reserved_attrs=list(RESERVED_ATTRS) + ["color_message"],
+            )
+        except ImportError:
+            logging.getLogger(__name__).warning("python-json-logger is not installed; logging plain text")
+    return logging.Formatter(TEXT_FORMAT)
+
 
 def setup_logging():
-    """Setup application logging."""
+    """Setup application logging.
+
+    With LOG_QUEUE_ENABLED, loggers only enqueue records and a listener
+    thread formats and writes them in batches, so logging never blocks on
+    I/O. Safe to call more than once; only the first call configures.
+    """
+    global _configured, _listener
+    if _configured:
+        return
+    _configured = True
+
     # Create logs directory
     logs_dir = Path("logs")
     logs_dir.mkdir(exist_ok=True)
 
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(logs_dir / "app.log"),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    formatter = _formatter()
+    sampler = PathSampler(settings.LOG_SAMPLE_RATES)
+    if settings.LOG_QUEUE_ENABLED:
+        handlers = [BatchFlushFileHandler(logs_dir / "app.log"), BatchFlushStreamHandler(sys.stdout)]
+    else:
+        handlers = [logging.FileHandler(logs_dir / "app.log"), logging.StreamHandler(sys.stdout)]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    if settings.LOG_QUEUE_ENABLED:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        front = NonBlockingQueueHandler(log_queue, settings.LOG_QUEUE_MAXSIZE)
+        front.addFilter(sampler)
+        _listener = BatchingQueueListener(
+            log_queue, *handlers,
+            batch_size=settings.LOG_BATCH_SIZE,
+            flush_interval=settings.LOG_FLUSH_INTERVAL_MS / 1000.0,
+        )
+        _listener.start()
+        atexit.register(stop_logging)
+        root_handlers = [front]
+    else:
+        for handler in handlers:
+            handler.addFilter(sampler)
+        root_handlers = handlers
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    for handler in root_handlers:
+        root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL)
+
+    # Route uvicorn's own loggers through the same handlers and sampling
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
 
     # Set specific log levels for noisy libraries
-    logging.getLogger("uvicorn.access").setLevel(logging.WARNING)
     logging.getLogger("sqlalchemy").setLevel(logging.WARNING)
+
+
+def stop_logging() -> None:
+    """Write out queued records and log synchronously from then on."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is None:
+        return
+    listener.stop()
+
+    root = logging.getLogger()
+    for front in [h for h in root.handlers if isinstance(h, NonBlockingQueueHandler)]:
+        root.removeHandler(front)
+        for handler in listener.handlers:
+            for log_filter in front.filters:
+                handler.addFilter(log_filter)
+            root.addHandler(handler)
@@ -0,0 +1,267 @@
+"""Prometheus metrics for the analytics API.
+
+Metrics are exported at /metrics when PROMETHEUS_ENABLED is set and
+prometheus-client is installed; otherwise every timer is a shared no-op.
+With PROMETHEUS_MULTIPROC_DIR set, inference worker processes write their
+samples to that directory and /metrics aggregates every process. Files
+left by processes that are no longer running are removed when the API
+server starts.
+"""
+
+import logging
+import os
+import threading
+from bisect import bisect_left
+from time import perf_counter
+from typing import Callable, Dict, List, Tuple, Union
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+if settings.PROMETHEUS_ENABLED and settings.PROMETHEUS_MULTIPROC_DIR:
+    # Must be set before prometheus_client is imported, and is inherited by
+    # the inference worker processes
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.abspath(settings.PROMETHEUS_MULTIPROC_DIR))
+    os.makedirs(os.environ["PROMETHEUS_MULTIPROC_DIR"], exist_ok=True)
+elif not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    # prometheus_client switches to multiprocess mode even for an empty value
+    os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+try:
+    import prometheus_client
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:
+    prometheus_client = None
+
+ENABLED = settings.PROMETHEUS_ENABLED and prometheus_client is not None
+MULTIPROCESS = ENABLED and bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+# Single-row model stages take tens of microseconds, requests milliseconds
+STAGE_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5)
+REQUEST_BUCKETS = (5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+if ENABLED:
+    REQUEST_DURATION = prometheus_client.Histogram(
+        "analytics_http_request_duration_seconds", "HTTP request handling time",
+        ["method", "handler", "status"], buckets=REQUEST_BUCKETS,
+    )
+    STAGE_DURATION = prometheus_client.Histogram(
+        "analytics_stage_duration_seconds", "Time spent in hot-path stages",
+        ["stage", "component"], buckets=STAGE_BUCKETS,
+    )
+
+# Flushed to the Prometheus histogram at most this often (and at every scrape)
+FLUSH_INTERVAL_SECONDS = 1.0
+
+_observers: Dict[Tuple[str, str], Union["_StageObserver", "_DirectObserver"]] = {}
+_gauges: List[Tuple[str, str, Callable[[], float]]] = []
+_next_flush = [0.0]
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def remove_dead_process_files() -> None:
+    """Delete multiprocess sample files of processes that no longer run.
+
+    Called by the API server on startup, so samples of a previous run are
+    not added to this one. Files of running processes, such as other
+    server workers or the telemetry consumer, are kept.
+    """
+    if not MULTIPROCESS:
+        return
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    for name in os.listdir(directory):
+        # <metric type>_<pid>.db
+        stem, extension = os.path.splitext(name)
+        pid = stem.rsplit("_", 1)[-1]
+        if extension != ".db" or not pid.isdigit() or _process_alive(int(pid)):
+            continue
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass  # removed by another worker starting at the same time
+
+
+class _StageObserver:
+    """Buffers observations of one label set as plain bucket counts.
+
+    prometheus-client takes a lock per bucket and per sum update on every
+    observation, which costs several microseconds; here an observation is
+    one bisect and two additions, and the totals are added to the real
+    histogram in bulk by ``flush``. That relies on histogram internals of
+    the pinned prometheus-client; ``_DirectObserver`` is used instead when
+    a release lacks them.
+    """
+
+    __slots__ = ("_child", "_bounds", "_counts", "_sum", "_lock")
+
+    INTERNALS = ("_upper_bounds", "_buckets", "_sum")
+
+    def __init__(self, child):
+        self._child = child
+        self._bounds = child._upper_bounds
+        self._counts = [0] * len(self._bounds)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, amount: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(self._bounds, amount)] += 1
+            self._sum += amount
+
+    def flush(self) -> None:
+        with self._lock:
+            counts, total = self._counts, self._sum
+            self._counts = [0] * len(self._bounds)
+            self._sum = 0.0
+        if not any(counts):
+            return
+        for bucket, count in zip(self._child._buckets, counts):
+            if count:
+                bucket.inc(count)
+        self._child._sum.inc(total)
+
+
+class _DirectObserver:
+    """Observes through the public Histogram API, without buffering."""
+
+    __slots__ = ("observe",)
+
+    def __init__(self, child):
+        self.observe = child.observe
+
+    def flush(self) -> None:
+        return None
+
+
+def _observer(child):
+    if all(hasattr(child, name) for name in _StageObserver.INTERNALS):
+        return _StageObserver(child)
+    return _DirectObserver(child)
+
+
+def flush() -> None:
+    """Add buffered stage observations to the exported histogram."""
+    _next_flush[0] = perf_counter() + FLUSH_INTERVAL_SECONDS
+    for observer in list(_observers.values()):
+        observer.flush()
+
+
+class _Timer:
+    __slots__ = ("_observer", "_start")
+
+    def __init__(self, observer: Union[_StageObserver, _DirectObserver]):
+        self._observer = observer
+
+    def __enter__(self) -> "_Timer":
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        end = perf_counter()
+        self._observer.observe(end - self._start)
+        if end >= _next_flush[0]:
+            flush()
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopTimer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def timed(stage: str, component: str = ""):
+    """Context manager recording its duration in the stage histogram.
+
+    Observers are created once per label set and cached, so a timed block
+    costs two clock reads and a buffered observation.
+    """
+    if not ENABLED:
+        return _NOOP_TIMER
+    observer = _observers.get((stage, component))
+    if observer is None:
+        observer = _observers.setdefault(
+            (stage, component), _observer(STAGE_DURATION.labels(stage, component))
+        )
+    return _Timer(observer)
+
+
+def register_gauge(name: str, documentation: str, read: Callable[[], float]) -> None:
+    """Export ``read()`` as a gauge, evaluated at scrape time in this process."""
+    _gauges.append((name, documentation, read))
+
+
+class _CallbackCollector:
+    def collect(self):
+        for name, documentation, read in _gauges:
+            try:
+                value = float(read())
+            except Exception as e:
+                logger.warning(f"Metric {name} could not be read: {e}")
+                continue
+            yield GaugeMetricFamily(name, documentation, value=value)
+
+
+if ENABLED and not MULTIPROCESS:
+    prometheus_client.REGISTRY.register(_CallbackCollector())
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Exposition body and content type for a /metrics response."""
+    flush()
+    if MULTIPROCESS:
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_CallbackCollector())
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing every HTTP request.
+
+    Requests are labelled with the matched endpoint's function name rather
+    than the raw path, which keeps label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = perf_counter()
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            handler = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            REQUEST_DURATION.labels(scope["method"], handler, status[0]).observe(perf_counter() - start)
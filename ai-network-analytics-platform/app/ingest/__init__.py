@@ -0,0 +1 @@
+# Telemetry ingestion pipeline
@@ -0,0 +1,418 @@
+"""Kafka consumer that scores telemetry in batches.
+
+    python -m app.ingest.consumer
+
+Reads telemetry payloads (the same JSON shapes /telemetry/ingest accepts)
+from KAFKA_TELEMETRY_TOPIC, scores each polled batch with one call per
+model and publishes detected anomalies to KAFKA_ANOMALY_TOPIC. Offsets are
+committed once per batch, after its anomalies have been delivered, so a
+crash redelivers at most the uncommitted batch (at-least-once).
+"""
+
+import json
+import logging
+import signal
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import timed
+from app.ingest.pipeline import ColumnarBuffer, TelemetryBatch
+from app.ml.features import TELEMETRY_FEATURES
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerMessage:
+    """One consumed record."""
+
+    __slots__ = ("topic", "partition", "offset", "key", "value")
+
+    def __init__(self, topic: str, partition: int, offset: int, key: Optional[bytes], value: bytes):
+        self.topic = topic
+        self.partition = partition
+        self.offset = offset
+        self.key = key
+        self.value = value
+
+
+class MessageBroker:
+    """What the consumer needs from a log-based message broker.
+
+    ``publish`` returns only once every message is delivered, and
+    ``commit`` records the position after the given messages for the
+    consumer group, so a restarted consumer resumes there.
+    """
+
+    def subscribe(self, topics: List[str]) -> None:
+        raise NotImplementedError
+
+    def poll(self, max_messages: int, timeout: float) -> List[BrokerMessage]:
+        raise NotImplementedError
+
+    def publish(self, topic: str, messages: List[Tuple[Optional[bytes], bytes]]) -> None:
+        raise NotImplementedError
+
+    def commit(self, messages: List[BrokerMessage]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+def _next_offsets(messages: Iterable[BrokerMessage]) -> Dict[Tuple[str, int], int]:
+    """Offset to resume from for every partition in ``messages``."""
+    offsets: Dict[Tuple[str, int], int] = {}
+    for message in messages:
+        key = (message.topic, message.partition)
+        offsets[key] = max(offsets.get(key, 0), message.offset + 1)
+    return offsets
+
+
+class InMemoryBroker(MessageBroker):
+    """Partitioned in-process log with one consumer group.
+
+    Stands in for Kafka in tests and benchmarks. ``rewind`` moves the
+    consumer back to the committed offsets, as a restart would.
+    """
+
+    def __init__(self, partitions: int = 4):
+        self.partitions = max(1, partitions)
+        self._logs: Dict[str, List[List[BrokerMessage]]] = {}
+        self._subscribed: List[str] = []
+        self._positions: Dict[Tuple[str, int], int] = {}
+        self.committed: Dict[Tuple[str, int], int] = {}
+        self._next_partition = 0
+        self._available = threading.Condition()
+
+    def produce(self, topic: str, value: bytes, key: Optional[bytes] = None) -> None:
+        """Append one message, partitioned by key like Kafka's default partitioner."""
+        with self._available:
+            partitions = self._logs.setdefault(topic, [[] for _ in range(self.partitions)])
+            if key is not None:
+                partition = zlib.crc32(key) % self.partitions
+            else:
+                partition = self._next_partition
+                self._next_partition = (partition + 1) % self.partitions
+            log = partitions[partition]
+            log.append(BrokerMessage(topic, partition, len(log), key, value))
+            self._available.notify_all()
+
+    def messages(self, topic: str) -> List[BrokerMessage]:
+        """Every message of ``topic``, partition by partition."""
+        with self._available:
+            return [message for log in self._logs.get(topic, []) for message in log]
+
+    def lag(self) -> int:
+        """Messages in subscribed topics not yet committed."""
+        with self._available:
+            return sum(
+                len(log) - self.committed.get((topic, partition), 0)
+                for topic in self._subscribed
+                for partition, log in enumerate(self._logs.get(topic, []))
+            )
+
+    def subscribe(self, topics: List[str]) -> None:
+        with self._available:
+            self._subscribed = list(topics)
+        self.rewind()
+
+    def rewind(self) -> None:
+        with self._available:
+            self._positions = dict(self.committed)
+
+    def poll(self, max_messages: int, timeout: float) -> List[BrokerMessage]:
+        deadline = time.monotonic() + timeout
+        with self._available:
+            while True:
+                batch = self._take(max_messages)
+                remaining = deadline - time.monotonic()
+                if batch or remaining <= 0:
+                    return batch
+                self._available.wait(remaining)
+
+    def _take(self, max_messages: int) -> List[BrokerMessage]:
+        partitions = [
+            (topic, partition)
+            for topic in self._subscribed
+            for partition in range(len(self._logs.get(topic, [])))
+        ]
+        batch: List[BrokerMessage] = []
+        for i, (topic, partition) in enumerate(partitions):
+            # Share what is left among the remaining partitions, as a
+            # consumer assigned all of them would fetch from each
+            share = -(-(max_messages - len(batch)) // (len(partitions) - i))
+            log = self._logs[topic][partition]
+            start = self._positions.get((topic, partition), 0)
+            end = min(len(log), start + share)
+            batch.extend(log[start:end])
+            self._positions[(topic, partition)] = end
+        return batch
+
+    def publish(self, topic: str, messages: List[Tuple[Optional[bytes], bytes]]) -> None:
+        for key, value in messages:
+            self.produce(topic, value, key)
+
+    def commit(self, messages: List[BrokerMessage]) -> None:
+        with self._available:
+            for key, offset in _next_offsets(messages).items():
+                self.committed[key] = max(self.committed.get(key, 0), offset)
+
+
+class KafkaBroker(MessageBroker):
+    """Kafka through confluent-kafka (librdkafka), with manual offset commits."""
+
+    def __init__(self, bootstrap_servers: str, group_id: str):
+        from confluent_kafka import Consumer, Producer
+
+        self._consumer = Consumer({
+            "bootstrap.servers": bootstrap_servers,
+            "group.id": group_id,
+            "enable.auto.commit": False,
+            "auto.offset.reset": "earliest",
+        })
+        self._producer = Producer({
+            "bootstrap.servers": bootstrap_servers,
+            "linger.ms": 5,
+            "compression.type": "lz4",
+        })
+        self._delivery_errors: List[str] = []
+
+    def subscribe(self, topics: List[str]) -> None:
+        self._consumer.subscribe(topics)
+
+    def poll(self, max_messages: int, timeout: float) -> List[BrokerMessage]:
+        from confluent_kafka import KafkaError
+
+        batch = []
+        for message in self._consumer.consume(num_messages=max_messages, timeout=timeout):
+            error = message.error()
+            if error is not None:
+                if error.code() != KafkaError._PARTITION_EOF:
+                    logger.warning(f"Kafka consume error: {error}")
+                continue
+            batch.append(BrokerMessage(
+                message.topic(), message.partition(), message.offset(), message.key(), message.value()
+            ))
+        return batch
+
+    def _delivered(self, error, message) -> None:
+        if error is not None:
+            self._delivery_errors.append(str(error))
+
+    def publish(self, topic: str, messages: List[Tuple[Optional[bytes], bytes]]) -> None:
+        for key, value in messages:
+            while True:
+                try:
+                    self._producer.produce(topic, value=value, key=key, on_delivery=self._delivered)
+                    break
+                except BufferError:
+                    # Local queue full: serve delivery reports to make room
+                    self._producer.poll(0.1)
+        undelivered = self._producer.flush(30)
+        errors, self._delivery_errors = self._delivery_errors, []
+        if undelivered or errors:
+            raise RuntimeError(f"{undelivered + len(errors)} messages to {topic} were not delivered: {errors[:1]}")
+
+    def commit(self, messages: List[BrokerMessage]) -> None:
+        from confluent_kafka import TopicPartition
+
+        offsets = [TopicPartition(topic, partition, offset)
+                   for (topic, partition), offset in _next_offsets(messages).items()]
+        if offsets:
+            self._consumer.commit(offsets=offsets, asynchronous=False)
+
+    def close(self) -> None:
+        self._producer.flush(30)
+        self._consumer.close()
+
+
+class TelemetryConsumer:
+    """Polls telemetry in batches, scores them and publishes anomalies.
+
+    Each batch is decoded into one columnar block and scored with a single
+    call per model; only rows flagged as anomalous are turned into
+    messages. Processing errors propagate without committing, so the batch
+    is redelivered when the consumer restarts.
+    """
+
+    def __init__(
+        self,
+        broker: MessageBroker,
+        telemetry_topic: str = "network.telemetry",
+        anomaly_topic: str = "anomaly.detection",
+        batch_size: int = 5000,
+        poll_timeout_ms: float = 500.0,
+        model_refresh_seconds: float = 30.0,
+    ):
+        self.broker = broker
+        self.telemetry_topic = telemetry_topic
+        self.anomaly_topic = anomaly_topic
+        self.batch_size = max(1, batch_size)
+        self.poll_timeout = max(0.0, poll_timeout_ms / 1000.0)
+        self.model_refresh_seconds = model_refresh_seconds
+        self._next_model_check = 0.0
+        self._subscribed = False
+
+        self._started_at: Optional[float] = None
+        self._batches = 0
+        self._messages = 0
+        self._messages_invalid = 0
+        self._rows_scored = 0
+        self._rows_invalid = 0
+        self._anomalies_published = 0
+
+    def process_batch(self) -> int:
+        """Poll, score and commit one batch; returns the number of messages."""
+        if not self._subscribed:
+            self.broker.subscribe([self.telemetry_topic])
+            self._subscribed = True
+            self._started_at = time.monotonic()
+
+        with timed("broker_poll", "consumer"):
+            messages = self.broker.poll(self.batch_size, self.poll_timeout)
+        if not messages:
+            return 0
+
+        batch, invalid_messages, invalid_rows = self._decode(messages)
+        X = batch.feature_matrix()
+        complete = ~np.isnan(X).any(axis=1)
+        anomalies = self._score(batch, X[complete], complete) if complete.any() else []
+        if anomalies:
+            with timed("broker_publish", "consumer"):
+                self.broker.publish(self.anomaly_topic, anomalies)
+        with timed("broker_commit", "consumer"):
+            self.broker.commit(messages)
+
+        self._batches += 1
+        self._messages += len(messages)
+        self._messages_invalid += invalid_messages
+        self._rows_invalid += invalid_rows + int(len(X) - complete.sum())
+        self._rows_scored += int(complete.sum())
+        self._anomalies_published += len(anomalies)
+        return len(messages)
+
+    def run(self, stop: threading.Event) -> None:
+        """Process batches until ``stop`` is set."""
+        while not stop.is_set():
+            self._refresh_models()
+            self.process_batch()
+
+    @staticmethod
+    def _decode(messages: List[BrokerMessage]) -> Tuple[TelemetryBatch, int, int]:
+        """Columnar batch of every parseable row, plus invalid message and row counts."""
+        buffer = ColumnarBuffer()
+        invalid_messages = invalid_rows = 0
+        for message in messages:
+            try:
+                payload = json.loads(message.value)
+            except (TypeError, ValueError):
+                payload = None
+            if not isinstance(payload, dict):
+                invalid_messages += 1
+                continue
+            invalid_rows += buffer.add_payload(payload)
+        return buffer.drain(), invalid_messages, invalid_rows
+
+    def _score(self, batch: TelemetryBatch, X: np.ndarray, complete: np.ndarray) -> List[Tuple[bytes, bytes]]:
+        """Anomaly messages (key, value) for the complete rows ``X`` of ``batch``."""
+        from app.ml.inference import score_feature_matrix
+        from app.ml.registry import model_registry
+        from app.storage.repository import anomaly_severity
+
+        bundle = model_registry.active
+        (scores, flags, confidence), (predicted, lower, upper) = score_feature_matrix(X, bundle)
+
+        device_ids = batch.device_ids[complete]
+        timestamps = batch.timestamps[complete]
+        detected_at = datetime.utcnow().isoformat()
+        anomalies = []
+        for i in np.flatnonzero(flags):
+            anomaly = {
+                "device_id": device_ids[i],
+                "timestamp": datetime.utcfromtimestamp(timestamps[i]).isoformat(),
+                "anomaly_score": float(scores[i]),
+                "severity": anomaly_severity(float(scores[i])),
+                "model_confidence": float(confidence[i]),
+                "predicted_latency": float(predicted[i]),
+                "predicted_latency_interval": [float(lower[i]), float(upper[i])],
+                "telemetry": dict(zip(TELEMETRY_FEATURES, X[i].tolist())),
+                "model_version": bundle.version,
+                "detected_at": detected_at,
+            }
+            anomalies.append((device_ids[i].encode(), json.dumps(anomaly).encode()))
+        return anomalies
+
+    def _refresh_models(self) -> None:
+        """Activate a version another process (API, trainer) has made current."""
+        now = time.monotonic()
+        if now < self._next_model_check:
+            return
+        self._next_model_check = now + self.model_refresh_seconds
+
+        from app.ml.registry import model_registry
+
+        version = model_registry.current_version()
+        active = model_registry.active
+        if version is not None and (active is None or active.version != version):
+            model_registry.activate(version)
+            logger.info(f"Consumer switched to model version {version}")
+
+    def stats(self) -> Dict:
+        """Throughput counters."""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "batches": self._batches,
+            "messages": self._messages,
+            "messages_invalid": self._messages_invalid,
+            "rows_scored": self._rows_scored,
+            "rows_invalid": self._rows_invalid,
+            "anomalies_published": self._anomalies_published,
+            "rows_per_sec": round(self._rows_scored / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def create_consumer(broker: Optional[MessageBroker] = None) -> TelemetryConsumer:
+    """Consumer configured from settings, on Kafka unless ``broker`` is given."""
+    if broker is None:
+        broker = KafkaBroker(settings.KAFKA_BOOTSTRAP_SERVERS, settings.KAFKA_CONSUMER_GROUP)
+    return TelemetryConsumer(
+        broker,
+        telemetry_topic=settings.KAFKA_TELEMETRY_TOPIC,
+        anomaly_topic=settings.KAFKA_ANOMALY_TOPIC,
+        batch_size=settings.KAFKA_CONSUMER_BATCH_SIZE,
+        poll_timeout_ms=settings.KAFKA_POLL_TIMEOUT_MS,
+        model_refresh_seconds=settings.KAFKA_MODEL_REFRESH_SECONDS,
+    )
+
+
+def main() -> None:
+    from app.core.logging import setup_logging
+    from app.ml.models import load_models
+    from app.ml.registry import model_registry
+
+    setup_logging()
+    load_models()
+    if model_registry.active.version is None:
+        raise SystemExit("No model version published; train models before starting the consumer")
+
+    consumer = create_consumer()
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    logger.info(f"Consuming {consumer.telemetry_topic} from {settings.KAFKA_BOOTSTRAP_SERVERS}")
+    try:
+        consumer.run(stop)
+    finally:
+        consumer.broker.close()
+        logger.info(f"Consumer stopped: {consumer.stats()}")
+
+
+if __name__ == "__main__":
+    main()
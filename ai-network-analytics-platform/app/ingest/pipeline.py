@@ -0,0 +1,483 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.core import metrics
+from app.core.config import settings
+from app.ml.features import TELEMETRY_FEATURES
+
+logger = logging.getLogger(__name__)
+
+UNKNOWN_DEVICE = "unknown"
+
+
+class IngestQueueFull(Exception):
+    """Raised when the ingest queue cannot accept more payloads."""
+
+
+class IngestPayloadTooLarge(ValueError):
+    """Raised for a payload with more rows than one submission may carry."""
+
+
+def _parse_timestamp(value, default: float) -> float:
+    """Convert an ISO-8601 string or epoch number to epoch seconds."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def count_rows(payload: Dict) -> int:
+    """Cheap row count of a payload without normalizing it."""
+    records = payload.get("records")
+    if isinstance(records, list):
+        return len(records)
+    for col in TELEMETRY_FEATURES:
+        if isinstance(payload.get(col), list):
+            return len(payload[col])
+    return 1
+
+
+class TelemetryBatch:
+    """A flushed block of telemetry in columnar form.
+
+    ``timestamps`` are epoch seconds; feature values missing from a sample
+    are NaN. ``stored`` is set by the storage sink to the mask of rows the
+    telemetry table accepted, leaving out rows whose (device_id, timestamp)
+    was already stored.
+    """
+
+    def __init__(self, device_ids: np.ndarray, timestamps: np.ndarray, columns: Dict[str, np.ndarray]):
+        self.device_ids = device_ids
+        self.timestamps = timestamps
+        self.columns = columns
+        self.stored: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def feature_matrix(self, columns: List[str] = TELEMETRY_FEATURES) -> np.ndarray:
+        """Feature matrix with one column per name in ``columns``."""
+        return np.column_stack([self.columns[col] for col in columns])
+
+    def complete_rows(self, columns: List[str] = TELEMETRY_FEATURES) -> np.ndarray:
+        """Boolean mask of rows that have a value for every column."""
+        return ~np.isnan(self.feature_matrix(columns)).any(axis=1)
+
+
+class ColumnarBuffer:
+    """Accumulates normalized telemetry rows column by column."""
+
+    def __init__(self):
+        self._reset()
+        self.created_at = time.monotonic()
+
+    def _reset(self) -> None:
+        self.device_ids: List[str] = []
+        self.timestamps: List[float] = []
+        self.values: Dict[str, List[float]] = {col: [] for col in TELEMETRY_FEATURES}
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def add_payload(self, payload: Dict) -> int:
+        """Normalize one ingest payload into the buffer.
+
+        Accepts a single record, ``{"records": [...]}`` or a columnar payload
+        whose feature fields are equal-length lists. Returns the number of
+        rows that could not be parsed.
+        """
+        now = time.time()
+        records = payload.get("records")
+        if isinstance(records, list):
+            return sum(self._add_record(record, now) for record in records)
+
+        n_rows = count_rows(payload)
+        if n_rows == 1 and not any(isinstance(payload.get(col), list) for col in TELEMETRY_FEATURES):
+            return self._add_record(payload, now)
+
+        rejected = 0
+        for i in range(n_rows):
+            record = {
+                key: (value[i] if isinstance(value, list) and i < len(value) else value)
+                for key, value in payload.items()
+            }
+            rejected += self._add_record(record, now)
+        return rejected
+
+    def _add_record(self, record: Dict, now: float) -> int:
+        try:
+            row = [float(record[col]) if record.get(col) is not None else np.nan
+                   for col in TELEMETRY_FEATURES]
+            timestamp = _parse_timestamp(record.get("timestamp"), now)
+        except (TypeError, ValueError, AttributeError):
+            return 1
+
+        self.device_ids.append(str(record.get("device_id", UNKNOWN_DEVICE)))
+        self.timestamps.append(timestamp)
+        for col, value in zip(TELEMETRY_FEATURES, row):
+            self.values[col].append(value)
+        return 0
+
+    def drain(self) -> TelemetryBatch:
+        """Return the buffered rows as a batch and empty the buffer."""
+        batch = TelemetryBatch(
+            device_ids=np.asarray(self.device_ids, dtype=object),
+            timestamps=np.asarray(self.timestamps, dtype=np.float64),
+            columns={col: np.asarray(vals, dtype=np.float64) for col, vals in self.values.items()},
+        )
+        self._reset()
+        self.created_at = time.monotonic()
+        return batch
+
+
+Sink = Callable[[TelemetryBatch], Awaitable[None]]
+
+
+class TelemetryIngestPipeline:
+    """Bounded queue plus batch workers for telemetry ingestion.
+
+    ``submit`` only enqueues the raw payload; workers normalize payloads into
+    columnar buffers and flush them to every registered sink once
+    ``batch_size`` rows are buffered or ``flush_interval_ms`` has elapsed.
+    A payload counts against ``max_queued_rows`` from ``submit`` until its
+    rows are flushed. When the queue holds ``max_queue_size`` payloads or
+    that many rows, ``submit`` raises ``IngestQueueFull`` so the API can
+    shed load instead of buffering without bound; a single payload of more
+    than ``max_payload_rows`` rows raises ``IngestPayloadTooLarge``.
+    """
+
+    def __init__(
+        self,
+        max_queue_size: int = 10000,
+        batch_size: int = 1000,
+        flush_interval_ms: float = 500.0,
+        workers: int = 2,
+        max_queued_rows: int = 1000000,
+        max_payload_rows: int = 50000,
+    ):
+        self.max_queue_size = max_queue_size
+        self.max_queued_rows = max(1, max_queued_rows)
+        self.max_payload_rows = max(1, min(max_payload_rows, self.max_queued_rows))
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = max(0.001, flush_interval_ms / 1000.0)
+        self.workers = max(1, workers)
+        self._sinks: Dict[str, Sink] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._queued_rows = 0  # rows submitted and not yet flushed
+
+        self._started_at: Optional[float] = None
+        self._payloads_accepted = 0
+        self._payloads_rejected = 0
+        self._rows_flushed = 0
+        self._rows_invalid = 0
+        self._flushes = 0
+        self._sink_errors = 0
+
+    def add_sink(self, name: str, sink: Sink) -> None:
+        """Register a coroutine called with every flushed batch."""
+        self._sinks[name] = sink
+
+    def remove_sink(self, name: str) -> None:
+        self._sinks.pop(name, None)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    @property
+    def queued_rows(self) -> int:
+        return self._queued_rows
+
+    def start(self) -> None:
+        """Start the batch workers on the running event loop."""
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._queued_rows = 0
+        self._started_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Telemetry ingest pipeline started ({self.workers} workers)")
+
+    async def stop(self) -> None:
+        """Flush queued telemetry and stop the workers."""
+        if not self._tasks:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, payload: Dict) -> int:
+        """Enqueue a payload without waiting and return its row count.
+
+        Raises IngestPayloadTooLarge or, on overload, IngestQueueFull.
+        """
+        if not self._tasks:
+            self.start()
+        n_rows = count_rows(payload)
+        if n_rows > self.max_payload_rows:
+            self._payloads_rejected += 1
+            raise IngestPayloadTooLarge(
+                f"Payload has {n_rows} rows, at most {self.max_payload_rows} are accepted per request"
+            )
+        if self._queued_rows + n_rows > self.max_queued_rows:
+            self._payloads_rejected += 1
+            raise IngestQueueFull(f"Ingest queue is full ({self.max_queued_rows} rows)")
+        try:
+            self._queue.put_nowait((payload, n_rows))
+        except asyncio.QueueFull:
+            self._payloads_rejected += 1
+            raise IngestQueueFull(f"Ingest queue is full ({self.max_queue_size} payloads)")
+        self._queued_rows += n_rows
+        self._payloads_accepted += 1
+        return n_rows
+
+    async def _worker(self) -> None:
+        buffer = ColumnarBuffer()
+        queue = self._queue
+        pending = 0  # payloads taken from the queue but not yet flushed
+        pending_rows = 0
+        try:
+            while True:
+                item = None
+                if len(buffer):
+                    timeout = self.flush_interval - (time.monotonic() - buffer.created_at)
+                    try:
+                        item = await asyncio.wait_for(queue.get(), max(0.0, timeout))
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    item = await queue.get()
+                    buffer.created_at = time.monotonic()
+
+                if item is not None:
+                    payload, n_rows = item
+                    pending += 1
+                    pending_rows += n_rows
+                    self._rows_invalid += buffer.add_payload(payload)
+
+                # Flush when full, when the flush interval expired, or ack
+                # payloads that produced no valid rows right away
+                if len(buffer) >= self.batch_size or item is None or not len(buffer):
+                    if len(buffer):
+                        await self._flush(buffer.drain())
+                    self._queued_rows -= pending_rows
+                    for _ in range(pending):
+                        queue.task_done()
+                    pending = pending_rows = 0
+        finally:
+            # Release join() waiters and the row budget for payloads lost to cancellation
+            self._queued_rows -= pending_rows
+            for _ in range(pending):
+                queue.task_done()
+
+    async def _flush(self, batch: TelemetryBatch) -> None:
+        self._flushes += 1
+        self._rows_flushed += len(batch)
+        for name, sink in list(self._sinks.items()):
+            try:
+                await sink(batch)
+            except Exception as e:
+                self._sink_errors += 1
+                logger.error(f"Telemetry sink '{name}' failed: {e}")
+
+    def stats(self) -> Dict:
+        """Throughput and backpressure counters."""
+        elapsed = time.monotonic() - self._started_at if self._started_at else 0.0
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_size": self.max_queue_size,
+            "queued_rows": self._queued_rows,
+            "max_queued_rows": self.max_queued_rows,
+            "payloads_accepted": self._payloads_accepted,
+            "payloads_rejected": self._payloads_rejected,
+            "rows_flushed": self._rows_flushed,
+            "rows_invalid": self._rows_invalid,
+            "flushes": self._flushes,
+            "sink_errors": self._sink_errors,
+            "sinks": list(self._sinks),
+            "rows_per_sec": round(self._rows_flushed / elapsed, 1) if elapsed else 0.0,
+        }
+
+
+def _store_telemetry(batch: TelemetryBatch) -> List[bool]:
+    from app.core.database import SessionLocal
+    from app.storage.repository import bulk_insert_telemetry, telemetry_rows
+
+    with SessionLocal() as db:
+        return bulk_insert_telemetry(db, telemetry_rows(batch))
+
+
+def _store_anomalies(rows: List[Dict]) -> List[bool]:
+    from app.core.database import SessionLocal
+    from app.storage.repository import bulk_insert_anomalies
+
+    with SessionLocal() as db:
+        return bulk_insert_anomalies(db, rows)
+
+
+async def _store_telemetry_async(batch: TelemetryBatch) -> List[bool]:
+    from app.core.database import AsyncSessionLocal
+    from app.storage.repository import bulk_insert_telemetry_async, telemetry_rows
+
+    rows = await asyncio.get_running_loop().run_in_executor(None, telemetry_rows, batch)
+    async with AsyncSessionLocal() as db:
+        return await bulk_insert_telemetry_async(db, rows)
+
+
+async def _store_anomalies_async(rows: List[Dict]) -> List[bool]:
+    from app.core.database import AsyncSessionLocal
+    from app.storage.repository import bulk_insert_anomalies_async
+
+    async with AsyncSessionLocal() as db:
+        return await bulk_insert_anomalies_async(db, rows)
+
+
+async def storage_sink(batch: TelemetryBatch) -> None:
+    """Bulk insert a flushed batch into the telemetry table and mark the rows it accepted."""
+    if settings.DATABASE_ASYNC:
+        stored = await _store_telemetry_async(batch)
+    else:
+        stored = await asyncio.get_running_loop().run_in_executor(None, _store_telemetry, batch)
+    batch.stored = np.asarray(stored, dtype=bool)
+
+
+async def archive_sink(batch: TelemetryBatch) -> None:
+    """Append a flushed batch to the columnar training archive."""
+    from app.storage.archive import telemetry_archive
+
+    await asyncio.get_running_loop().run_in_executor(None, telemetry_archive.append, batch)
+
+
+async def feature_store_sink(batch: TelemetryBatch) -> None:
+    """Update per-device rolling features with the complete rows of a batch."""
+    from app.ml.feature_store import device_feature_store
+
+    mask = batch.complete_rows()
+    if mask.any():
+        # A few vectorized array updates per batch; cheaper inline than on a thread
+        device_feature_store.update(batch.device_ids[mask], batch.timestamps[mask], batch.feature_matrix()[mask])
+
+
+async def rollup_sink(batch: TelemetryBatch) -> None:
+    """Buffer the stored rows of a flushed batch for the rollup tiers and fold them in when due.
+
+    Rows the telemetry table skipped as duplicates, or did not store at
+    all, are left out so rollups count the same samples as the table.
+    """
+    from app.storage.rollups import telemetry_rollups
+
+    if batch.stored is None or not batch.stored.any():
+        return
+    telemetry_rollups.append_batch(batch, batch.stored)
+    if telemetry_rollups.due:
+        await asyncio.get_running_loop().run_in_executor(None, telemetry_rollups.flush_due)
+
+
+async def cache_invalidation_sink(batch: TelemetryBatch) -> None:
+    """Drop cached results of the devices in a batch.
+
+    Registered after the sinks that update features and anomalies, so no
+    stale result can be cached in between. Fleet-wide results are left to
+    expire after RESULT_CACHE_TTL.
+    """
+    from app.storage.cache import result_cache
+
+    devices = set(batch.device_ids.tolist())
+    await asyncio.get_running_loop().run_in_executor(None, result_cache.invalidate_devices, devices)
+
+
+async def online_update_sink(batch: TelemetryBatch) -> None:
+    """Feed complete rows to the incremental model updater."""
+    from app.ml.warmup import model_warmup
+
+    await model_warmup.wait()
+    from app.ml.online import model_updater
+
+    X = batch.feature_matrix()
+    X = X[~np.isnan(X).any(axis=1)]
+    await asyncio.get_running_loop().run_in_executor(None, model_updater.observe, X)
+
+
+async def analysis_sink(batch: TelemetryBatch) -> None:
+    """Score complete rows of a flushed batch and persist detected anomalies."""
+    from app.ml.executor import inference_executor
+    from app.ml.inference import analyze_network_batch
+    from app.ml.warmup import model_warmup
+    from app.storage.repository import anomaly_severity
+
+    await model_warmup.wait()
+
+    mask = batch.complete_rows()
+    if not mask.any():
+        return
+
+    columnar = {col: batch.columns[col][mask].tolist() for col in TELEMETRY_FEATURES}
+    results = await inference_executor.run(analyze_network_batch, columnar)
+
+    device_ids = batch.device_ids[mask]
+    timestamps = batch.timestamps[mask]
+    anomalies = [
+        {
+            "device_id": device_ids[i],
+            "timestamp": datetime.utcfromtimestamp(timestamps[i]),
+            "anomaly_score": result["anomaly_score"],
+            "predicted_latency": result["predicted_latency"],
+            "severity": anomaly_severity(result["anomaly_score"]),
+            "description": "Anomalous telemetry detected by the isolation forest",
+        }
+        for i, result in enumerate(results)
+        if result["is_anomaly"]
+    ]
+    if anomalies:
+        if settings.DATABASE_ASYNC:
+            stored = await _store_anomalies_async(anomalies)
+        else:
+            stored = await asyncio.get_running_loop().run_in_executor(None, _store_anomalies, anomalies)
+        if settings.ROLLUPS_ENABLED:
+            from app.storage.rollups import ANOMALY_METRIC, telemetry_rollups
+
+            # Only anomalies the table accepted, as for the telemetry rollups
+            stored = np.asarray(stored, dtype=bool)
+            flagged = np.flatnonzero([result["is_anomaly"] for result in results])[stored]
+            scores = np.asarray([anomaly["anomaly_score"] for anomaly in anomalies])[stored]
+            telemetry_rollups.append(device_ids[flagged], timestamps[flagged], {ANOMALY_METRIC: scores})
+        logger.info(f"Detected {len(anomalies)} anomalies in {len(results)} ingested samples")
+
+
+ingest_pipeline = TelemetryIngestPipeline(
+    max_queue_size=settings.INGEST_QUEUE_MAXSIZE,
+    batch_size=settings.INGEST_BATCH_SIZE,
+    flush_interval_ms=settings.INGEST_FLUSH_INTERVAL_MS,
+    workers=settings.INGEST_WORKERS,
+    max_queued_rows=settings.INGEST_QUEUE_MAX_ROWS,
+    max_payload_rows=settings.INGEST_MAX_PAYLOAD_ROWS,
+)
+metrics.register_gauge(
+    "analytics_ingest_queue_depth", "Telemetry payloads waiting in the ingest queue",
+    lambda: ingest_pipeline.queue_depth,
+)
+ingest_pipeline.add_sink("storage", storage_sink)
+if settings.ARCHIVE_ENABLED:
+    ingest_pipeline.add_sink("archive", archive_sink)
+if settings.FEATURE_STORE_ENABLED:
+    ingest_pipeline.add_sink("features", feature_store_sink)
+ingest_pipeline.add_sink("analysis", analysis_sink)
+if settings.ROLLUPS_ENABLED:
+    ingest_pipeline.add_sink("rollups", rollup_sink)
+if settings.RESULT_CACHE_ENABLED:
+    ingest_pipeline.add_sink("cache_invalidation", cache_invalidation_sink)
+if settings.MODEL_UPDATE_MODE == "incremental":
+    ingest_pipeline.add_sink("online_update", online_update_sink)
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.ml.executor import inference_executor
+from app.ml.features import TELEMETRY_FEATURES
+from app.ml.inference import analyze_network_batch
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch-size histogram buckets reported by stats()
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+async def _run_batch(records: List[Dict]) -> List[Dict]:
+    return await inference_executor.run(analyze_network_batch, records)
+
+
+async def _run_single(record: Dict) -> Dict:
+    from app.ml.models import analyze_network_data
+
+    return await inference_executor.run(analyze_network_data, record)
+
+
+class MicroBatchScheduler:
+    """Coalesces concurrent single-record analysis requests into batches.
+
+    Requests are queued and a collector task waits up to ``max_wait_ms`` after
+    the first queued record, or until ``max_batch_size`` records are queued,
+    before running one batched prediction. Each caller gets its own row back.
+    Up to ``max_in_flight`` batches run at once so the collector keeps filling
+    the next batch while the executor works on the previous one.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int = 64,
+        max_wait_ms: float = 2.0,
+        max_in_flight: int = 2,
+        run_batch: Callable[[List[Dict]], Awaitable[List[Dict]]] = _run_batch,
+        run_single: Callable[[Dict], Awaitable[Dict]] = _run_single,
+    ):
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._run_batch = run_batch
+        self._run_single = run_single
+        self.max_in_flight = max(1, max_in_flight)
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._collecting: List = []  # batch taken off the queue, not yet dispatched
+        self._batch_tasks: set = set()
+
+        self._batches = 0
+        self._rows = 0
+        self._max_batch = 0
+        self._fallback_rows = 0
+        self._size_histogram = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self._queue_waits_ms: deque = deque(maxlen=4096)
+
+    def start(self) -> None:
+        """Start the collector task on the running event loop."""
+        if self._collector is not None and not self._collector.done():
+            return
+        self._queue = asyncio.Queue()
+        self._in_flight = asyncio.Semaphore(self.max_in_flight)
+        self._collector = asyncio.get_running_loop().create_task(self._collect())
+
+    async def stop(self) -> None:
+        """Stop collecting, finish dispatched batches and fail every other request.
+
+        Requests still queued, or in the batch being collected, get a
+        RuntimeError, so no caller waits through shutdown.
+        """
+        collector, self._collector = self._collector, None
+        if collector is not None:
+            collector.cancel()
+            try:
+                await collector
+            except asyncio.CancelledError:
+                pass
+
+        pending, self._collecting = self._collecting, []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, future, _ in pending:
+            if not future.done():
+                future.set_exception(RuntimeError("Inference scheduler stopped"))
+
+        if self._batch_tasks:
+            await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+
+    async def submit(self, record: Dict) -> Dict:
+        """Queue one telemetry record and wait for its analysis result."""
+        # Records the batch path cannot vectorize keep the per-row semantics
+        if not all(col in record for col in TELEMETRY_FEATURES):
+            self._fallback_rows += 1
+            return await self._run_single(record)
+
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((record, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self) -> None:
+        queue = self._queue
+        while True:
+            batch = self._collecting = [await queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._in_flight.acquire()
+            task = asyncio.create_task(self._dispatch(batch))
+            self._collecting = []
+            self._batch_tasks.add(task)
+            task.add_done_callback(self._batch_tasks.discard)
+
+    async def _dispatch(self, batch: List) -> None:
+        try:
+            dispatched_at = time.perf_counter()
+            self._record_batch(batch, dispatched_at)
+            records = [record for record, _, _ in batch]
+
+            try:
+                results = await self._run_batch(records)
+            except Exception as e:
+                # One malformed record must not fail its neighbours
+                logger.warning(f"Batched analysis failed, retrying rows individually: {e}")
+                self._fallback_rows += len(records)
+                results = await asyncio.gather(
+                    *[self._run_single(record) for record in records],
+                    return_exceptions=True,
+                )
+
+            for (_, future, _), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._in_flight.release()
+
+    def _record_batch(self, batch: List, dispatched_at: float) -> None:
+        size = len(batch)
+        self._batches += 1
+        self._rows += size
+        self._max_batch = max(self._max_batch, size)
+
+        bucket = len(BATCH_SIZE_BUCKETS)
+        for i, bound in enumerate(BATCH_SIZE_BUCKETS):
+            if size <= bound:
+                bucket = i
+                break
+        self._size_histogram[bucket] += 1
+
+        self._queue_waits_ms.extend(
+            (dispatched_at - enqueued_at) * 1000 for _, _, enqueued_at in batch
+        )
+
+    def stats(self) -> Dict:
+        """Batch-size and queue-wait metrics."""
+        waits = sorted(self._queue_waits_ms)
+
+        def wait_percentile(pct: float) -> float:
+            if not waits:
+                return 0.0
+            return round(waits[min(len(waits) - 1, int(pct / 100.0 * len(waits)))], 3)
+
+        labels = [f"le_{bound}" for bound in BATCH_SIZE_BUCKETS] + ["le_inf"]
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "batches": self._batches,
+            "rows": self._rows,
+            "fallback_rows": self._fallback_rows,
+            "mean_batch_size": round(self._rows / self._batches, 3) if self._batches else 0.0,
+            "largest_batch": self._max_batch,
+            "batch_size_histogram": dict(zip(labels, self._size_histogram)),
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_wait_ms": {
+                "p50": wait_percentile(50),
+                "p99": wait_percentile(99),
+                "max": round(waits[-1], 3) if waits else 0.0,
+            },
+        }
+
+
+inference_scheduler = MicroBatchScheduler(
+    max_batch_size=settings.INFERENCE_BATCH_MAX_SIZE,
+    max_wait_ms=settings.INFERENCE_BATCH_MAX_WAIT_MS,
+    max_in_flight=settings.INFERENCE_WORKERS,
+)
@@ -0,0 +1,137 @@
+import asyncio
+import functools
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from app.core.config import settings
+from app.ml.registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("process", "thread", "inline")
+
+
+def _init_worker(version: Optional[str], bundle) -> None:
+    """Install the parent's active model version in a freshly started worker process.
+
+    Published versions are loaded from the registry, memory-mapped when
+    MODEL_LOAD_MMAP is set, so workers share the model pages. With the
+    compiled inference engine only the NumPy arrays are loaded and the
+    worker never imports scikit-learn. An unpublished bundle is shipped
+    from the parent.
+    """
+    from app.ml.registry import model_registry
+
+    if version:
+        if settings.INFERENCE_ENGINE == "compiled":
+            try:
+                model_registry.install(model_registry.load_compiled(version))
+                return
+            except LookupError:
+                pass
+        model_registry.install(model_registry.load(version))
+    elif bundle is not None:
+        model_registry.install(bundle)
+
+
+class InferenceExecutor:
+    """Runs CPU-bound model inference off the event loop.
+
+    ``process`` mode installs the active model version in each worker once,
+    when the pool starts, and replaces the pool whenever the registry activates a
+    new version. ``thread`` mode shares the in-process registry. ``inline`` runs on
+    the event loop and only exists for debugging and benchmarking.
+
+    Registry listeners call ``reload`` from other threads, so replacing the
+    pool and submitting work to it happen under one lock.
+    """
+
+    def __init__(self, mode: str = "process", max_workers: int = 2):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown inference executor mode: {mode}")
+        self.mode = mode
+        self.max_workers = max(1, max_workers)
+        self._pool: Optional[Executor] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Create the worker pool."""
+        with self._lock:
+            self._start()
+
+    def _start(self) -> None:
+        if self._pool is not None or self.mode == "inline":
+            return
+
+        if self.mode == "process":
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=self._worker_args(),
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference",
+            )
+        logger.info(f"Inference executor started ({self.mode}, {self.max_workers} workers)")
+
+    @staticmethod
+    def _worker_args() -> tuple:
+        bundle = model_registry.active
+        if bundle is not None and bundle.version:
+            return bundle.version, None
+        return None, bundle
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker pool."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
+
+    def reload(self) -> None:
+        """Replace the worker pool so workers load the current models.
+
+        Requests already submitted to the old pool are allowed to finish.
+        Does nothing until the pool has been started.
+        """
+        with self._lock:
+            if self.mode != "process" or self._pool is None:
+                return
+            old_pool, self._pool = self._pool, None
+            self._start()
+        old_pool.shutdown(wait=False)
+
+    async def run(self, fn: Callable, *args: Any) -> Any:
+        """Run ``fn(*args)`` on the pool and await its result."""
+        if self.mode == "inline":
+            return fn(*args)
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            # Submitted under the lock, so a concurrent reload cannot shut
+            # the pool down in between
+            self._start()
+            pool = self._pool
+            future = loop.run_in_executor(pool, functools.partial(fn, *args))
+        try:
+            return await future
+        except BrokenProcessPool:
+            with self._lock:
+                if self._pool is not pool:
+                    raise  # already replaced
+                self._pool = None
+                logger.error("Inference worker pool died, restarting it")
+                self._start()
+            pool.shutdown(wait=False)
+            raise
+
+
+inference_executor = InferenceExecutor(settings.INFERENCE_EXECUTOR, settings.INFERENCE_WORKERS)
+model_registry.subscribe(lambda bundle: inference_executor.reload())
@@ -0,0 +1,311 @@
+"""Rolling per-device telemetry features for performance forecasting.
+
+Needs only NumPy. The ingest pipeline feeds every complete telemetry row to
+``device_feature_store``; the forecaster reads each device's current
+feature vector from it.
+"""
+
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.ml.features import TELEMETRY_FEATURES
+
+# Appended to the store features to form a forecast input row
+FORECAST_INPUTS = ["hours_ahead", "target_hour_sin", "target_hour_cos"]
+# Telemetry fields the forecaster predicts, in output column order
+FORECAST_TARGETS = ["latency_p95", "throughput"]
+
+
+class DeviceFeatureStore:
+    """Per-device ring buffers with rolling statistics kept in flat arrays.
+
+    Every device owns a slot in a handful of preallocated arrays: the last
+    ``max(windows)`` samples (float32), running sums and sums of squares per
+    window, and one EWMA per smoothing factor. Ingesting a sample subtracts
+    the values leaving each window and adds the new one, so it costs the
+    same however long the windows are. Sums are recomputed from the ring
+    each time it wraps, which keeps floating-point drift bounded.
+
+    Per device the store holds ``max(windows) * len(columns)`` float32
+    values plus a few float64 vectors; with the defaults that is about 4 KB.
+    Beyond ``max_devices`` the least recently seen device is evicted.
+    """
+
+    def __init__(
+        self,
+        columns: Sequence[str] = TELEMETRY_FEATURES,
+        windows: Sequence[int] = (6, 30, 120),
+        ewma_alphas: Sequence[float] = (0.3, 0.05),
+        max_devices: int = 10000,
+    ):
+        self.columns = list(columns)
+        self.windows = np.asarray(sorted({max(1, int(w)) for w in windows}), dtype=np.int64)
+        self.ewma_alphas = np.asarray(ewma_alphas, dtype=np.float64)
+        self.history = int(self.windows[-1])
+        self.max_devices = max(1, max_devices)
+        self.feature_names = [
+            f"{col}_{stat}"
+            for stat in (["last"] + [f"mean_{w}" for w in self.windows] + [f"std_{w}" for w in self.windows]
+                         + [f"ewma_{a:g}" for a in self.ewma_alphas] + [f"delta_{w}" for w in self.windows])
+            for col in self.columns
+        ]
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._slots: Dict[str, int] = {}
+        self._device_ids: List[Optional[str]] = []
+        self._capacity = 0
+        self._allocate(min(64, self.max_devices))
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self._slots
+
+    # Ingestion
+
+    def update(self, device_ids: Sequence[str], timestamps: np.ndarray, X: np.ndarray,
+               return_features: bool = False) -> Optional[np.ndarray]:
+        """Ingest complete rows ordered by ``columns``, oldest first per device.
+
+        With ``return_features`` returns each row's feature vector as of
+        right after that row was ingested (NaN for rows that were dropped),
+        which replays history into training inputs.
+        """
+        X = np.asarray(X, dtype=np.float64)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        features = np.full((len(X), len(self.feature_names)), np.nan) if return_features else None
+        if not len(X):
+            return features
+
+        with self._lock:
+            slots = np.fromiter((self._slot(str(d)) for d in device_ids), dtype=np.int64, count=len(X))
+            valid = np.flatnonzero(slots >= 0)
+            # Rows of the same device must be applied in order; the k-th row
+            # of every device goes in round k, which touches distinct slots
+            order = valid[np.argsort(slots[valid], kind="stable")]
+            sorted_slots = slots[order]
+            starts = np.flatnonzero(np.r_[True, sorted_slots[1:] != sorted_slots[:-1]])
+            rank = np.arange(len(order)) - np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+            by_round = order[np.argsort(rank, kind="stable")]
+            bounds = np.cumsum(np.bincount(rank))[:-1]
+
+            for rows in np.split(by_round, bounds):
+                self._push(slots[rows], X[rows], timestamps[rows])
+                if return_features:
+                    features[rows] = self._features(slots[rows])
+        return features
+
+    def _push(self, slots: np.ndarray, x: np.ndarray, timestamps: np.ndarray) -> None:
+        # Accumulate exactly what the ring stores, so leaving values cancel
+        x = x.astype(np.float32).astype(np.float64)
+        count = self._count[slots]
+        pos = self._pos[slots]
+
+        full = (count[:, None] >= self.windows)[..., None]
+        leaving = self._ring[slots[:, None], (pos[:, None] - self.windows) % self.history]
+        leaving = np.where(full, leaving.astype(np.float64), 0.0)
+        self._sum[slots] += x[:, None, :] - leaving
+        self._sumsq[slots] += x[:, None, :] ** 2 - leaving ** 2
+
+        ewma = self._ewma[slots]
+        self._ewma[slots] = np.where((count == 0)[:, None, None], x[:, None, :],
+                                     ewma + self.ewma_alphas[:, None] * (x[:, None, :] - ewma))
+
+        self._ring[slots, pos] = x
+        pos = (pos + 1) % self.history
+        self._pos[slots] = pos
+        self._count[slots] = count + 1
+        self._last_seen[slots] = timestamps
+
+        wrapped = slots[pos == 0]
+        if len(wrapped):
+            self._resum(wrapped)
+
+    def _resum(self, slots: np.ndarray) -> None:
+        """Recompute window sums of full rings whose newest sample is last."""
+        ring = self._ring[slots].astype(np.float64)
+        for k, window in enumerate(self.windows.tolist()):
+            tail = ring[:, self.history - window:]
+            self._sum[slots, k] = tail.sum(axis=1)
+            self._sumsq[slots, k] = (tail ** 2).sum(axis=1)
+
+    # Reading
+
+    def features(self, device_ids: Optional[Sequence[str]] = None,
+                 limit: Optional[int] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+        """Current feature vectors as ``(device_ids, features, last_seen)``.
+
+        Unknown device ids are skipped. Without ``device_ids`` all devices
+        are returned, most recently seen first, up to ``limit``.
+        """
+        with self._lock:
+            if device_ids is None:
+                slots = np.fromiter(self._slots.values(), dtype=np.int64, count=len(self._slots))
+                slots = slots[np.argsort(-self._last_seen[slots], kind="stable")]
+            else:
+                slots = np.asarray([self._slots[d] for d in device_ids if d in self._slots], dtype=np.int64)
+            if limit is not None:
+                slots = slots[:limit]
+            return ([self._device_ids[s] for s in slots.tolist()],
+                    self._features(slots), self._last_seen[slots].copy())
+
+    def _features(self, slots: np.ndarray) -> np.ndarray:
+        count = self._count[slots]
+        pos = self._pos[slots]
+        n = np.minimum(count[:, None], self.windows)[..., None].astype(np.float64)
+
+        mean = self._sum[slots] / n
+        std = np.sqrt(np.maximum(self._sumsq[slots] / n - mean ** 2, 0.0))
+        latest = self._ring[slots, (pos - 1) % self.history].astype(np.float64)
+        # Newest minus oldest sample of each window (of what exists so far)
+        lag = np.minimum(self.windows, count[:, None]) - 1
+        past = self._ring[slots[:, None], (pos[:, None] - 1 - lag) % self.history].astype(np.float64)
+        delta = latest[:, None, :] - past
+
+        blocks = np.concatenate([latest[:, None, :], mean, std, self._ewma[slots], delta], axis=1)
+        return blocks.reshape(len(slots), len(self.feature_names))
+
+    def stats(self) -> Dict:
+        return {
+            "devices": len(self._slots),
+            "max_devices": self.max_devices,
+            "evictions": self.evictions,
+            "windows": self.windows.tolist(),
+            "ewma_alphas": self.ewma_alphas.tolist(),
+            "memory_bytes": sum(a.nbytes for a in (self._ring, self._sum, self._sumsq, self._ewma,
+                                                   self._count, self._pos, self._last_seen)),
+        }
+
+    # Slots
+
+    def _slot(self, device_id: str) -> int:
+        """Slot of a device in the batch being ingested, allocated if new.
+
+        Slots handed out are pinned (last seen at infinity) until the batch
+        is applied, so no device of the batch is evicted for another one.
+        """
+        slot = self._slots.get(device_id)
+        if slot is not None:
+            self._last_seen[slot] = np.inf
+            return slot
+
+        if len(self._slots) < self._capacity:
+            slot = len(self._slots)
+        elif self._capacity < self.max_devices:
+            slot = self._capacity
+            self._allocate(min(self._capacity * 2, self.max_devices))
+        else:
+            slot = int(np.argmin(self._last_seen))
+            if self._last_seen[slot] == np.inf:
+                return -1  # every slot is taken by a device in the current batch
+            del self._slots[self._device_ids[slot]]
+            self.evictions += 1
+
+        self._slots[device_id] = slot
+        self._device_ids[slot] = device_id
+        self._count[slot] = 0
+        self._pos[slot] = 0
+        self._sum[slot] = 0.0
+        self._sumsq[slot] = 0.0
+        self._last_seen[slot] = np.inf
+        return slot
+
+    def _allocate(self, capacity: int) -> None:
+        n_windows, n_alphas, n_columns = len(self.windows), len(self.ewma_alphas), len(self.columns)
+
+        def grow(array: Optional[np.ndarray], shape: Tuple, dtype) -> np.ndarray:
+            resized = np.zeros((capacity,) + shape, dtype=dtype)
+            if array is not None:
+                resized[:len(array)] = array
+            return resized
+
+        self._ring = grow(getattr(self, "_ring", None), (self.history, n_columns), np.float32)
+        self._sum = grow(getattr(self, "_sum", None), (n_windows, n_columns), np.float64)
+        self._sumsq = grow(getattr(self, "_sumsq", None), (n_windows, n_columns), np.float64)
+        self._ewma = grow(getattr(self, "_ewma", None), (n_alphas, n_columns), np.float64)
+        self._count = grow(getattr(self, "_count", None), (), np.int64)
+        self._pos = grow(getattr(self, "_pos", None), (), np.int64)
+        self._last_seen = grow(getattr(self, "_last_seen", None), (), np.float64)
+        self._device_ids.extend([None] * (capacity - self._capacity))
+        self._capacity = capacity
+
+
+def new_feature_store(max_devices: Optional[int] = None) -> DeviceFeatureStore:
+    """A store with the configured windows; ``max_devices`` overrides the limit."""
+    return DeviceFeatureStore(
+        windows=settings.FEATURE_STORE_WINDOWS,
+        ewma_alphas=settings.FEATURE_STORE_EWMA_ALPHAS,
+        max_devices=max_devices or settings.FEATURE_STORE_MAX_DEVICES,
+    )
+
+
+def forecast_inputs(features: np.ndarray, observed_at: np.ndarray, hours_ahead: np.ndarray) -> np.ndarray:
+    """Forecast input rows: store features, horizon and target hour of day.
+
+    ``hours_ahead`` is measured from ``observed_at``, the epoch time of the
+    sample the features describe.
+    """
+    hours_ahead = np.broadcast_to(np.asarray(hours_ahead, dtype=np.float64), (len(features),))
+    target_hour = ((np.asarray(observed_at, dtype=np.float64) + hours_ahead * 3600.0) % 86400.0) / 3600.0
+    angle = 2.0 * math.pi * target_hour / 24.0
+    return np.column_stack([features, hours_ahead, np.sin(angle), np.cos(angle)])
+
+
+def forecast_training_set(
+    device_ids: np.ndarray,
+    timestamps: np.ndarray,
+    X: np.ndarray,
+    horizons_hours: Sequence[float],
+    max_rows: Optional[int] = None,
+    seed: int = 42,
+) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Replay telemetry history into ``(inputs, targets, feature_names)``.
+
+    ``X`` holds TELEMETRY_FEATURES columns. Every row is paired, for each
+    horizon, with the same device's first sample at least that far ahead;
+    pairs whose target sample is more than a quarter of the horizon late
+    are dropped. Targets are the FORECAST_TARGETS columns of that sample.
+    """
+    store = new_feature_store(max_devices=len(set(device_ids)) or 1)
+    feature_names = store.feature_names + FORECAST_INPUTS
+    if not len(X):
+        return np.empty((0, len(feature_names))), np.empty((0, len(FORECAST_TARGETS))), feature_names
+
+    device_ids = np.asarray(device_ids, dtype=object)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    codes = np.unique(device_ids.astype(str), return_inverse=True)[1]
+    order = np.lexsort((timestamps, codes))
+    codes, timestamps, X = codes[order], timestamps[order], X[order]
+
+    features = store.update(device_ids[order], timestamps, X, return_features=True)
+    target_idx = [TELEMETRY_FEATURES.index(col) for col in FORECAST_TARGETS]
+
+    # Rows are sorted by (device, time); spacing devices further apart than
+    # any search lets one searchsorted find the next sample of the same device
+    elapsed = timestamps - timestamps.min()
+    keys = codes * (elapsed.max() + max(horizons_hours, default=0) * 3600.0 + 1.0) + elapsed
+    inputs, targets = [], []
+    for hours in horizons_hours:
+        ahead = hours * 3600.0
+        j = np.searchsorted(keys, keys + ahead)
+        ok = j < len(keys)
+        j = np.minimum(j, len(keys) - 1)
+        ok &= (codes[j] == codes) & (timestamps[j] - timestamps - ahead <= ahead / 4.0)
+        rows = np.flatnonzero(ok)
+        inputs.append(forecast_inputs(features[rows], timestamps[rows], hours))
+        targets.append(X[j[rows]][:, target_idx])
+
+    inputs = np.concatenate(inputs) if inputs else np.empty((0, len(feature_names)))
+    targets = np.concatenate(targets) if targets else np.empty((0, len(FORECAST_TARGETS)))
+    if max_rows and len(inputs) > max_rows:
+        keep = np.random.default_rng(seed).choice(len(inputs), size=max_rows, replace=False)
+        inputs, targets = inputs[keep], targets[keep]
+    return inputs, targets, feature_names
+
+
+device_feature_store = new_feature_store()
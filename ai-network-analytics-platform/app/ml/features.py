@@ -0,0 +1,35 @@
+from typing import Dict, List, Union
+
+import numpy as np
+
+# Union of telemetry fields consumed by the models, in batch matrix column order
+TELEMETRY_FEATURES = [
+    'packet_rate', 'error_rate', 'latency_p95', 'throughput',
+    'cpu_usage', 'memory_usage', 'bandwidth_usage'
+]
+
+
+def build_feature_matrix(records: Union[List[Dict], Dict[str, List]],
+                         columns: List[str] = TELEMETRY_FEATURES) -> np.ndarray:
+    """Assemble a float64 feature matrix from row-wise or columnar telemetry.
+
+    ``records`` is either a list of telemetry dicts or a mapping of feature
+    name to a list of values. Columns are returned in the order of ``columns``.
+    """
+    if isinstance(records, dict):
+        missing = [col for col in columns if col not in records]
+        if missing:
+            raise ValueError(f"Missing feature columns: {', '.join(missing)}")
+        if len({len(records[col]) for col in columns}) > 1:
+            raise ValueError("Columnar payload has columns of different lengths")
+        return np.column_stack([
+            np.asarray(records[col], dtype=np.float64) for col in columns
+        ])
+
+    X = np.empty((len(records), len(columns)), dtype=np.float64)
+    for i, record in enumerate(records):
+        try:
+            X[i] = [record[col] for col in columns]
+        except KeyError as e:
+            raise ValueError(f"Record {i} is missing feature {e}") from None
+    return X
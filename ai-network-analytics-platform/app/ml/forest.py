@@ -0,0 +1,261 @@
+"""Dependency-light inference for tree ensembles.
+
+Fitted scikit-learn forests are exported (see ``compile_forest`` in
+``app.ml.models``) into flat NumPy node arrays and scored here with a
+vectorized traversal. This module only needs NumPy (prometheus-client is
+optional, for stage timings), so inference workers can serve compiled
+models without importing scikit-learn.
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.metrics import timed
+
+# Subdirectory of a registry version holding the compiled models
+COMPILED_DIR = "compiled"
+FOREST_ARRAYS = ("feature", "threshold", "left", "right", "missing_left", "value", "roots")
+# Quantiles kept in an anomaly score calibration table
+CALIBRATION_POINTS = 1001
+
+
+def average_path_length(n_samples: int) -> float:
+    """Average path length of an unsuccessful BST search in ``n_samples`` nodes.
+
+    Mirrors scikit-learn's isolation forest normalisation, operation for
+    operation, so scores match exactly.
+    """
+    n = np.asarray([n_samples])
+    if n[0] <= 1:
+        return 0.0
+    if n[0] == 2:
+        return 1.0
+    return float((2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n)[0])
+
+
+def calibration_table(scores: np.ndarray, points: int = CALIBRATION_POINTS) -> np.ndarray:
+    """Evenly spaced quantiles of training ``score_samples`` values, ascending."""
+    return np.quantile(np.asarray(scores, dtype=np.float64), np.linspace(0.0, 1.0, points))
+
+
+def calibrate_anomaly_scores(raw: np.ndarray, offset: float,
+                             calibration: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Turn isolation forest ``score_samples`` values into calibrated outputs.
+
+    Returns ``(anomaly_score, is_anomaly, confidence)``. ``anomaly_score`` is
+    the share of training rows that looked less anomalous, so 0.97 means
+    "more unusual than 97% of the training data". ``is_anomaly`` is the
+    model's own decision (``score_samples - offset < 0``), and
+    ``confidence`` is how far the row sits from that decision boundary, as a
+    fraction of the calibrated distance to 0 or 1. Without a calibration
+    table the score falls back to 0/1 and the confidence to the decision
+    margin relative to the offset.
+    """
+    decision = raw - offset
+    is_anomaly = decision < 0
+    if calibration is None:
+        confidence = np.minimum(np.abs(decision) / max(abs(offset), 1e-12), 1.0)
+        return is_anomaly.astype(np.float64), is_anomaly, confidence
+
+    quantiles = np.linspace(0.0, 1.0, len(calibration))
+    anomaly_score = 1.0 - np.interp(raw, calibration, quantiles)
+    boundary = 1.0 - float(np.interp(offset, calibration, quantiles))
+    confidence = np.where(
+        is_anomaly,
+        (anomaly_score - boundary) / max(1.0 - boundary, 1e-12),
+        (boundary - anomaly_score) / max(boundary, 1e-12),
+    )
+    return anomaly_score, is_anomaly, np.clip(confidence, 0.0, 1.0)
+
+
+def prediction_interval(per_tree: np.ndarray, coverage: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Forest mean and a ``coverage`` interval from ``(n_trees, n_rows)`` predictions.
+
+    The mean is accumulated tree by tree, matching scikit-learn's
+    ``predict``; the bounds are empirical quantiles of the trees' outputs.
+    """
+    mean = np.cumsum(per_tree, axis=0)[-1] / len(per_tree)
+    tail = (1.0 - coverage) / 2.0
+    lower, upper = np.quantile(per_tree, [tail, 1.0 - tail], axis=0)
+    return mean, lower, upper
+
+
+class CompiledForest:
+    """Trees of a fitted forest flattened into contiguous node arrays.
+
+    Node ``i`` of the concatenated trees splits on ``feature[i]`` at
+    ``threshold[i]`` and continues at ``left[i]`` or ``right[i]``. Leaves
+    point to themselves, so every row can be advanced ``max_depth`` times
+    without tracking which rows have already reached a leaf. ``value[i]`` is
+    what a leaf contributes to the forest output; ``roots[t]`` is the first
+    node of tree ``t``.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, left: np.ndarray,
+                 right: np.ndarray, missing_left: np.ndarray, value: np.ndarray,
+                 roots: np.ndarray, max_depth: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.missing_left = missing_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = max_depth
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    def apply(self, X: np.ndarray) -> np.ndarray:
+        """Leaf index of every row in every tree, shape ``(n_trees, n_rows)``.
+
+        Rows are compared as float32 against float64 thresholds, exactly as
+        scikit-learn does, and NaNs follow the trained missing-value branch.
+        """
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        has_nan = bool(np.isnan(flat).any())
+
+        # Tree-major layout: entry t * n_rows + r is row r in tree t
+        nodes = np.repeat(self.roots, n_rows)
+        row_offsets = np.tile(np.arange(n_rows, dtype=np.int64) * n_features, self.n_trees)
+        for _ in range(self.max_depth):
+            x = flat[row_offsets + self.feature[nodes]]
+            go_left = x <= self.threshold[nodes]
+            if has_nan:
+                go_left |= np.isnan(x) & self.missing_left[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes.reshape(self.n_trees, n_rows)
+
+    def leaf_values(self, X: np.ndarray) -> np.ndarray:
+        """Value of the leaf each row reaches in each tree, ``(n_trees, n_rows)``."""
+        return self.value[self.apply(X)]
+
+    def sum_values(self, X: np.ndarray) -> np.ndarray:
+        """Sum of leaf values over the trees, accumulated in tree order.
+
+        The cumulative sum adds one tree at a time, like scikit-learn's
+        accumulation, so the floating-point result is identical.
+        """
+        return np.cumsum(self.leaf_values(X), axis=0)[-1]
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for name in FOREST_ARRAYS:
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(directory, "forest.json"), "w") as f:
+            json.dump({"max_depth": self.max_depth}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = None) -> "CompiledForest":
+        arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in FOREST_ARRAYS}
+        with open(os.path.join(directory, "forest.json")) as f:
+            max_depth = json.load(f)["max_depth"]
+        return cls(max_depth=max_depth, **arrays)
+
+
+class _CompiledModel:
+    """A StandardScaler followed by a compiled forest."""
+
+    is_trained = True
+    name = "compiled"  # component label of timing metrics
+
+    def __init__(self, feature_columns: List[str], mean: np.ndarray, scale: np.ndarray,
+                 forest: CompiledForest, params: Optional[Dict] = None):
+        self.feature_columns = list(feature_columns)
+        self.mean = mean
+        self.scale = scale
+        self.forest = forest
+        self.params = params or {}
+
+    def _scale(self, X: np.ndarray) -> np.ndarray:
+        # Same operations as StandardScaler.transform
+        with timed("scaler_transform", self.name):
+            X_scaled = np.asarray(X, dtype=np.float64) - self.mean
+            X_scaled /= self.scale
+        return X_scaled
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        self.forest.save(os.path.join(directory, "forest"))
+        np.save(os.path.join(directory, "scaler_mean.npy"), self.mean)
+        np.save(os.path.join(directory, "scaler_scale.npy"), self.scale)
+        with open(os.path.join(directory, "model.json"), "w") as f:
+            json.dump({"feature_columns": self.feature_columns, "params": self.params}, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = None):
+        with open(os.path.join(directory, "model.json")) as f:
+            meta = json.load(f)
+        return cls(
+            meta["feature_columns"],
+            np.load(os.path.join(directory, "scaler_mean.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(directory, "scaler_scale.npy"), mmap_mode=mmap_mode),
+            CompiledForest.load(os.path.join(directory, "forest"), mmap_mode=mmap_mode),
+            meta["params"],
+        )
+
+
+class CompiledAnomalyDetector(_CompiledModel):
+    """Isolation forest scoring; ``params`` holds ``offset`` and ``denominator``."""
+
+    calibration: Optional[np.ndarray] = None
+    name = "anomaly_detector"
+
+    def score_samples(self, X: np.ndarray) -> np.ndarray:
+        """Same values as ``IsolationForest.score_samples`` (lower is more abnormal)."""
+        X_scaled = self._scale(X)
+        with timed("model_predict", self.name):
+            depths = self.forest.sum_values(X_scaled)
+        denominator = self.params["denominator"]
+        scores = 2 ** (-np.divide(depths, denominator, out=np.ones_like(depths),
+                                  where=denominator != 0))
+        return -scores
+
+    def score_anomalies_array(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(anomaly_score, is_anomaly, confidence)``, see ``calibrate_anomaly_scores``."""
+        return calibrate_anomaly_scores(self.score_samples(X), self.params["offset"], self.calibration)
+
+    def predict_anomalies_array(self, X: np.ndarray) -> np.ndarray:
+        """1 for anomalies, 0 for normal rows, as NetworkAnomalyDetector returns."""
+        decision = self.score_samples(X) - self.params["offset"]
+        return np.where(decision < 0, 1, 0)
+
+    def save(self, directory: str) -> None:
+        super().save(directory)
+        if self.calibration is not None:
+            np.save(os.path.join(directory, "calibration.npy"), self.calibration)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = None):
+        model = super().load(directory, mmap_mode)
+        path = os.path.join(directory, "calibration.npy")
+        if os.path.exists(path):
+            model.calibration = np.load(path, mmap_mode=mmap_mode)
+        return model
+
+
+class CompiledPerformancePredictor(_CompiledModel):
+    """Random forest regression: the mean of the trees' leaf values."""
+
+    name = "performance_predictor"
+
+    def predict_performance_array(self, X: np.ndarray) -> np.ndarray:
+        X_scaled = self._scale(X)
+        with timed("model_predict", self.name):
+            return self.forest.sum_values(X_scaled) / self.forest.n_trees
+
+    def predict_performance_interval_array(
+        self, X: np.ndarray, coverage: float = 0.9
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(prediction, lower, upper)`` from one traversal of the forest."""
+        X_scaled = self._scale(X)
+        with timed("model_predict", self.name):
+            per_tree = self.forest.leaf_values(X_scaled)
+        return prediction_interval(per_tree, coverage)
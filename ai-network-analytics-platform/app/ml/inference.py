@@ -0,0 +1,74 @@
+"""Batch analysis that only needs NumPy.
+
+Kept apart from ``app.ml.models`` so inference workers serving compiled
+models never import pandas or scikit-learn.
+"""
+
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import timed
+from app.ml.features import TELEMETRY_FEATURES, build_feature_matrix
+from app.ml.registry import ModelBundle, ModelNotReady, model_registry
+
+
+def analyze_network_batch(records: Union[List[Dict], Dict[str, List]]) -> List[Dict]:
+    """Analyze a batch of network telemetry with one pass over each model.
+
+    Produces the same per-record values as ``analyze_network_data``.
+    """
+    with timed("feature_matrix_build"):
+        X = build_feature_matrix(records)
+    if X.shape[0] == 0:
+        return []
+    return analysis_results(*score_feature_matrix(X))
+
+
+def score_feature_matrix(X: np.ndarray, bundle: Optional[ModelBundle] = None) -> Tuple[
+        Tuple[np.ndarray, np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """Anomaly and latency outputs for a matrix with TELEMETRY_FEATURES columns.
+
+    Returns the ``score_anomalies_array`` and
+    ``predict_performance_interval_array`` outputs of ``bundle`` (the
+    active one by default), for callers that only need some rows as dicts.
+    """
+    # One snapshot for the whole batch, so every row sees the same version
+    bundle = bundle or model_registry.active
+    if bundle is None:
+        raise ModelNotReady("Models not trained or loaded")
+    detector, predictor = bundle.anomaly_detector, bundle.performance_predictor
+    anomaly_idx = [TELEMETRY_FEATURES.index(col) for col in detector.feature_columns]
+    performance_idx = [TELEMETRY_FEATURES.index(col) for col in predictor.feature_columns]
+
+    anomaly = detector.score_anomalies_array(X[:, anomaly_idx])
+    performance = predictor.predict_performance_interval_array(
+        X[:, performance_idx], settings.PREDICTION_INTERVAL_COVERAGE
+    )
+    return anomaly, performance
+
+
+def analysis_results(anomaly: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                     performance: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> List[Dict]:
+    """Per-row result dicts from ``score_anomalies_array`` and
+    ``predict_performance_interval_array`` outputs.
+
+    ``model_confidence`` is the confidence of the anomaly decision.
+    """
+    scores, flags, confidence = (values.tolist() for values in anomaly)
+    predicted, lower, upper = (values.tolist() for values in performance)
+
+    timestamp = datetime.utcnow().isoformat()
+    return [
+        {
+            "anomaly_score": scores[i],
+            "is_anomaly": flags[i],
+            "predicted_latency": predicted[i],
+            "predicted_latency_interval": [lower[i], upper[i]],
+            "analysis_timestamp": timestamp,
+            "model_confidence": confidence[i],
+        }
+        for i in range(len(scores))
+    ]
@@ -4,13 +4,76 @@ from sklearn.ensemble import IsolationForest, RandomForestRegressor
 from sklearn.preprocessing import StandardScaler
 import joblib
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Tuple, Optional
 import logging
 from datetime import datetime
 
+from app.core.config import settings
+from app.core.metrics import timed
+from app.ml.features import TELEMETRY_FEATURES
+from app.ml.feature_store import (
+    FORECAST_INPUTS, FORECAST_TARGETS, device_feature_store, forecast_inputs, forecast_training_set
+)
+from app.ml.inference import analysis_results, analyze_network_batch  # noqa: F401  (re-exported)
+from app.ml.forest import (
+    COMPILED_DIR, CompiledAnomalyDetector, CompiledForest, CompiledPerformancePredictor,
+    average_path_length, calibrate_anomaly_scores, calibration_table, prediction_interval
+)
+from app.ml.registry import ModelBundle, ModelNotReady, model_registry
+
 logger = logging.getLogger(__name__)
 
 
+def compile_forest(model) -> CompiledForest:
+    """Flatten the trees of a fitted forest into contiguous node arrays.
+
+    Regression forests store each leaf's prediction as its value; isolation
+    forests store each leaf's path length contribution, so both are scored
+    by summing leaf values over the trees.
+    """
+    isolation = hasattr(model, "_decision_path_lengths")
+    subsample_features = isolation and model._max_features != model.n_features_in_
+
+    features, thresholds, lefts, rights, missing, values, roots = [], [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for i, estimator in enumerate(model.estimators_):
+        tree = estimator.tree_
+        nodes = tree.__getstate__()["nodes"]
+        node_ids = np.arange(tree.node_count, dtype=np.int64)
+        is_leaf = nodes["left_child"] == -1
+
+        feature = nodes["feature"].astype(np.int64)
+        if subsample_features:
+            feature = np.asarray(model.estimators_features_[i], dtype=np.int64)[np.where(is_leaf, 0, feature)]
+        features.append(np.where(is_leaf, 0, feature))
+        thresholds.append(nodes["threshold"])
+        lefts.append(np.where(is_leaf, node_ids, nodes["left_child"]) + offset)
+        rights.append(np.where(is_leaf, node_ids, nodes["right_child"]) + offset)
+        missing.append(nodes["missing_go_to_left"].astype(bool) if "missing_go_to_left" in nodes.dtype.names
+                       else np.zeros(tree.node_count, dtype=bool))
+        if isolation:
+            values.append(model._decision_path_lengths[i] + model._average_path_length_per_tree[i] - 1.0)
+        else:
+            values.append(tree.value[:, 0, 0])
+
+        roots.append(offset)
+        offset += tree.node_count
+        max_depth = max(max_depth, tree.max_depth)
+
+    return CompiledForest(
+        feature=np.concatenate(features),
+        threshold=np.concatenate(thresholds).astype(np.float64),
+        left=np.concatenate(lefts),
+        right=np.concatenate(rights),
+        missing_left=np.concatenate(missing),
+        value=np.concatenate(values).astype(np.float64),
+        roots=np.asarray(roots, dtype=np.int64),
+        max_depth=max_depth,
+    )
+
+
 class NetworkAnomalyDetector:
     """Machine learning model for network anomaly detection."""
 
@@ -23,13 +86,61 @@ class NetworkAnomalyDetector:
             'throughput', 'cpu_usage', 'memory_usage'
         ]
         self.is_trained = False
-
-    def load_model(self) -> bool:
-        """Load pre-trained model from disk."""
+        self.n_jobs: Optional[int] = None  # cores used while fitting
+        self.last_updated: Optional[datetime] = None
+        self.training_duration: Optional[float] = None
+        self.metrics: Dict = {}
+        self.compiled: Optional[CompiledAnomalyDetector] = None
+        # Quantiles of training score_samples values, for percentile lookup
+        self.calibration: Optional[np.ndarray] = None
+
+    def compile_model(self) -> None:
+        """Export the fitted model and scaler to the NumPy inference engine."""
+        self.compiled = CompiledAnomalyDetector(
+            self.feature_columns, self.scaler.mean_, self.scaler.scale_, compile_forest(self.model),
+            {
+                "offset": float(self.model.offset_),
+                "denominator": len(self.model.estimators_) * average_path_length(self.model._max_samples),
+            }
+        )
+        self.compiled.calibration = self.calibration
+
+    def _use_compiled(self, n_rows: int) -> bool:
+        # The NumPy traversal wins on small batches; scikit-learn's C loop on large ones
+        return (self.compiled is not None and settings.INFERENCE_ENGINE == "compiled"
+                and n_rows <= settings.INFERENCE_COMPILED_MAX_ROWS)
+
+    def save_model(self, directory: str) -> None:
+        """Write the model, its scaler and the compiled model into ``directory``."""
+        joblib.dump(self.model, os.path.join(directory, 'anomaly_detector.joblib'))
+        joblib.dump(self.scaler, os.path.join(directory, 'anomaly_scaler.joblib'))
+        if self.calibration is not None:
+            np.save(os.path.join(directory, 'anomaly_calibration.npy'), self.calibration)
+        if self.compiled is not None:
+            self.compiled.save(os.path.join(directory, COMPILED_DIR, 'anomaly_detector'))
+
+    def load_model(self, directory: Optional[str] = None, mmap_mode: Optional[str] = None) -> bool:
+        """Load a pre-trained model and its scaler from disk.
+
+        With ``mmap_mode='r'`` numpy arrays are memory-mapped read-only, so
+        processes loading the same version share their pages.
+        """
+        directory = directory or self.model_path
         try:
-            model_file = os.path.join(self.model_path, 'anomaly_detector.joblib')
-            if os.path.exists(model_file):
-                self.model = joblib.load(model_file)
+            model_file = os.path.join(directory, 'anomaly_detector.joblib')
+            scaler_file = os.path.join(directory, 'anomaly_scaler.joblib')
+            if os.path.exists(model_file) and os.path.exists(scaler_file):
+                self.model = joblib.load(model_file, mmap_mode=mmap_mode)
+                self.scaler = joblib.load(scaler_file, mmap_mode=mmap_mode)
+                calibration_file = os.path.join(directory, 'anomaly_calibration.npy')
+                if os.path.exists(calibration_file):
+                    self.calibration = np.load(calibration_file, mmap_mode=mmap_mode)
+                compiled_dir = os.path.join(directory, COMPILED_DIR, 'anomaly_detector')
+                if os.path.isdir(compiled_dir):
+                    self.compiled = CompiledAnomalyDetector.load(compiled_dir, mmap_mode=mmap_mode)
+                else:
+                    self.compile_model()
+                self.is_trained = True
                 logger.info("Anomaly detection model loaded successfully")
                 return True
             else:
@@ -44,7 +155,15 @@ class NetworkAnomalyDetector:
         try:
             # Prepare features
             X = training_data[self.feature_columns].values
+        except Exception as e:
+            logger.error(f"Error training model: {e}")
+            return False
 
+        return self.train_model_array(X)
+
+    def train_model_array(self, X: np.ndarray) -> bool:
+        """Train on a raw feature matrix ordered by feature_columns."""
+        try:
             # Scale features
             X_scaled = self.scaler.fit_transform(X)
 
@@ -52,18 +171,21 @@ class NetworkAnomalyDetector:
             self.model = IsolationForest(
                 n_estimators=100,
                 contamination=0.1,
-                random_state=42
+                random_state=42,
+                n_jobs=self.n_jobs
             )
 
+            start = time.perf_counter()
             self.model.fit(X_scaled)
-
-            # Save model
-            os.makedirs(self.model_path, exist_ok=True)
-            joblib.dump(self.model, os.path.join(self.model_path, 'anomaly_detector.joblib'))
-            joblib.dump(self.scaler, os.path.join(self.model_path, 'scaler.joblib'))
+            self.training_duration = time.perf_counter() - start
+            self.last_updated = datetime.utcnow()
+            # Single-row inference is faster without a worker pool
+            self.model.set_params(n_jobs=None)
+            self.calibration = calibration_table(self.model.score_samples(X_scaled))
+            self.compile_model()
 
             self.is_trained = True
-            logger.info("Anomaly detection model trained and saved")
+            logger.info("Anomaly detection model trained")
             return True
 
         except Exception as e:
@@ -73,14 +195,31 @@ class NetworkAnomalyDetector:
     def predict_anomalies(self, data: pd.DataFrame) -> np.ndarray:
         """Predict anomalies in network data."""
         if not self.model or not self.is_trained:
-            raise ValueError("Model not trained or loaded")
+            raise ModelNotReady("Model not trained or loaded")
 
         try:
             X = data[self.feature_columns].values
-            X_scaled = self.scaler.transform(X)
+        except Exception as e:
+            logger.error(f"Error predicting anomalies: {e}")
+            return np.zeros(len(data))
+
+        return self.predict_anomalies_array(X)
+
+    def predict_anomalies_array(self, X: np.ndarray) -> np.ndarray:
+        """Predict anomalies for a raw feature matrix ordered by feature_columns."""
+        if not self.model or not self.is_trained:
+            raise ModelNotReady("Model not trained or loaded")
+
+        try:
+            if self._use_compiled(len(X)):
+                return self.compiled.predict_anomalies_array(X)
+
+            with timed("scaler_transform", "anomaly_detector"):
+                X_scaled = self.scaler.transform(X)
 
             # Predict anomalies (-1 for anomalies, 1 for normal)
-            predictions = self.model.predict(X_scaled)
+            with timed("model_predict", "anomaly_detector"):
+                predictions = self.model.predict(X_scaled)
 
             # Convert to anomaly scores (0 for normal, 1 for anomaly)
             anomaly_scores = np.where(predictions == -1, 1, 0)
@@ -89,7 +228,37 @@ class NetworkAnomalyDetector:
 
         except Exception as e:
             logger.error(f"Error predicting anomalies: {e}")
-            return np.zeros(len(data))
+            return np.zeros(len(X))
+
+    def score_anomalies(self, data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Calibrated anomaly scores, decisions and confidences for network data."""
+        if not self.model or not self.is_trained:
+            raise ModelNotReady("Model not trained or loaded")
+
+        return self.score_anomalies_array(data[self.feature_columns].values)
+
+    def score_anomalies_array(self, X: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(anomaly_score, is_anomaly, confidence)`` from one pass over the forest.
+
+        ``anomaly_score`` is the row's percentile among the training scores,
+        looked up in the calibration table; see ``calibrate_anomaly_scores``.
+        """
+        if not self.model or not self.is_trained:
+            raise ModelNotReady("Model not trained or loaded")
+
+        try:
+            if self._use_compiled(len(X)):
+                return self.compiled.score_anomalies_array(X)
+
+            with timed("scaler_transform", "anomaly_detector"):
+                X_scaled = self.scaler.transform(X)
+            with timed("model_predict", "anomaly_detector"):
+                raw = self.model.score_samples(X_scaled)
+            return calibrate_anomaly_scores(raw, self.model.offset_, self.calibration)
+
+        except Exception as e:
+            logger.error(f"Error scoring anomalies: {e}")
+            return np.zeros(len(X)), np.zeros(len(X), dtype=bool), np.zeros(len(X))
 
 
 class NetworkPerformancePredictor:
@@ -99,23 +268,91 @@ class NetworkPerformancePredictor:
         self.model_path = model_path
         self.model = None
         self.scaler = StandardScaler()
+        self.feature_columns = [
+            'packet_rate', 'error_rate', 'cpu_usage',
+            'memory_usage', 'bandwidth_usage'
+        ]
         self.is_trained = False
+        self.n_jobs: Optional[int] = None  # cores used while fitting
+        self.last_updated: Optional[datetime] = None
+        self.training_duration: Optional[float] = None
+        self.metrics: Dict = {}
+        self.compiled: Optional[CompiledPerformancePredictor] = None
+        # Forecasts FORECAST_TARGETS from rolling device features and a horizon
+        self.forecaster = None
+        self.forecast_feature_names: List[str] = []
+
+    def compile_model(self) -> None:
+        """Export the fitted model and scaler to the NumPy inference engine."""
+        self.compiled = CompiledPerformancePredictor(
+            self.feature_columns, self.scaler.mean_, self.scaler.scale_, compile_forest(self.model)
+        )
+
+    def _use_compiled(self, n_rows: int) -> bool:
+        # The NumPy traversal wins on small batches; scikit-learn's C loop on large ones
+        return (self.compiled is not None and settings.INFERENCE_ENGINE == "compiled"
+                and n_rows <= settings.INFERENCE_COMPILED_MAX_ROWS)
+
+    def save_model(self, directory: str) -> None:
+        """Write the model, its scaler and the compiled model into ``directory``."""
+        joblib.dump(self.model, os.path.join(directory, 'performance_predictor.joblib'))
+        joblib.dump(self.scaler, os.path.join(directory, 'performance_scaler.joblib'))
+        if self.forecaster is not None:
+            joblib.dump({"model": self.forecaster, "feature_names": self.forecast_feature_names},
+                        os.path.join(directory, 'performance_forecaster.joblib'))
+        if self.compiled is not None:
+            self.compiled.save(os.path.join(directory, COMPILED_DIR, 'performance_predictor'))
+
+    def load_model(self, directory: Optional[str] = None, mmap_mode: Optional[str] = None) -> bool:
+        """Load a pre-trained model and its scaler from disk.
+
+        With ``mmap_mode='r'`` numpy arrays are memory-mapped read-only, so
+        processes loading the same version share their pages.
+        """
+        directory = directory or self.model_path
+        try:
+            model_file = os.path.join(directory, 'performance_predictor.joblib')
+            scaler_file = os.path.join(directory, 'performance_scaler.joblib')
+            if os.path.exists(model_file) and os.path.exists(scaler_file):
+                self.model = joblib.load(model_file, mmap_mode=mmap_mode)
+                self.scaler = joblib.load(scaler_file, mmap_mode=mmap_mode)
+                forecaster_file = os.path.join(directory, 'performance_forecaster.joblib')
+                if os.path.exists(forecaster_file):
+                    forecaster = joblib.load(forecaster_file, mmap_mode=mmap_mode)
+                    self.forecaster = forecaster["model"]
+                    self.forecast_feature_names = forecaster["feature_names"]
+                compiled_dir = os.path.join(directory, COMPILED_DIR, 'performance_predictor')
+                if os.path.isdir(compiled_dir):
+                    self.compiled = CompiledPerformancePredictor.load(compiled_dir, mmap_mode=mmap_mode)
+                else:
+                    self.compile_model()
+                self.is_trained = True
+                logger.info("Performance prediction model loaded successfully")
+                return True
+            else:
+                logger.warning("No pre-trained performance model found")
+                return False
+        except Exception as e:
+            logger.error(f"Error loading performance model: {e}")
+            return False
 
     def train_model(self, training_data: pd.DataFrame) -> bool:
         """Train the performance prediction model."""
         try:
-            # Features for prediction
-            feature_columns = [
-                'packet_rate', 'error_rate', 'cpu_usage',
-                'memory_usage', 'bandwidth_usage'
-            ]
-
             # Target variable (future latency)
             target_column = 'latency_p95'
 
-            X = training_data[feature_columns].values
+            X = training_data[self.feature_columns].values
             y = training_data[target_column].values
+        except Exception as e:
+            logger.error(f"Error training performance model: {e}")
+            return False
+
+        return self.train_model_array(X, y)
 
+    def train_model_array(self, X: np.ndarray, y: np.ndarray) -> bool:
+        """Train on a raw feature matrix ordered by feature_columns and latency targets."""
+        try:
             # Scale features
             X_scaled = self.scaler.fit_transform(X)
 
@@ -123,18 +360,20 @@ class NetworkPerformancePredictor:
             self.model = RandomForestRegressor(
                 n_estimators=200,
                 max_depth=15,
-                random_state=42
+                random_state=42,
+                n_jobs=self.n_jobs
             )
 
+            start = time.perf_counter()
             self.model.fit(X_scaled, y)
-
-            # Save model
-            os.makedirs(self.model_path, exist_ok=True)
-            joblib.dump(self.model, os.path.join(self.model_path, 'performance_predictor.joblib'))
-            joblib.dump(self.scaler, os.path.join(self.model_path, 'scaler.joblib'))
+            self.training_duration = time.perf_counter() - start
+            self.last_updated = datetime.utcnow()
+            # Single-row inference is faster without a worker pool
+            self.model.set_params(n_jobs=None)
+            self.compile_model()
 
             self.is_trained = True
-            logger.info("Performance prediction model trained and saved")
+            logger.info("Performance prediction model trained")
             return True
 
         except Exception as e:
@@ -144,43 +383,135 @@ class NetworkPerformancePredictor:
     def predict_performance(self, data: pd.DataFrame) -> np.ndarray:
         """Predict future network performance."""
         if not self.model or not self.is_trained:
-            raise ValueError("Performance model not trained or loaded")
+            raise ModelNotReady("Performance model not trained or loaded")
+
+        try:
+            X = data[self.feature_columns].values
+        except Exception as e:
+            logger.error(f"Error predicting performance: {e}")
+            return np.zeros(len(data))
+
+        return self.predict_performance_array(X)
+
+    def predict_performance_array(self, X: np.ndarray) -> np.ndarray:
+        """Predict performance for a raw feature matrix ordered by feature_columns."""
+        if not self.model or not self.is_trained:
+            raise ModelNotReady("Performance model not trained or loaded")
 
         try:
-            feature_columns = [
-                'packet_rate', 'error_rate', 'cpu_usage',
-                'memory_usage', 'bandwidth_usage'
-            ]
+            if self._use_compiled(len(X)):
+                return self.compiled.predict_performance_array(X)
 
-            X = data[feature_columns].values
-            X_scaled = self.scaler.transform(X)
+            with timed("scaler_transform", "performance_predictor"):
+                X_scaled = self.scaler.transform(X)
 
-            predictions = self.model.predict(X_scaled)
+            with timed("model_predict", "performance_predictor"):
+                predictions = self.model.predict(X_scaled)
             return predictions
 
         except Exception as e:
             logger.error(f"Error predicting performance: {e}")
-            return np.zeros(len(data))
+            return np.zeros(len(X))
 
+    def predict_performance_interval(
+        self, data: pd.DataFrame, coverage: float = 0.9
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Predicted latency with a ``coverage`` interval for network data."""
+        if not self.model or not self.is_trained:
+            raise ModelNotReady("Performance model not trained or loaded")
 
-# Global model instances
-anomaly_detector = NetworkAnomalyDetector()
-performance_predictor = NetworkPerformancePredictor()
+        return self.predict_performance_interval_array(data[self.feature_columns].values, coverage)
 
+    def predict_performance_interval_array(
+        self, X: np.ndarray, coverage: float = 0.9
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(prediction, lower, upper)`` from the per-tree outputs of one pass.
 
-def load_models() -> None:
-    """Load all ML models on startup."""
-    global anomaly_detector, performance_predictor
+        The prediction equals ``predict_performance_array``; the bounds are
+        quantiles of the individual trees' predictions.
+        """
+        if not self.model or not self.is_trained:
+            raise ModelNotReady("Performance model not trained or loaded")
 
-    # Try to load existing models
-    anomaly_detector.load_model()
-    performance_predictor.load_model()
+        try:
+            if self._use_compiled(len(X)):
+                return self.compiled.predict_performance_interval_array(X, coverage)
 
-    logger.info("ML models loaded")
+            with timed("scaler_transform", "performance_predictor"):
+                X_scaled = np.ascontiguousarray(self.scaler.transform(X), dtype=np.float32)
+            with timed("model_predict", "performance_predictor"):
+                per_tree = np.stack([tree.predict(X_scaled, check_input=False) for tree in self.model.estimators_])
+            return prediction_interval(per_tree, coverage)
 
+        except Exception as e:
+            logger.error(f"Error predicting performance: {e}")
+            return np.zeros(len(X)), np.zeros(len(X)), np.zeros(len(X))
 
-def train_sample_models() -> None:
-    """Train models with sample data for demonstration."""
+    def train_forecaster_array(self, X: np.ndarray, y: np.ndarray, feature_names: List[str]) -> bool:
+        """Train the forecaster on ``forecast_training_set`` inputs and targets."""
+        try:
+            # Trees need no scaling; bootstrapping at most 5000 rows per tree
+            # keeps fitting time flat as the history grows
+            self.forecaster = RandomForestRegressor(
+                n_estimators=50,
+                max_depth=12,
+                min_samples_leaf=5,
+                max_features=0.2,
+                max_samples=min(1.0, 5000 / len(X)),
+                random_state=42,
+                n_jobs=self.n_jobs
+            )
+            self.forecaster.fit(X, y)
+            self.forecaster.set_params(n_jobs=None)
+            self.forecast_feature_names = list(feature_names)
+            logger.info("Performance forecasting model trained")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error training forecasting model: {e}")
+            return False
+
+    def forecast_array(self, X: np.ndarray, coverage: float = 0.9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """``(prediction, lower, upper)``, each ``(n_rows, len(FORECAST_TARGETS))``.
+
+        Like ``predict_performance_interval_array`` the bounds are quantiles
+        of the per-tree forecasts from the same pass.
+        """
+        if self.forecaster is None:
+            raise ModelNotReady("Forecasting model not trained")
+
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        with timed("model_predict", "forecaster"):
+            per_tree = np.stack([tree.predict(X, check_input=False) for tree in self.forecaster.estimators_])
+        return prediction_interval(per_tree, coverage)
+
+
+# Untrained models are served until a version is loaded or published. A
+# worker may already have installed compiled models before importing this.
+if model_registry.active is None:
+    model_registry.install(ModelBundle(
+        None,
+        NetworkAnomalyDetector(settings.ML_MODEL_PATH),
+        NetworkPerformancePredictor(settings.ML_MODEL_PATH),
+    ))
+
+
+def load_models() -> None:
+    """Load the active model version on startup."""
+    try:
+        bundle = model_registry.load_current()
+    except Exception as e:
+        logger.error(f"Error loading active model version: {e}")
+        return
+
+    if bundle is None:
+        logger.warning("No model version published yet")
+    else:
+        logger.info(f"ML models loaded (version {bundle.version})")
+
+
+def _sample_training_data() -> pd.DataFrame:
+    """Synthetic telemetry with injected anomalies, for demonstration."""
     # Create sample training data
     np.random.seed(42)
     n_samples = 1000
@@ -201,31 +532,236 @@ def train_sample_models() -> None:
     sample_data.loc[anomaly_indices, 'error_rate'] *= 10
     sample_data.loc[anomaly_indices, 'latency_p95'] *= 2
 
-    # Train models
-    anomaly_detector.train_model(sample_data)
-    performance_predictor.train_model(sample_data)
+    return sample_data
+
+
+def _sample_training_series() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Synthetic week of 5-minute telemetry per device with a daily load cycle."""
+    rng = np.random.default_rng(42)
+    n_devices, n_steps, step = 8, 7 * 288, 300.0
+
+    timestamps = 1704067200.0 + np.arange(n_steps) * step
+    hour = (timestamps % 86400.0) / 3600.0
+    load = 0.5 + 0.4 * np.sin(2 * np.pi * (hour - 9.0) / 24.0)
+
+    device_ids, series = [], []
+    for device in range(n_devices):
+        scale = rng.uniform(0.7, 1.3)
+        # Slowly wandering congestion on top of the daily cycle
+        congestion = np.cumsum(rng.normal(0, 0.02, n_steps))
+        congestion -= np.linspace(congestion[0], congestion[-1], n_steps)
+        busy = np.clip(load + congestion, 0.05, 1.2)
+        columns = {
+            'packet_rate': 1000 * scale * (0.6 + busy) + rng.normal(0, 50, n_steps),
+            'error_rate': 0.01 * (0.5 + busy) + rng.normal(0, 0.002, n_steps),
+            'latency_p95': 25 + 45 * busy * scale + rng.normal(0, 3, n_steps),
+            'throughput': 500 * scale * (1.3 - 0.5 * busy) + rng.normal(0, 20, n_steps),
+            'cpu_usage': 35 + 40 * busy + rng.normal(0, 4, n_steps),
+            'memory_usage': 60 + 15 * busy + rng.normal(0, 3, n_steps),
+            'bandwidth_usage': 20 + 50 * busy + rng.normal(0, 4, n_steps),
+        }
+        device_ids.append(np.full(n_steps, f"router_{device + 1:02d}", dtype=object))
+        series.append(np.column_stack([columns[col] for col in TELEMETRY_FEATURES]))
+
+    return np.concatenate(device_ids), np.tile(timestamps, n_devices), np.concatenate(series)
+
+
+def load_training_series() -> Tuple[np.ndarray, np.ndarray, np.ndarray, str]:
+    """Per-device telemetry history for the forecaster, and where it came from.
+
+    Returns ``(device_ids, timestamps, X, source)`` with X ordered by
+    TELEMETRY_FEATURES, falling back to synthetic series when the archive
+    has too little complete data.
+    """
+    from datetime import timedelta
+
+    from app.storage.archive import telemetry_archive
+
+    device_ids, timestamps, X = telemetry_archive.read_series(
+        TELEMETRY_FEATURES,
+        start_time=datetime.utcnow() - timedelta(days=settings.TRAINING_WINDOW_DAYS),
+        max_rows=settings.TRAINING_MAX_ROWS,
+    )
+    complete = ~np.isnan(X).any(axis=1)
+    if complete.sum() >= settings.TRAINING_MIN_ROWS:
+        return device_ids[complete], timestamps[complete], X[complete], "archive"
+    return (*_sample_training_series(), "sample")
+
+
+def fit_forecaster(predictor: "NetworkPerformancePredictor", device_ids: np.ndarray,
+                   timestamps: np.ndarray, X: np.ndarray) -> Dict:
+    """Fit the predictor's forecaster on replayed per-device history.
+
+    Leaves the forecaster untouched when the history yields fewer than
+    TRAINING_MIN_ROWS (input, future value) pairs.
+    """
+    inputs, targets, feature_names = forecast_training_set(
+        device_ids, timestamps, X, settings.FORECAST_HORIZONS_HOURS,
+        max_rows=settings.FORECAST_TRAINING_MAX_ROWS,
+    )
+    if len(inputs) < settings.TRAINING_MIN_ROWS:
+        logger.info(f"History yields {len(inputs)} forecast examples, need {settings.TRAINING_MIN_ROWS}")
+        return {"trained": False, "rows": len(inputs)}
+
+    start = time.perf_counter()
+    with joblib.parallel_backend("threading"):
+        if not predictor.train_forecaster_array(inputs, targets, feature_names):
+            raise RuntimeError("Forecaster training failed, see logs for details")
+    predictor.metrics["forecast_training_rows"] = len(inputs)
+    return {"trained": True, "rows": len(inputs), "duration_seconds": time.perf_counter() - start}
 
+
+def train_sample_models() -> None:
+    """Train models with sample data for demonstration."""
+    sample_data = _sample_training_data()
+
+    # Train new models; the served ones are replaced only once both are ready
+    detector = NetworkAnomalyDetector(settings.ML_MODEL_PATH)
+    predictor = NetworkPerformancePredictor(settings.ML_MODEL_PATH)
+    if not (detector.train_model(sample_data) and predictor.train_model(sample_data)):
+        logger.error("Sample model training failed")
+        return
+    fit_forecaster(predictor, *_sample_training_series())
+
+    model_registry.publish(detector, predictor, metadata={"source": "sample"})
     logger.info("Sample models trained successfully")
 
 
+def load_archived_training_matrix() -> Optional[np.ndarray]:
+    """Complete archived telemetry rows from the training window.
+
+    Reads only the model feature columns through memory-mapped segments,
+    never building a DataFrame. Returns None when the archive holds too
+    little complete data to train on.
+    """
+    from datetime import timedelta
+
+    from app.storage.archive import telemetry_archive
+
+    X = telemetry_archive.read_columns(
+        TELEMETRY_FEATURES,
+        start_time=datetime.utcnow() - timedelta(days=settings.TRAINING_WINDOW_DAYS),
+        max_rows=settings.TRAINING_MAX_ROWS,
+    )
+    X = X[~np.isnan(X).any(axis=1)]
+    if len(X) < settings.TRAINING_MIN_ROWS:
+        logger.info(f"Archive has {len(X)} complete rows, need {settings.TRAINING_MIN_ROWS} to train")
+        return None
+    return X
+
+
+def load_training_matrix() -> Tuple[np.ndarray, str]:
+    """Training rows ordered by TELEMETRY_FEATURES, and where they came from."""
+    X = load_archived_training_matrix()
+    if X is not None:
+        return X, "archive"
+    return _sample_training_data()[TELEMETRY_FEATURES].values, "sample"
+
+
+def fit_models(
+    X: np.ndarray,
+    detector: NetworkAnomalyDetector,
+    predictor: NetworkPerformancePredictor,
+    validation_fraction: float = 0.0,
+    parallel: bool = False,
+) -> Dict:
+    """Fit both models on a TELEMETRY_FEATURES matrix.
+
+    With ``parallel`` the two models are fitted concurrently on threads
+    (tree building releases the GIL). A ``validation_fraction`` of the rows
+    is held out to compute the reported metrics. Returns per-model timings
+    and metrics; raises RuntimeError if either model fails to train.
+    """
+    anomaly_idx = [TELEMETRY_FEATURES.index(col) for col in detector.feature_columns]
+    performance_idx = [TELEMETRY_FEATURES.index(col) for col in predictor.feature_columns]
+    latency_idx = TELEMETRY_FEATURES.index('latency_p95')
+
+    X_train, X_val = X, X[:0]
+    if validation_fraction > 0:
+        order = np.random.default_rng(42).permutation(len(X))
+        n_val = int(len(X) * validation_fraction)
+        X_train, X_val = X[order[n_val:]], X[order[:n_val]]
+
+    # Estimator-level parallelism uses threads: tree building releases the
+    # GIL, and loky worker processes cannot start inside a daemon process
+    def fit_detector() -> bool:
+        with joblib.parallel_backend("threading"):
+            return detector.train_model_array(X_train[:, anomaly_idx])
+
+    def fit_predictor() -> bool:
+        with joblib.parallel_backend("threading"):
+            return predictor.train_model_array(X_train[:, performance_idx], X_train[:, latency_idx])
+
+    if parallel:
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            results = [f.result() for f in [pool.submit(fit_detector), pool.submit(fit_predictor)]]
+    else:
+        results = [fit_detector(), fit_predictor()]
+    if not all(results):
+        raise RuntimeError("Model training failed, see logs for details")
+
+    detector.metrics = {"training_rows": len(X_train)}
+    predictor.metrics = {"training_rows": len(X_train)}
+    if len(X_val):
+        flagged = detector.predict_anomalies_array(X_val[:, anomaly_idx])
+        detector.metrics.update({
+            "validation_rows": len(X_val),
+            "validation_anomaly_rate": round(float(flagged.mean()), 4),
+        })
+
+        y_val = X_val[:, latency_idx]
+        y_pred = predictor.predict_performance_array(X_val[:, performance_idx])
+        ss_res = float(np.sum((y_val - y_pred) ** 2))
+        ss_tot = float(np.sum((y_val - y_val.mean()) ** 2))
+        predictor.metrics.update({
+            "validation_rows": len(X_val),
+            "validation_r2": round(1.0 - ss_res / ss_tot, 4) if ss_tot else 0.0,
+            "validation_mae": round(float(np.mean(np.abs(y_val - y_pred))), 4),
+        })
+
+    return {
+        "anomaly_detector": {"duration_seconds": detector.training_duration, "metrics": detector.metrics},
+        "performance_predictor": {"duration_seconds": predictor.training_duration, "metrics": predictor.metrics},
+    }
+
+
+def train_models_from_archive() -> bool:
+    """Train both models on archived telemetry from the training window."""
+    X = load_archived_training_matrix()
+    if X is None:
+        return False
+
+    detector = NetworkAnomalyDetector(settings.ML_MODEL_PATH)
+    predictor = NetworkPerformancePredictor(settings.ML_MODEL_PATH)
+    fit_models(X, detector, predictor)
+    fit_forecaster(predictor, *load_training_series()[:3])
+    model_registry.publish(detector, predictor, metadata={"source": "archive", "rows": len(X)})
+    logger.info(f"Models trained on {len(X)} archived telemetry rows")
+    return True
+
+
+def train_all_models() -> None:
+    """Train on archived telemetry, falling back to sample data."""
+    if not train_models_from_archive():
+        train_sample_models()
+
+
 def analyze_network_data(data: Dict) -> Dict:
     """Analyze network data using ML models."""
     try:
         # Convert to DataFrame
-        df = pd.DataFrame([data])
+        with timed("dataframe_build"):
+            df = pd.DataFrame([data])
+        bundle = model_registry.active
+        detector, predictor = bundle.anomaly_detector, bundle.performance_predictor
 
-        # Detect anomalies
-        anomaly_scores = anomaly_detector.predict_anomalies(df)
+        # Array methods, so compiled models loaded by inference workers work too
+        anomaly = detector.score_anomalies_array(df[detector.feature_columns].values)
+        performance = predictor.predict_performance_interval_array(
+            df[predictor.feature_columns].values, settings.PREDICTION_INTERVAL_COVERAGE
+        )
 
-        # Predict performance
-        performance_predictions = performance_predictor.predict_performance(df)
-
-        return {
-            "anomaly_score": float(anomaly_scores[0]) if len(anomaly_scores) > 0 else 0.0,
-            "predicted_latency": float(performance_predictions[0]) if len(performance_predictions) > 0 else 0.0,
-            "analysis_timestamp": datetime.utcnow().isoformat(),
-            "model_confidence": 0.85  # Placeholder confidence score
-        }
+        return analysis_results(anomaly, performance)[0]
 
     except Exception as e:
         logger.error(f"Error analyzing network data: {e}")
@@ -233,3 +769,64 @@ def analyze_network_data(data: Dict) -> Dict:
             "error": str(e),
             "analysis_timestamp": datetime.utcnow().isoformat()
         }
+
+
+def forecast_performance(device_id: Optional[str] = None, hours_ahead: float = 1,
+                         limit: int = 100) -> List[Dict]:
+    """Forecast latency and throughput ``hours_ahead`` hours from now.
+
+    Each device is forecast from its rolling features in the device feature
+    store. Without ``device_id`` the ``limit`` most recently seen devices
+    are forecast in one pass. A device silent for so long that the horizon
+    from its last sample exceeds the longest trained horizon is forecast at
+    that horizon and marked ``stale``. Raises LookupError for a device
+    without telemetry and ValueError when the served models cannot forecast.
+    """
+    predictor = model_registry.active.performance_predictor
+    if predictor.forecaster is None:
+        raise ModelNotReady("Forecasting model not trained")
+    if predictor.forecast_feature_names != device_feature_store.feature_names + FORECAST_INPUTS:
+        raise ValueError("Forecasting model was trained with different feature store windows")
+
+    device_ids, features, observed_at = device_feature_store.features(
+        [device_id] if device_id else None, limit
+    )
+    if device_id and not device_ids:
+        raise LookupError(f"No telemetry received for device {device_id}")
+    if not device_ids:
+        return []
+
+    # Horizons count from each device's last sample, as in training; beyond
+    # the longest trained one the forest would silently extrapolate
+    now = time.time()
+    max_horizon = max(settings.FORECAST_HORIZONS_HOURS)
+    horizons = (now - observed_at) / 3600.0 + hours_ahead
+    stale = horizons > max_horizon
+    horizons = np.minimum(horizons, max_horizon)
+    predicted, lower, upper = predictor.forecast_array(
+        forecast_inputs(features, observed_at, horizons), settings.PREDICTION_INTERVAL_COVERAGE
+    )
+
+    latency, throughput = FORECAST_TARGETS.index('latency_p95'), FORECAST_TARGETS.index('throughput')
+    # Narrow intervals relative to the forecast mean more agreement between trees
+    spread = (upper[:, latency] - lower[:, latency]) / np.maximum(np.abs(predicted[:, latency]), 1e-9)
+    confidence = np.clip(1.0 - spread, 0.0, 1.0)
+
+    forecast_for = datetime.utcfromtimestamp(now + hours_ahead * 3600.0).isoformat()
+    timestamp = datetime.utcfromtimestamp(now).isoformat()
+    return [
+        {
+            "device_id": device_ids[i],
+            "hours_ahead": hours_ahead,
+            "forecast_for": forecast_for,
+            "predicted_latency": float(predicted[i, latency]),
+            "predicted_latency_interval": [float(lower[i, latency]), float(upper[i, latency])],
+            "predicted_throughput": float(predicted[i, throughput]),
+            "predicted_throughput_interval": [float(lower[i, throughput]), float(upper[i, throughput])],
+            "confidence": float(confidence[i]),
+            "last_observed": datetime.utcfromtimestamp(observed_at[i]).isoformat(),
+            "stale": bool(stale[i]),
+            "timestamp": timestamp
+        }
+        for i in range(len(device_ids))
+    ]
@@ -0,0 +1,361 @@
+import asyncio
+import copy
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+from sklearn.preprocessing import StandardScaler
+
+from app.core.config import settings
+from app.ml.features import TELEMETRY_FEATURES
+from app.ml.forest import calibration_table
+
+logger = logging.getLogger(__name__)
+
+
+class SlidingWindow:
+    """Fixed-capacity ring buffer holding the most recent telemetry rows."""
+
+    def __init__(self, capacity: int, n_columns: int):
+        self.capacity = max(1, capacity)
+        self._rows = np.empty((self.capacity, n_columns), dtype=np.float64)
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, X: np.ndarray) -> None:
+        if len(X) >= self.capacity:
+            self._rows[:] = X[-self.capacity:]
+            self._next, self._size = 0, self.capacity
+            return
+        end = self._next + len(X)
+        if end <= self.capacity:
+            self._rows[self._next:end] = X
+        else:
+            split = self.capacity - self._next
+            self._rows[self._next:] = X[:split]
+            self._rows[:end - self.capacity] = X[split:]
+        self._next = end % self.capacity
+        self._size = min(self.capacity, self._size + len(X))
+
+    def rows(self) -> np.ndarray:
+        """Buffered rows, oldest first."""
+        if self._size < self.capacity:
+            return self._rows[:self._size].copy()
+        return np.concatenate([self._rows[self._next:], self._rows[:self._next]])
+
+
+class ReservoirSample:
+    """Uniform sample of every row ever added (Vitter's algorithm R)."""
+
+    def __init__(self, capacity: int, n_columns: int, seed: int = 42):
+        self.capacity = max(1, capacity)
+        self._rows = np.empty((self.capacity, n_columns), dtype=np.float64)
+        self._rng = np.random.default_rng(seed)
+        self.seen = 0
+
+    def __len__(self) -> int:
+        return min(self.seen, self.capacity)
+
+    def add(self, X: np.ndarray) -> None:
+        positions = self.seen + np.arange(len(X))
+        self.seen += len(X)
+
+        # Fill phase: rows go straight into free slots
+        fill = positions < self.capacity
+        self._rows[positions[fill]] = X[fill]
+
+        # Replacement phase: row t replaces a random slot with p = capacity / (t + 1)
+        rest = ~fill
+        if rest.any():
+            slots = (self._rng.random(rest.sum()) * (positions[rest] + 1)).astype(np.int64)
+            keep = slots < self.capacity
+            self._rows[slots[keep]] = X[rest][keep]
+
+    def rows(self) -> np.ndarray:
+        return self._rows[:len(self)].copy()
+
+
+def _drop_oldest_trees(model, n_drop: int) -> None:
+    """Remove the first ``n_drop`` estimators and their per-tree bookkeeping."""
+    if n_drop <= 0:
+        return
+    model.estimators_ = model.estimators_[n_drop:]
+    for attr in ("estimators_features_", "_average_path_length_per_tree", "_decision_path_lengths"):
+        if hasattr(model, attr):
+            setattr(model, attr, getattr(model, attr)[n_drop:])
+    model.n_estimators = len(model.estimators_)
+
+
+def _add_trees(model, n_new: int, X: np.ndarray, y: Optional[np.ndarray], seed: int) -> None:
+    """Grow a fitted forest by ``n_new`` trees fitted on ``X`` only."""
+    model.warm_start = True
+    model.random_state = seed
+    model.n_estimators = len(model.estimators_) + n_new
+    try:
+        if y is None:
+            model.fit(X)
+        else:
+            model.fit(X, y)
+    finally:
+        model.warm_start = False
+
+
+class UpdateInProgress(RuntimeError):
+    """Raised when an update or training job is already changing the models."""
+
+
+def _recalibrate(detector, reservoir: np.ndarray) -> None:
+    """Re-derive the anomaly threshold and score calibration from the reservoir.
+
+    The reservoir represents all history, unlike the last window.
+    """
+    if not len(reservoir):
+        return
+    anomaly_idx = [TELEMETRY_FEATURES.index(col) for col in detector.feature_columns]
+    scores = detector.model.score_samples(detector.scaler.transform(reservoir[:, anomaly_idx]))
+    if detector.model.contamination != "auto":
+        detector.model.offset_ = np.percentile(scores, 100.0 * detector.model.contamination)
+    detector.calibration = calibration_table(scores)
+
+
+def _finish(detector, predictor, reservoir: np.ndarray, mode: str, start: float) -> float:
+    """Recalibrate, compile and stamp updated models; returns the update duration."""
+    _recalibrate(detector, reservoir)
+    for model in (detector, predictor):
+        model.compile_model()
+
+    duration = time.perf_counter() - start
+    for model in (detector, predictor):
+        model.last_updated = datetime.utcnow()
+        model.training_duration = duration
+        model.metrics = {**model.metrics, "last_incremental_update": mode}
+    return duration
+
+
+def refit_models(detector, predictor, reservoir: np.ndarray, stream_scaler: StandardScaler) -> float:
+    """Refit both models from the reservoir with the streaming scaler; returns the duration.
+
+    Runs in the training process (see ``app.ml.training``), as a refit is
+    as expensive as training.
+    """
+    start = time.perf_counter()
+    anomaly_idx = [TELEMETRY_FEATURES.index(col) for col in detector.feature_columns]
+    performance_idx = [TELEMETRY_FEATURES.index(col) for col in predictor.feature_columns]
+    latency_idx = TELEMETRY_FEATURES.index('latency_p95')
+
+    # Both models scale with the long-run streaming statistics
+    detector.scaler = _column_scaler(stream_scaler, anomaly_idx)
+    predictor.scaler = _column_scaler(stream_scaler, performance_idx)
+    detector.model.fit(detector.scaler.transform(reservoir[:, anomaly_idx]))
+    predictor.model.fit(
+        predictor.scaler.transform(reservoir[:, performance_idx]), reservoir[:, latency_idx]
+    )
+    return _finish(detector, predictor, reservoir, "refit", start)
+
+
+async def _submit_refit(refit: Dict):
+    from app.ml.training import training_jobs
+
+    return training_jobs.submit(refit=refit)
+
+
+class IncrementalModelUpdater:
+    """Keeps the models current at a cost proportional to new data.
+
+    Ingested rows land in a sliding window of recent telemetry and a
+    reservoir sample of all telemetry, and update a streaming StandardScaler
+    through ``partial_fit``. Each update then either
+
+    * warm-starts both forests with ``trees_per_update`` trees fitted on the
+      window and drops the same number of oldest trees, keeping forest size
+      constant, or
+    * when the streaming feature statistics have drifted more than
+      ``drift_threshold`` standard deviations from the scaler the models were
+      trained with, starts a training job that refits both models from the
+      reservoir using the streaming scaler, in the training process.
+
+    Either way the work is bounded by the window and reservoir sizes, not by
+    the total history. Updated models are built on copies and published as
+    a new registry version. Updates never overlap each other or a training
+    job, so none publishes over models it did not start from.
+    """
+
+    def __init__(
+        self,
+        window_rows: int = 5000,
+        reservoir_rows: int = 20000,
+        trees_per_update: int = 10,
+        drift_threshold: float = 0.5,
+        min_new_rows: int = 256,
+    ):
+        n_columns = len(TELEMETRY_FEATURES)
+        self.window = SlidingWindow(window_rows, n_columns)
+        self.reservoir = ReservoirSample(reservoir_rows, n_columns)
+        self.stream_scaler = StandardScaler()
+        self.trees_per_update = trees_per_update
+        self.drift_threshold = drift_threshold
+        self.min_new_rows = max(1, min_new_rows)
+        self._lock = threading.Lock()  # guards the buffers
+        self._update_lock = threading.Lock()  # one update at a time
+        self._rng = np.random.default_rng()
+        self._new_rows = 0
+        self.last_update: Optional[Dict] = None
+
+    def observe(self, X: np.ndarray) -> None:
+        """Record complete telemetry rows ordered by TELEMETRY_FEATURES."""
+        if len(X) == 0:
+            return
+        with self._lock:
+            self.window.add(X)
+            self.reservoir.add(X)
+            self.stream_scaler.partial_fit(X)
+            self._new_rows += len(X)
+
+    def _drift(self, scaler: StandardScaler, columns) -> float:
+        idx = [TELEMETRY_FEATURES.index(col) for col in columns]
+        stream_mean = self.stream_scaler.mean_[idx]
+        return float(np.max(np.abs(stream_mean - scaler.mean_) / scaler.scale_))
+
+    def update(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> Optional[Dict]:
+        """Run one incremental update; returns a summary, or None if skipped.
+
+        Call it off the event loop, passing ``loop`` so a drift refit can be
+        started as a training job there. Raises UpdateInProgress while
+        another update or a training job is running.
+        """
+        from app.ml.training import training_jobs
+
+        if not self._update_lock.acquire(blocking=False):
+            raise UpdateInProgress("An incremental model update is already running")
+        try:
+            active_job = training_jobs.active_job
+            if active_job is not None:
+                raise UpdateInProgress(f"Training job {active_job.id} is running")
+            return self._update(loop)
+        finally:
+            self._update_lock.release()
+
+    def _update(self, loop: Optional[asyncio.AbstractEventLoop]) -> Optional[Dict]:
+        from app.ml.registry import model_registry
+
+        with self._lock:
+            if self._new_rows < self.min_new_rows:
+                return None
+            window = self.window.rows()
+            reservoir = self.reservoir.rows()
+            stream_scaler = copy.deepcopy(self.stream_scaler)
+            new_rows, self._new_rows = self._new_rows, 0
+
+        bundle = model_registry.active
+        if not (bundle.anomaly_detector.is_trained and bundle.performance_predictor.is_trained):
+            logger.info("Skipping incremental update: models are not trained yet")
+            return None
+
+        start = time.perf_counter()
+        drift = max(
+            self._drift(bundle.anomaly_detector.scaler, bundle.anomaly_detector.feature_columns),
+            self._drift(bundle.performance_predictor.scaler, bundle.performance_predictor.feature_columns),
+        )
+        summary = {
+            "new_rows": new_rows,
+            "window_rows": len(window),
+            "reservoir_rows": len(reservoir),
+            "drift": round(drift, 4),
+        }
+
+        if drift > self.drift_threshold and len(reservoir) >= self.min_new_rows:
+            if loop is None:
+                raise RuntimeError("A drift refit runs as a training job and needs the event loop")
+            metadata = {"source": "incremental", "mode": "refit", "parent": bundle.version, "new_rows": new_rows}
+            refit = {"parent": bundle.version, "reservoir": reservoir,
+                     "stream_scaler": stream_scaler, "metadata": metadata}
+            job = asyncio.run_coroutine_threadsafe(_submit_refit(refit), loop).result()
+            self.last_update = {"job_id": job.id, "mode": "refit", **summary, "timestamp": time.time()}
+            logger.info(f"Feature drift {summary['drift']}: refit started as training job {job.id}")
+            return self.last_update
+
+        mode = "warm_start"
+        detector = copy.deepcopy(bundle.anomaly_detector)
+        predictor = copy.deepcopy(bundle.performance_predictor)
+        anomaly_idx = [TELEMETRY_FEATURES.index(col) for col in detector.feature_columns]
+        performance_idx = [TELEMETRY_FEATURES.index(col) for col in predictor.feature_columns]
+        latency_idx = TELEMETRY_FEATURES.index('latency_p95')
+        seed = int(self._rng.integers(2 ** 31 - 1))
+        _add_trees(detector.model, self.trees_per_update,
+                   detector.scaler.transform(window[:, anomaly_idx]), None, seed)
+        _drop_oldest_trees(detector.model, self.trees_per_update)
+
+        _add_trees(predictor.model, self.trees_per_update,
+                   predictor.scaler.transform(window[:, performance_idx]), window[:, latency_idx], seed)
+        _drop_oldest_trees(predictor.model, self.trees_per_update)
+
+        duration = _finish(detector, predictor, reservoir, mode, start)
+        version = model_registry.publish(
+            detector, predictor,
+            metadata={"source": "incremental", "mode": mode, "parent": bundle.version, "new_rows": new_rows},
+        )
+
+        self.last_update = {
+            "version": version,
+            "mode": mode,
+            **summary,
+            "duration_seconds": round(duration, 4),
+            "timestamp": time.time(),
+        }
+        logger.info(f"Incremental model update ({mode}) on {new_rows} new rows "
+                    f"in {self.last_update['duration_seconds']}s")
+        return self.last_update
+
+
+def _column_scaler(scaler: StandardScaler, idx) -> StandardScaler:
+    """A fitted StandardScaler restricted to the columns in ``idx``."""
+    sub = StandardScaler()
+    sub.mean_ = scaler.mean_[idx].copy()
+    sub.var_ = scaler.var_[idx].copy()
+    sub.scale_ = scaler.scale_[idx].copy()
+    sub.n_samples_seen_ = scaler.n_samples_seen_
+    sub.n_features_in_ = len(idx)
+    return sub
+
+
+async def model_update_loop(updater: "IncrementalModelUpdater") -> None:
+    """Periodically update the models every MODEL_UPDATE_INTERVAL seconds.
+
+    Full retrains run as training jobs, in a separate process like those
+    started through the API; a run is skipped while a job is active.
+    """
+    from app.ml.training import training_jobs
+
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(settings.MODEL_UPDATE_INTERVAL)
+        try:
+            if settings.MODEL_UPDATE_MODE == "incremental":
+                try:
+                    await loop.run_in_executor(None, updater.update, loop)
+                except UpdateInProgress as e:
+                    logger.info(f"Skipping scheduled model update: {e}")
+            else:
+                try:
+                    job = training_jobs.submit()
+                except RuntimeError as e:
+                    logger.info(f"Skipping scheduled retrain: {e}")
+                else:
+                    logger.info(f"Scheduled retrain started as training job {job.id}")
+        except Exception as e:
+            logger.error(f"Scheduled model update failed: {e}")
+
+
+model_updater = IncrementalModelUpdater(
+    window_rows=settings.ONLINE_WINDOW_ROWS,
+    reservoir_rows=settings.ONLINE_RESERVOIR_ROWS,
+    trees_per_update=settings.ONLINE_TREES_PER_UPDATE,
+    drift_threshold=settings.ONLINE_DRIFT_THRESHOLD,
+    min_new_rows=settings.ONLINE_MIN_NEW_ROWS,
+)
@@ -0,0 +1,293 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+
+
+class ModelNotReady(ValueError):
+    """Raised when the served models are not trained or loaded yet.
+
+    A ValueError for existing callers; the API answers it with 503.
+    """
+
+
+class ModelBundle:
+    """The anomaly detector and performance predictor served as one version.
+
+    A bundle is never modified once it is published or installed; updates
+    build new model objects and install a new bundle.
+    """
+
+    def __init__(self, version: Optional[str], anomaly_detector, performance_predictor,
+                 metadata: Optional[Dict] = None):
+        self.version = version
+        self.anomaly_detector = anomaly_detector
+        self.performance_predictor = performance_predictor
+        self.metadata = metadata or {}
+
+
+def _describe_model(model) -> Dict:
+    return {
+        "last_updated": model.last_updated.isoformat() if model.last_updated else None,
+        "training_duration": model.training_duration,
+        "metrics": model.metrics,
+    }
+
+
+def _restore_model(model, description: Dict) -> None:
+    last_updated = description.get("last_updated")
+    model.last_updated = datetime.fromisoformat(last_updated) if last_updated else None
+    model.training_duration = description.get("training_duration")
+    model.metrics = description.get("metrics") or {}
+
+
+class ModelRegistry:
+    """Versioned model store with an atomically swapped active version.
+
+    Every published version gets its own directory holding both models and
+    their scalers::
+
+        <root>/versions/<version>/anomaly_detector.joblib
+                                  anomaly_scaler.joblib
+                                  performance_predictor.joblib
+                                  performance_scaler.joblib
+                                  compiled/<model>/...npy
+                                  manifest.json
+        <root>/CURRENT
+
+    Versions are written to a hidden temporary directory and renamed into
+    place, and are never modified afterwards. ``CURRENT`` names the active
+    version and is replaced atomically.
+
+    The served models are a single ModelBundle reference. Readers take it
+    once per call and keep using that snapshot while a new version is
+    activated (read-copy-update), so inference never takes a lock and never
+    mixes models from two versions. Publishing and activation are serialized
+    by a lock.
+    """
+
+    def __init__(self, root: str, keep_versions: int = 10):
+        self.root = root
+        self.versions_dir = os.path.join(root, "versions")
+        self.keep_versions = max(1, keep_versions)
+        self._lock = threading.RLock()
+        self._active: Optional[ModelBundle] = None
+        self._history: List[str] = []  # previously active versions, oldest first
+        self._listeners: List[Callable[[ModelBundle], None]] = []
+
+    @property
+    def active(self) -> ModelBundle:
+        """The bundle currently served; take it once and use it for the whole call.
+
+        None until ``app.ml.models`` has been imported.
+        """
+        return self._active
+
+    def subscribe(self, callback: Callable[[ModelBundle], None]) -> None:
+        """Call ``callback(bundle)`` whenever a version is activated."""
+        self._listeners.append(callback)
+
+    def install(self, bundle: ModelBundle) -> None:
+        """Serve ``bundle`` without persisting it or notifying subscribers."""
+        self._active = bundle
+
+    # Versions
+
+    def list_versions(self) -> List[Dict]:
+        """Manifests of the stored versions, newest first."""
+        if not os.path.isdir(self.versions_dir):
+            return []
+        active = self._active.version if self._active else None
+        versions = []
+        for name in sorted(os.listdir(self.versions_dir), reverse=True):
+            manifest = self._read_manifest(name)
+            if manifest is not None:
+                versions.append({**manifest, "active": name == active})
+        return versions
+
+    def publish(self, anomaly_detector, performance_predictor,
+                metadata: Optional[Dict] = None, activate: bool = True) -> str:
+        """Persist trained models as a new version and optionally activate it."""
+        version = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{uuid.uuid4().hex[:6]}"
+        manifest = {
+            "version": version,
+            "created_at": datetime.utcnow().isoformat(),
+            "metadata": metadata or {},
+            "models": {
+                "anomaly_detector": _describe_model(anomaly_detector),
+                "performance_predictor": _describe_model(performance_predictor),
+            },
+        }
+
+        os.makedirs(self.versions_dir, exist_ok=True)
+        tmp_dir = os.path.join(self.versions_dir, f".{version}.tmp")
+        os.makedirs(tmp_dir)
+        try:
+            anomaly_detector.save_model(tmp_dir)
+            performance_predictor.save_model(tmp_dir)
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), "w") as f:
+                json.dump(manifest, f, indent=2, default=str)
+            os.rename(tmp_dir, os.path.join(self.versions_dir, version))
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"Published model version {version}")
+
+        if activate:
+            self._activate(ModelBundle(version, anomaly_detector, performance_predictor,
+                                       manifest["metadata"]))
+        return version
+
+    def activate(self, version: str) -> ModelBundle:
+        """Load a stored version and make it the active one."""
+        with self._lock:
+            if self._active is not None and self._active.version == version:
+                return self._active
+            bundle = self.load(version)
+            self._activate(bundle)
+            return bundle
+
+    def rollback(self) -> ModelBundle:
+        """Reactivate the previously active version.
+
+        Falls back to the newest stored version older than the active one
+        when there is no activation history (e.g. after a restart). Raises
+        RuntimeError when there is nothing to roll back to.
+        """
+        with self._lock:
+            current = self._active.version if self._active else None
+            target = None
+            # Rolling back consumes history instead of growing it
+            while self._history and target is None:
+                version = self._history.pop()
+                if version != current and self._read_manifest(version) is not None:
+                    target = version
+            if target is None:
+                older = [v["version"] for v in self.list_versions()
+                         if current is None or v["version"] < current]
+                if not older:
+                    raise RuntimeError("No earlier model version to roll back to")
+                target = older[0]
+
+            bundle = self.load(target)
+            self._swap(bundle, record_history=False)
+            return bundle
+
+    def load(self, version: str) -> ModelBundle:
+        """Load a stored version without activating it."""
+        from app.ml.models import NetworkAnomalyDetector, NetworkPerformancePredictor
+
+        manifest = self._read_manifest(version)
+        if manifest is None:
+            raise LookupError(f"Unknown model version: {version}")
+
+        directory = os.path.join(self.versions_dir, version)
+        detector = NetworkAnomalyDetector(self.root)
+        predictor = NetworkPerformancePredictor(self.root)
+        mmap_mode = "r" if settings.MODEL_LOAD_MMAP else None
+        if not (detector.load_model(directory, mmap_mode) and predictor.load_model(directory, mmap_mode)):
+            raise RuntimeError(f"Model version {version} could not be loaded")
+        _restore_model(detector, manifest["models"]["anomaly_detector"])
+        _restore_model(predictor, manifest["models"]["performance_predictor"])
+        return ModelBundle(version, detector, predictor, manifest.get("metadata"))
+
+    def load_compiled(self, version: str) -> ModelBundle:
+        """Load only the compiled models of a stored version.
+
+        Needs NumPy alone, so processes that only serve inference never
+        import scikit-learn. Raises LookupError when the version has no
+        compiled models.
+        """
+        from app.ml.forest import COMPILED_DIR, CompiledAnomalyDetector, CompiledPerformancePredictor
+
+        manifest = self._read_manifest(version)
+        compiled_dir = os.path.join(self.versions_dir, version, COMPILED_DIR)
+        if manifest is None or not os.path.isdir(compiled_dir):
+            raise LookupError(f"No compiled models for version: {version}")
+
+        mmap_mode = "r" if settings.MODEL_LOAD_MMAP else None
+        return ModelBundle(
+            version,
+            CompiledAnomalyDetector.load(os.path.join(compiled_dir, "anomaly_detector"), mmap_mode),
+            CompiledPerformancePredictor.load(os.path.join(compiled_dir, "performance_predictor"), mmap_mode),
+            manifest.get("metadata"),
+        )
+
+    def current_version(self) -> Optional[str]:
+        """The version named by ``CURRENT``, which another process may have changed."""
+        try:
+            with open(os.path.join(self.root, CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load_current(self) -> Optional[ModelBundle]:
+        """Activate the version named by ``CURRENT``; returns None if there is none."""
+        version = self.current_version()
+        if version is None:
+            return None
+        return self.activate(version)
+
+    # Internals
+
+    def _activate(self, bundle: ModelBundle) -> None:
+        with self._lock:
+            self._swap(bundle, record_history=True)
+            self._prune()
+
+    def _swap(self, bundle: ModelBundle, record_history: bool) -> None:
+        previous = self._active
+        self._write_current(bundle.version)
+        # The swap itself is a single reference assignment
+        self._active = bundle
+        if record_history and previous is not None and previous.version is not None:
+            self._history.append(previous.version)
+            self._history = self._history[-self.keep_versions:]
+        logger.info(f"Activated model version {bundle.version}")
+
+        for callback in self._listeners:
+            try:
+                callback(bundle)
+            except Exception as e:
+                logger.error(f"Model activation listener failed: {e}")
+
+    def _write_current(self, version: str) -> None:
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = os.path.join(self.root, f".{CURRENT_FILE}.{uuid.uuid4().hex[:8]}")
+        with open(tmp_path, "w") as f:
+            f.write(version)
+        os.replace(tmp_path, os.path.join(self.root, CURRENT_FILE))
+
+    def _read_manifest(self, version: str) -> Optional[Dict]:
+        if version.startswith("."):
+            return None
+        try:
+            with open(os.path.join(self.versions_dir, version, MANIFEST_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _prune(self) -> None:
+        """Delete the oldest versions beyond ``keep_versions``, never the active one."""
+        if not os.path.isdir(self.versions_dir):
+            return
+        active = self._active.version if self._active else None
+        versions = sorted((v for v in os.listdir(self.versions_dir) if not v.startswith(".")),
+                          reverse=True)
+        for version in versions[self.keep_versions:]:
+            if version != active:
+                shutil.rmtree(os.path.join(self.versions_dir, version), ignore_errors=True)
+
+
+model_registry = ModelRegistry(settings.ML_MODEL_PATH, keep_versions=settings.MODEL_REGISTRY_KEEP_VERSIONS)
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import multiprocessing
+import queue
+import time
+import traceback
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+JOB_HISTORY = 20
+
+
+def _run_training_process(progress: "multiprocessing.Queue", validation_fraction: float) -> None:
+    """Entry point of the training process.
+
+    Sends ``("progress", fraction, stage)`` messages while it works and
+    finishes with ``("result", version, summary)`` once the models are
+    published to the registry (but not activated), or ``("error", message)``.
+    """
+    try:
+        from app.ml.models import (
+            NetworkAnomalyDetector, NetworkPerformancePredictor, fit_forecaster, fit_models,
+            load_training_matrix, load_training_series
+        )
+        from app.ml.registry import model_registry
+
+        progress.put(("progress", 0.05, "loading_data"))
+        start = time.perf_counter()
+        X, source = load_training_matrix()
+        load_seconds = time.perf_counter() - start
+
+        progress.put(("progress", 0.2, "fitting"))
+        detector = NetworkAnomalyDetector(settings.ML_MODEL_PATH)
+        predictor = NetworkPerformancePredictor(settings.ML_MODEL_PATH)
+        detector.n_jobs = predictor.n_jobs = settings.TRAINING_N_JOBS
+        summary = fit_models(X, detector, predictor, validation_fraction=validation_fraction, parallel=True)
+
+        progress.put(("progress", 0.7, "fitting_forecaster"))
+        device_ids, timestamps, series, series_source = load_training_series()
+        summary["performance_forecaster"] = fit_forecaster(predictor, device_ids, timestamps, series)
+        summary["performance_forecaster"]["source"] = series_source
+
+        summary["data"] = {"source": source, "rows": len(X), "load_seconds": round(load_seconds, 4)}
+        progress.put(("progress", 0.9, "publishing"))
+        version = model_registry.publish(
+            detector, predictor, metadata={"source": source, "rows": len(X)}, activate=False
+        )
+        progress.put(("result", version, summary))
+    except Exception as e:
+        progress.put(("error", f"{e}\n{traceback.format_exc()}"))
+
+
+def _run_refit_process(progress: "multiprocessing.Queue", refit: Dict) -> None:
+    """Entry point of a drift refit started by the incremental updater.
+
+    Refits the models of version ``refit["parent"]`` from the reservoir
+    sample with the streaming scaler, and reports like a training process.
+    """
+    try:
+        from app.ml.online import refit_models
+        from app.ml.registry import model_registry
+
+        progress.put(("progress", 0.05, "loading_models"))
+        bundle = model_registry.load(refit["parent"])
+        detector, predictor = bundle.anomaly_detector, bundle.performance_predictor
+
+        progress.put(("progress", 0.2, "fitting"))
+        duration = refit_models(detector, predictor, refit["reservoir"], refit["stream_scaler"])
+
+        progress.put(("progress", 0.9, "publishing"))
+        version = model_registry.publish(detector, predictor, metadata=refit["metadata"], activate=False)
+        summary = {"mode": "refit", "parent": refit["parent"], "rows": len(refit["reservoir"]),
+                   "duration_seconds": round(duration, 4)}
+        progress.put(("result", version, summary))
+    except Exception as e:
+        progress.put(("error", f"{e}\n{traceback.format_exc()}"))
+
+
+class TrainingJob:
+    """State of one training run, as reported by the API."""
+
+    def __init__(self, kind: str = "train"):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "queued"
+        self.progress = 0.0
+        self.stage = "queued"
+        self.created_at = datetime.utcnow()
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.summary: Dict = {}
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        duration = None
+        if self.started_at:
+            duration = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": round(self.progress, 3),
+            "stage": self.stage,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "duration_seconds": round(duration, 3) if duration is not None else None,
+            "summary": self.summary,
+            "error": self.error,
+        }
+
+
+class TrainingJobManager:
+    """Runs model training in a separate process, one job at a time.
+
+    Training never shares the server's interpreter, so it cannot starve
+    inference of the GIL; inside the training process both models are
+    fitted concurrently with ``TRAINING_N_JOBS`` cores each. The training
+    process publishes a new registry version; when the job succeeds the
+    server activates it.
+    """
+
+    def __init__(self, validation_fraction: float = 0.2):
+        self.validation_fraction = validation_fraction
+        self._jobs: Dict[str, TrainingJob] = {}
+        self._active: Optional[TrainingJob] = None
+        self._ctx = multiprocessing.get_context("spawn")
+
+    @property
+    def active_job(self) -> Optional[TrainingJob]:
+        return self._active
+
+    def get(self, job_id: str) -> Optional[TrainingJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[TrainingJob]:
+        return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def last_completed(self) -> Optional[TrainingJob]:
+        return next((job for job in self.list() if job.status == "completed"), None)
+
+    def submit(self, refit: Optional[Dict] = None) -> TrainingJob:
+        """Start a training job; raises RuntimeError while another is running.
+
+        With ``refit``, the job refits existing models for the incremental
+        updater instead of training from scratch.
+        """
+        if self._active is not None:
+            raise RuntimeError(f"Training job {self._active.id} is already running")
+
+        job = TrainingJob("refit" if refit is not None else "train")
+        self._jobs[job.id] = job
+        self._active = job
+        for old in self.list()[JOB_HISTORY:]:
+            self._jobs.pop(old.id, None)
+
+        asyncio.get_running_loop().create_task(self._run(job, refit))
+        return job
+
+    async def _run(self, job: TrainingJob, refit: Optional[Dict] = None) -> None:
+        loop = asyncio.get_running_loop()
+        progress = self._ctx.Queue()
+        if refit is None:
+            target, args = _run_training_process, (progress, self.validation_fraction)
+        else:
+            target, args = _run_refit_process, (progress, refit)
+        process = self._ctx.Process(
+            target=target,
+            args=args,
+            name=f"training-{job.id[:8]}",
+            daemon=True,
+        )
+        job.status, job.stage = "running", "starting"
+        job.started_at = datetime.utcnow()
+        process.start()
+
+        try:
+            while True:
+                try:
+                    message = await loop.run_in_executor(None, progress.get, True, 1.0)
+                except queue.Empty:
+                    if not process.is_alive():
+                        raise RuntimeError(f"Training process exited with code {process.exitcode}")
+                    continue
+
+                if message[0] == "progress":
+                    _, job.progress, job.stage = message
+                elif message[0] == "result":
+                    _, version, job.summary = message
+                    job.stage = "activating"
+                    await loop.run_in_executor(None, self._install, version)
+                    job.summary["version"] = version
+                    job.status, job.stage, job.progress = "completed", "completed", 1.0
+                    break
+                else:
+                    raise RuntimeError(message[1])
+        except Exception as e:
+            job.status, job.stage = "failed", "failed"
+            job.error = str(e)
+            logger.error(f"Training job {job.id} failed: {e}")
+        finally:
+            job.finished_at = datetime.utcnow()
+            self._active = None
+            await loop.run_in_executor(None, process.join, 5)
+
+    def _install(self, version: str) -> None:
+        from app.ml.registry import model_registry
+
+        model_registry.activate(version)
+        logger.info(f"Trained model version {version} installed")
+
+
+training_jobs = TrainingJobManager(validation_fraction=settings.TRAINING_VALIDATION_FRACTION)
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWarmup:
+    """Loads the ML stack after the server is already answering requests.
+
+    Importing pandas and scikit-learn and loading the active model version
+    take seconds; doing that in the startup hook keeps /health down the
+    whole time. ``start()`` runs it on a thread instead, followed by one
+    prediction so the first real request does not pay for lazy
+    initialisation. Code that needs the models awaits ``wait()``.
+    """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.error: Optional[str] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready is None or self._ready.is_set()
+
+    def start(self, on_loaded: Optional[Callable[[], None]] = None) -> None:
+        """Start warming up; ``on_loaded`` runs on the event loop before readiness."""
+        if self._task is not None:
+            return
+        self._ready = asyncio.Event()
+        self._task = asyncio.get_running_loop().create_task(self._run(on_loaded))
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def wait(self) -> None:
+        """Return once the models are loaded; immediately if warm-up never started."""
+        if self._ready is not None:
+            await self._ready.wait()
+
+    def stats(self) -> Dict:
+        return {
+            "ready": self.ready,
+            "timings_seconds": {k: round(v, 4) for k, v in self.timings.items()},
+            "error": self.error,
+        }
+
+    async def _run(self, on_loaded: Optional[Callable[[], None]]) -> None:
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._load)
+            if on_loaded is not None:
+                on_loaded()
+        except Exception as e:
+            # Serve anyway: analysis reports errors until a version is trained
+            self.error = str(e)
+            logger.error(f"Model warm-up failed: {e}")
+        finally:
+            self._ready.set()
+
+    def _load(self) -> None:
+        start = time.perf_counter()
+        from app.ml import models
+        from app.ml import online  # noqa: F401  (imports scikit-learn)
+        self.timings["import"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        models.load_models()
+        self.timings["load_models"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        bundle = models.model_registry.active
+        if bundle.anomaly_detector.is_trained and bundle.performance_predictor.is_trained:
+            models.analyze_network_batch({col: [0.0] for col in models.TELEMETRY_FEATURES})
+        self.timings["first_prediction"] = time.perf_counter() - start
+        logger.info(f"Model warm-up finished in {sum(self.timings.values()):.2f}s")
+
+
+model_warmup = ModelWarmup()
@@ -0,0 +1 @@
+# Persistent telemetry and anomaly storage
@@ -0,0 +1,234 @@
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.ml.features import TELEMETRY_FEATURES
+
+logger = logging.getLogger(__name__)
+
+TIMESTAMP_COLUMN = "timestamp"
+ARCHIVE_COLUMNS = [TIMESTAMP_COLUMN] + TELEMETRY_FEATURES
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+def _partition_key(device_id: str) -> str:
+    return _UNSAFE_CHARS.sub("_", device_id) or "_"
+
+
+class SegmentArchive:
+    """Append-only columnar telemetry archive.
+
+    Rows are buffered per (day, device) partition and written as immutable
+    segments, one ``.npy`` file per column::
+
+        <root>/day=2024-05-01/device=router_01/seg-<ms>-<id>/<column>.npy
+
+    Segments are written to a hidden temporary directory and renamed into
+    place, so readers never see a partial segment. Reads memory-map only the
+    projected columns of the partitions that overlap the requested range.
+    """
+
+    def __init__(self, root: str, segment_rows: int = 4096, max_segment_age: float = 300.0):
+        self.root = root
+        self.segment_rows = max(1, segment_rows)
+        self.max_segment_age = max_segment_age
+        self._lock = threading.Lock()
+        self._buffers: Dict[Tuple[str, str], Dict] = {}
+
+    # Writing
+
+    def append(self, batch) -> int:
+        """Buffer a TelemetryBatch and write out partitions that are due."""
+        if len(batch) == 0:
+            return 0
+
+        days = [datetime.utcfromtimestamp(ts).strftime("%Y-%m-%d") for ts in batch.timestamps.tolist()]
+        partitions = np.array([f"{day}/{_partition_key(str(device))}"
+                               for day, device in zip(days, batch.device_ids)])
+
+        # Group rows by partition with one sort instead of a mask per partition
+        order = np.argsort(partitions, kind="stable")
+        keys, starts = np.unique(partitions[order], return_index=True)
+        bounds = list(starts[1:]) + [len(order)]
+
+        with self._lock:
+            for key, start, end in zip(keys.tolist(), starts.tolist(), bounds):
+                rows = order[start:end]
+                buffer = self._buffers.setdefault(
+                    tuple(key.split("/", 1)), {"created": time.monotonic(), "chunks": []}
+                )
+                chunk = {TIMESTAMP_COLUMN: batch.timestamps[rows]}
+                chunk.update({col: batch.columns[col][rows] for col in TELEMETRY_FEATURES})
+                buffer["chunks"].append(chunk)
+            return self._write_due(force=False)
+
+    def flush(self) -> int:
+        """Write every buffered partition, regardless of size or age."""
+        with self._lock:
+            return self._write_due(force=True)
+
+    def _write_due(self, force: bool) -> int:
+        now = time.monotonic()
+        written = 0
+        for key in list(self._buffers):
+            buffer = self._buffers[key]
+            rows = sum(len(chunk[TIMESTAMP_COLUMN]) for chunk in buffer["chunks"])
+            if force or rows >= self.segment_rows or now - buffer["created"] >= self.max_segment_age:
+                self._write_segment(key, buffer["chunks"])
+                del self._buffers[key]
+                written += rows
+        return written
+
+    def _write_segment(self, key: Tuple[str, str], chunks: List[Dict]) -> None:
+        day, device = key
+        partition = os.path.join(self.root, f"day={day}", f"device={device}")
+        os.makedirs(partition, exist_ok=True)
+
+        name = f"seg-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+        tmp_dir = os.path.join(partition, f".{name}.tmp")
+        os.makedirs(tmp_dir)
+        for col in ARCHIVE_COLUMNS:
+            values = np.concatenate([chunk[col] for chunk in chunks]).astype(np.float64, copy=False)
+            np.save(os.path.join(tmp_dir, f"{col}.npy"), values)
+        os.rename(tmp_dir, os.path.join(partition, name))
+
+    # Reading
+
+    def segments(
+        self,
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        device_ids: Optional[Sequence[str]] = None,
+    ) -> Iterator[str]:
+        """Yield segment directories whose day and device partitions match."""
+        if not os.path.isdir(self.root):
+            return
+        start_day = start_time.strftime("%Y-%m-%d") if start_time else None
+        end_day = end_time.strftime("%Y-%m-%d") if end_time else None
+        wanted = {_partition_key(d) for d in device_ids} if device_ids else None
+
+        for day_dir in sorted(os.listdir(self.root)):
+            if not day_dir.startswith("day="):
+                continue
+            day = day_dir[4:]
+            if (start_day and day < start_day) or (end_day and day > end_day):
+                continue
+            day_path = os.path.join(self.root, day_dir)
+            for device_dir in sorted(os.listdir(day_path)):
+                if not device_dir.startswith("device="):
+                    continue
+                if wanted is not None and device_dir[7:] not in wanted:
+                    continue
+                device_path = os.path.join(day_path, device_dir)
+                for segment in sorted(os.listdir(device_path)):
+                    if segment.startswith("seg-"):
+                        yield os.path.join(device_path, segment)
+
+    def read_columns(
+        self,
+        columns: Sequence[str],
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        device_ids: Optional[Sequence[str]] = None,
+        max_rows: Optional[int] = None,
+    ) -> np.ndarray:
+        """Read projected columns into one ``(n_rows, len(columns))`` matrix.
+
+        Columns are memory-mapped segment by segment and copied straight into
+        a preallocated matrix, so only the projected columns of the selected
+        rows are ever resident. When more than ``max_rows`` rows match, every
+        segment is thinned with the same stride.
+        """
+        start_ts = (start_time - datetime(1970, 1, 1)).total_seconds() if start_time else None
+        end_ts = (end_time - datetime(1970, 1, 1)).total_seconds() if end_time else None
+
+        selections = []
+        total = 0
+        for segment in self.segments(start_time, end_time, device_ids):
+            timestamps = np.load(os.path.join(segment, f"{TIMESTAMP_COLUMN}.npy"), mmap_mode="r")
+            mask = np.ones(len(timestamps), dtype=bool)
+            if start_ts is not None:
+                mask &= timestamps >= start_ts
+            if end_ts is not None:
+                mask &= timestamps <= end_ts
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                selections.append((segment, rows))
+                total += len(rows)
+
+        stride = 1
+        if max_rows and total > max_rows:
+            stride = int(np.ceil(total / max_rows))
+            selections = [(segment, rows[::stride]) for segment, rows in selections]
+            total = sum(len(rows) for _, rows in selections)
+
+        X = np.empty((total, len(columns)), dtype=np.float64)
+        offset = 0
+        for segment, rows in selections:
+            end = offset + len(rows)
+            for j, col in enumerate(columns):
+                X[offset:end, j] = np.load(os.path.join(segment, f"{col}.npy"), mmap_mode="r")[rows]
+            offset = end
+        return X
+
+    def read_series(
+        self,
+        columns: Sequence[str],
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        max_rows: Optional[int] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Read per-device time series as ``(device_ids, timestamps, X)``.
+
+        Rows are sorted by device partition, then time. Unlike
+        ``read_columns`` nothing is thinned, since gaps would distort rolling
+        windows; beyond ``max_rows`` only the newest rows are kept.
+        """
+        start_ts = (start_time - datetime(1970, 1, 1)).total_seconds() if start_time else None
+        end_ts = (end_time - datetime(1970, 1, 1)).total_seconds() if end_time else None
+
+        device_ids, timestamps, blocks = [], [], []
+        for segment in self.segments(start_time, end_time):
+            ts = np.load(os.path.join(segment, f"{TIMESTAMP_COLUMN}.npy"), mmap_mode="r")
+            mask = np.ones(len(ts), dtype=bool)
+            if start_ts is not None:
+                mask &= ts >= start_ts
+            if end_ts is not None:
+                mask &= ts <= end_ts
+            rows = np.flatnonzero(mask)
+            if not len(rows):
+                continue
+            device = os.path.basename(os.path.dirname(segment))[len("device="):]
+            device_ids.append(np.full(len(rows), device, dtype=object))
+            timestamps.append(np.asarray(ts[rows], dtype=np.float64))
+            blocks.append(np.column_stack([
+                np.load(os.path.join(segment, f"{col}.npy"), mmap_mode="r")[rows] for col in columns
+            ]))
+
+        if not blocks:
+            return np.empty(0, dtype=object), np.empty(0), np.empty((0, len(columns)))
+        device_ids = np.concatenate(device_ids)
+        timestamps = np.concatenate(timestamps)
+        X = np.concatenate(blocks)
+        if max_rows and len(X) > max_rows:
+            newest = np.sort(np.argpartition(-timestamps, max_rows - 1)[:max_rows])
+            device_ids, timestamps, X = device_ids[newest], timestamps[newest], X[newest]
+
+        order = np.lexsort((timestamps, device_ids.astype(str)))
+        return device_ids[order], timestamps[order], X[order]
+
+
+telemetry_archive = SegmentArchive(
+    settings.TRAINING_DATA_PATH,
+    segment_rows=settings.ARCHIVE_SEGMENT_ROWS,
+    max_segment_age=settings.ARCHIVE_SEGMENT_MAX_AGE,
+)
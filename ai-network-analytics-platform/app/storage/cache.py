@@ -0,0 +1,288 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.ml.registry import model_registry
+
+logger = logging.getLogger(__name__)
+
+# Namespace of results that span every device. Any telemetry would
+# invalidate them, so they are left to expire after the TTL instead
+ALL_DEVICES = "*"
+
+
+class CacheBackend:
+    """Shared cache tier behind the in-process LRU.
+
+    Entries are grouped by namespace (a device id) so a whole device can be
+    invalidated with one call. Values are bytes; expiry is enforced by
+    ResultCache, backends only need to forget entries eventually.
+    """
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def delete(self, namespaces: Iterable[str]) -> None:
+        raise NotImplementedError
+
+
+class LocalCacheBackend(CacheBackend):
+    """In-process stand-in for Redis, for tests and single-process setups."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._data: Dict[str, Dict[str, bytes]] = {}
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        with self._lock:
+            return self._data.get(namespace, {}).get(key)
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        with self._lock:
+            self._data.setdefault(namespace, {})[key] = value
+
+    def delete(self, namespaces: Iterable[str]) -> None:
+        with self._lock:
+            for namespace in namespaces:
+                self._data.pop(namespace, None)
+
+
+class RedisCacheBackend(CacheBackend):
+    """One Redis hash per namespace, so invalidating a device is a single DEL."""
+
+    def __init__(self, url: str, prefix: str = "results"):
+        import redis
+
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def _name(self, namespace: str) -> str:
+        return f"{self.prefix}:{namespace}"
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        return self._client.hget(self._name(namespace), key)
+
+    def set(self, namespace: str, key: str, value: bytes, ttl: float) -> None:
+        # Hash fields cannot expire individually; the hash outlives its
+        # newest entry by ``ttl`` and stale fields are skipped on read
+        pipe = self._client.pipeline(transaction=False)
+        pipe.hset(self._name(namespace), key, value)
+        pipe.expire(self._name(namespace), max(1, int(ttl + 0.999)))
+        pipe.execute()
+
+    def delete(self, namespaces: Iterable[str]) -> None:
+        names = [self._name(namespace) for namespace in namespaces]
+        if names:
+            self._client.delete(*names)
+
+
+class ResultCache:
+    """Two-tier TTL cache for API results, invalidated per device.
+
+    Lookups try a bounded in-process LRU first, then the optional shared
+    backend, whose hits are copied into the LRU. Keys should include the
+    model version, so results of a replaced version are never served;
+    ``clear_local`` additionally drops them from memory when a version is
+    promoted. A failing backend is logged and treated as a miss.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 10.0,
+                 backend: Optional[CacheBackend] = None, enabled: bool = True):
+        self.enabled = enabled
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self._by_namespace: Dict[str, Set[str]] = {}
+        # Bumped on invalidation, so results computed before it are not cached
+        self._generations: Dict[str, int] = {}
+
+        self.local_hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+        self.fleet_hits = 0
+        self.fleet_misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+        self.backend_errors = 0
+
+    def get(self, namespace: str, key: str) -> Optional[Any]:
+        """Cached value, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end((namespace, key))
+                    self.local_hits += 1
+                    self.fleet_hits += namespace == ALL_DEVICES
+                    return entry[1]
+                self._remove(namespace, key)
+
+        if self.backend is not None:
+            try:
+                raw = self.backend.get(namespace, key)
+            except Exception as e:
+                raw = None
+                self._backend_failed(e)
+            if raw is not None:
+                expires_at, value = json.loads(raw)
+                if expires_at > now:
+                    with self._lock:
+                        self.backend_hits += 1
+                        self.fleet_hits += namespace == ALL_DEVICES
+                        self._store(namespace, key, expires_at, value)
+                    return value
+
+        with self._lock:
+            self.misses += 1
+            self.fleet_misses += namespace == ALL_DEVICES
+        return None
+
+    def set(self, namespace: str, key: str, value: Any) -> None:
+        """Cache a JSON-serializable value in both tiers for ``ttl`` seconds."""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(namespace, key, expires_at, value)
+        if self.backend is not None:
+            try:
+                self.backend.set(namespace, key, json.dumps([expires_at, value]).encode(), self.ttl)
+            except Exception as e:
+                self._backend_failed(e)
+
+    def get_or_compute(self, namespace: str, key: str, compute: Callable[[], Any]) -> Any:
+        """Cached value, computing and caching it on a miss."""
+        if not self.enabled:
+            return compute()
+        value = self.get(namespace, key)
+        if value is None:
+            generation = self._generations.get(namespace, 0)
+            value = compute()
+            if self._generations.get(namespace, 0) == generation:
+                self.set(namespace, key, value)
+        return value
+
+    async def get_or_compute_async(self, namespace: str, key: str,
+                                   compute: Callable[[], Awaitable[Any]]) -> Any:
+        """``get_or_compute`` for a coroutine function.
+
+        With a backend, lookups and stores run on the default executor, so
+        a slow backend never blocks the event loop.
+        """
+        if not self.enabled:
+            return await compute()
+        value = await self._off_loop(self.get, namespace, key)
+        if value is None:
+            generation = self._generations.get(namespace, 0)
+            value = await compute()
+            if self._generations.get(namespace, 0) == generation:
+                await self._off_loop(self.set, namespace, key, value)
+        return value
+
+    async def _off_loop(self, method: Callable, *args) -> Any:
+        if self.backend is None:
+            return method(*args)
+        return await asyncio.get_running_loop().run_in_executor(None, method, *args)
+
+    def invalidate(self, namespaces: Iterable[str]) -> None:
+        """Drop every entry of the given namespaces from both tiers."""
+        namespaces = set(namespaces)
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+                for key in list(self._by_namespace.get(namespace, ())):
+                    self._remove(namespace, key)
+            self.invalidations += len(namespaces)
+        if self.backend is not None:
+            try:
+                self.backend.delete(namespaces)
+            except Exception as e:
+                self._backend_failed(e)
+
+    def invalidate_devices(self, device_ids: Iterable[str]) -> None:
+        """Invalidate results of these devices; fleet-wide results expire by TTL."""
+        self.invalidate({str(device_id) for device_id in device_ids})
+
+    def clear_local(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_namespace.clear()
+
+    def stats(self) -> Dict:
+        lookups = self.local_hits + self.backend_hits + self.misses
+        fleet_lookups = self.fleet_hits + self.fleet_misses
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "backend": type(self.backend).__name__ if self.backend is not None else None,
+            "local_hits": self.local_hits,
+            "backend_hits": self.backend_hits,
+            "misses": self.misses,
+            "hit_rate": round((lookups - self.misses) / lookups, 4) if lookups else 0.0,
+            "fleet": {
+                "hits": self.fleet_hits,
+                "misses": self.fleet_misses,
+                "hit_rate": round(self.fleet_hits / fleet_lookups, 4) if fleet_lookups else 0.0,
+            },
+            "invalidations": self.invalidations,
+            "evictions": self.evictions,
+            "backend_errors": self.backend_errors,
+        }
+
+    def _store(self, namespace: str, key: str, expires_at: float, value: Any) -> None:
+        self._entries[(namespace, key)] = (expires_at, value)
+        self._entries.move_to_end((namespace, key))
+        self._by_namespace.setdefault(namespace, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            (old_namespace, old_key), _ = self._entries.popitem(last=False)
+            self._forget(old_namespace, old_key)
+            self.evictions += 1
+
+    def _remove(self, namespace: str, key: str) -> None:
+        self._entries.pop((namespace, key), None)
+        self._forget(namespace, key)
+
+    def _forget(self, namespace: str, key: str) -> None:
+        keys = self._by_namespace.get(namespace)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_namespace[namespace]
+
+    def _backend_failed(self, error: Exception) -> None:
+        with self._lock:
+            self.backend_errors += 1
+        logger.warning(f"Result cache backend failed: {error}")
+
+
+def _create_backend() -> Optional[CacheBackend]:
+    if settings.RESULT_CACHE_BACKEND == "redis":
+        try:
+            return RedisCacheBackend(settings.REDIS_URL)
+        except ImportError:
+            logger.warning("redis is not installed; result cache runs without a shared tier")
+            return None
+    if settings.RESULT_CACHE_BACKEND == "local":
+        return LocalCacheBackend()
+    return None
+
+
+result_cache = ResultCache(
+    max_entries=settings.RESULT_CACHE_MAX_ENTRIES,
+    ttl=settings.RESULT_CACHE_TTL,
+    backend=_create_backend() if settings.RESULT_CACHE_ENABLED else None,
+    enabled=settings.RESULT_CACHE_ENABLED,
+)
+# Keys carry the model version; drop the replaced version's results from memory
+model_registry.subscribe(lambda bundle: result_cache.clear_local())
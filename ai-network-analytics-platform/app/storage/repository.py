@@ -0,0 +1,256 @@
+import base64
+import math
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import and_, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.metrics import timed
+from app.ml.features import TELEMETRY_FEATURES
+from app.storage.tables import AnomalyRecord, TelemetrySample
+from app.storage.timestamps import utc_naive
+
+if TYPE_CHECKING:
+    # Needs greenlet, which only the asyncio database mode requires
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+MAX_PAGE_SIZE = 1000
+
+
+def _insert_ignoring_duplicates(db: Union[Session, "AsyncSession"], table):
+    """INSERT that skips rows whose (device_id, timestamp) already exists.
+
+    Returns the keys of the inserted rows where the dialect can skip
+    duplicates; elsewhere a duplicate fails the insert, so every row of a
+    successful insert is new.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table)
+    return (
+        dialect_insert(table)
+        .on_conflict_do_nothing(index_elements=["device_id", "timestamp"])
+        .returning(table.c.device_id, table.c.timestamp)
+    )
+
+
+def _returned_keys(result) -> Optional[List[Tuple]]:
+    """(device_id, timestamp) keys an insert returned; None if it returns none."""
+    return [tuple(row) for row in result] if result.returns_rows else None
+
+
+def _inserted(rows: List[Dict], keys: Optional[List[Tuple]]) -> List[bool]:
+    """Which of ``rows`` an insert stored, from the keys it returned.
+
+    Of rows sharing a key only the first is stored, as ON CONFLICT keeps
+    the first row it inserts.
+    """
+    if keys is None:
+        return [True] * len(rows)
+    remaining = set(keys)
+    stored = []
+    for row in rows:
+        key = (row["device_id"], row["timestamp"])
+        stored.append(key in remaining)
+        remaining.discard(key)
+    return stored
+
+
+def _to_datetime(epoch_seconds: float) -> datetime:
+    return datetime.utcfromtimestamp(epoch_seconds)
+
+
+def _clean(value: float) -> Optional[float]:
+    return None if math.isnan(value) else value
+
+
+def telemetry_rows(batch) -> List[Dict]:
+    """Convert a columnar TelemetryBatch into insert parameter rows."""
+    columns = {col: batch.columns[col].tolist() for col in TELEMETRY_FEATURES}
+    return [
+        {
+            "device_id": device_id,
+            "timestamp": _to_datetime(timestamp),
+            **{col: _clean(columns[col][i]) for col in TELEMETRY_FEATURES},
+        }
+        for i, (device_id, timestamp) in enumerate(zip(batch.device_ids, batch.timestamps.tolist()))
+    ]
+
+
+def anomaly_severity(anomaly_score: float) -> str:
+    """Severity of a detected anomaly from its calibrated percentile score."""
+    if anomaly_score >= 0.99:
+        return "high"
+    if anomaly_score >= 0.95:
+        return "medium"
+    return "low"
+
+
+def bulk_insert_telemetry(db: Session, rows: List[Dict]) -> List[bool]:
+    """Insert telemetry rows in one statement; returns which rows were new."""
+    if not rows:
+        return []
+    with timed("db_write", "telemetry"):
+        result = db.execute(_insert_ignoring_duplicates(db, TelemetrySample.__table__), rows)
+        stored = _inserted(rows, _returned_keys(result))
+        db.commit()
+    return stored
+
+
+def bulk_insert_anomalies(db: Session, rows: List[Dict]) -> List[bool]:
+    """Insert anomaly rows in one statement; returns which rows were new."""
+    if not rows:
+        return []
+    with timed("db_write", "anomalies"):
+        result = db.execute(_insert_ignoring_duplicates(db, AnomalyRecord.__table__), rows)
+        stored = _inserted(rows, _returned_keys(result))
+        db.commit()
+    return stored
+
+
+async def bulk_insert_telemetry_async(db: "AsyncSession", rows: List[Dict]) -> List[bool]:
+    """Insert telemetry rows on an asyncio session; COPY on PostgreSQL."""
+    if not rows:
+        return []
+    with timed("db_write", "telemetry"):
+        return await _bulk_insert_async(db, TelemetrySample.__table__, rows)
+
+
+async def bulk_insert_anomalies_async(db: "AsyncSession", rows: List[Dict]) -> List[bool]:
+    """Insert anomaly rows on an asyncio session; COPY on PostgreSQL."""
+    if not rows:
+        return []
+    with timed("db_write", "anomalies"):
+        return await _bulk_insert_async(db, AnomalyRecord.__table__, rows)
+
+
+async def _bulk_insert_async(db: "AsyncSession", table, rows: List[Dict]) -> List[bool]:
+    if db.get_bind().dialect.driver == "asyncpg":
+        stored = await _copy_insert(db, table, rows)
+    else:
+        result = await db.execute(_insert_ignoring_duplicates(db, table), rows)
+        stored = _inserted(rows, _returned_keys(result))
+    await db.commit()
+    return stored
+
+
+async def _copy_insert(db: "AsyncSession", table, rows: List[Dict]) -> List[bool]:
+    """Binary COPY into a staging table, then move rows that are new.
+
+    COPY cannot skip duplicate keys, so rows land in a per-connection
+    temporary table first and one INSERT ... SELECT drops the duplicates.
+    """
+    columns = [column.name for column in table.columns]
+    column_list = ", ".join(columns)
+    stage = f"{table.name}_stage"
+
+    connection = await db.connection()
+    driver = (await connection.get_raw_connection()).driver_connection
+    async with driver.transaction():
+        await driver.execute(f"CREATE TEMP TABLE IF NOT EXISTS {stage} (LIKE {table.name})")
+        await driver.copy_records_to_table(
+            stage, records=[tuple(row.get(col) for col in columns) for row in rows], columns=columns
+        )
+        inserted = await driver.fetch(
+            f"INSERT INTO {table.name} ({column_list}) SELECT {column_list} FROM {stage} "
+            f"ON CONFLICT (device_id, timestamp) DO NOTHING RETURNING device_id, timestamp"
+        )
+        await driver.execute(f"TRUNCATE {stage}")
+    return _inserted(rows, [tuple(record) for record in inserted])
+
+
+def encode_cursor(timestamp: datetime, device_id: str) -> str:
+    raw = f"{timestamp.isoformat()}|{device_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        timestamp, device_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return utc_naive(datetime.fromisoformat(timestamp)), device_id
+    except Exception:
+        raise ValueError("Invalid pagination cursor")
+
+
+def _anomalies_query(
+    start_time: Optional[datetime],
+    end_time: Optional[datetime],
+    device_id: Optional[str],
+    limit: int,
+    cursor: Optional[str],
+):
+    query = select(AnomalyRecord)
+
+    if device_id is not None:
+        query = query.where(AnomalyRecord.device_id == device_id)
+    # Timestamps are stored as naive UTC; compare like with like
+    if start_time is not None:
+        query = query.where(AnomalyRecord.timestamp >= utc_naive(start_time))
+    if end_time is not None:
+        query = query.where(AnomalyRecord.timestamp <= utc_naive(end_time))
+    if cursor:
+        cursor_time, cursor_device = decode_cursor(cursor)
+        query = query.where(or_(
+            AnomalyRecord.timestamp < cursor_time,
+            and_(AnomalyRecord.timestamp == cursor_time, AnomalyRecord.device_id < cursor_device),
+        ))
+
+    return query.order_by(AnomalyRecord.timestamp.desc(), AnomalyRecord.device_id.desc()).limit(limit + 1)
+
+
+def _anomalies_page(records: List[AnomalyRecord], limit: int) -> Tuple[List[Dict], Optional[str]]:
+    next_cursor = None
+    if len(records) > limit:
+        records = records[:limit]
+        next_cursor = encode_cursor(records[-1].timestamp, records[-1].device_id)
+
+    return [
+        {
+            "id": f"{record.device_id}@{record.timestamp.isoformat()}",
+            "timestamp": record.timestamp.isoformat(),
+            "device_id": record.device_id,
+            "anomaly_score": record.anomaly_score,
+            "predicted_latency": record.predicted_latency,
+            "description": record.description,
+            "severity": record.severity,
+        }
+        for record in records
+    ], next_cursor
+
+
+def query_anomalies(
+    db: Session,
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    device_id: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict], Optional[str]]:
+    """Newest-first page of anomalies in a time range.
+
+    Uses keyset pagination on (timestamp, device_id) so every page is an
+    index range scan, however deep the client pages. Returns the page and
+    the cursor for the next one (None on the last page).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    records = db.execute(_anomalies_query(start_time, end_time, device_id, limit, cursor)).scalars().all()
+    return _anomalies_page(records, limit)
+
+
+async def query_anomalies_async(
+    db: "AsyncSession",
+    start_time: Optional[datetime] = None,
+    end_time: Optional[datetime] = None,
+    device_id: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[Dict], Optional[str]]:
+    """``query_anomalies`` on an asyncio session."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    result = await db.execute(_anomalies_query(start_time, end_time, device_id, limit, cursor))
+    return _anomalies_page(result.scalars().all(), limit)
@@ -0,0 +1,477 @@
+import asyncio
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, delete, insert, select, update
+
+from app.core.config import settings
+from app.core.metrics import timed
+from app.ml.features import TELEMETRY_FEATURES
+from app.storage.sketch import QuantileSketch
+from app.storage.timestamps import utc_naive
+
+logger = logging.getLogger(__name__)
+
+TIERS: Tuple[Tuple[str, int], ...] = (("1m", 60), ("1h", 3600), ("1d", 86400))
+ANOMALY_METRIC = "anomaly_score"
+ROLLUP_METRICS = TELEMETRY_FEATURES + [ANOMALY_METRIC]
+# Device id of the fleet-wide rollups written alongside the per-device ones
+FLEET_DEVICE = "*"
+DEFAULT_RANGE = timedelta(days=1)
+
+_DURATION = re.compile(r"^(\d+)([smhd])$")
+_UNIT_SECONDS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+_EPOCH = datetime(1970, 1, 1)
+_DEVICE_CHUNK = 500  # devices per IN clause, well below SQLite's bound parameter limit
+_MAX_PENDING_FLUSHES = 4  # flush_rows multiples kept buffered while flushes fail
+
+
+def parse_resolution(value: str) -> Optional[int]:
+    """Seconds in a duration like ``90s``, ``5m``, ``6h`` or ``7d``; None for ``auto``."""
+    value = value.strip().lower()
+    if value == "auto":
+        return None
+    match = _DURATION.match(value)
+    if not match or int(match.group(1)) == 0:
+        raise ValueError(f"Invalid resolution '{value}'; use a duration such as 5m, 1h or 1d, or auto")
+    return int(match.group(1)) * _UNIT_SECONDS[match.group(2)]
+
+
+def _epoch(value: datetime) -> float:
+    return (value - _EPOCH).total_seconds()
+
+
+def _summary(rows: List) -> Dict:
+    """count/min/max/mean/p95 of one metric over the rollup rows of a bucket."""
+    count = sum(row.sample_count for row in rows)
+    low = min(row.min_value for row in rows)
+    high = max(row.max_value for row in rows)
+    if len(rows) == 1:
+        p95 = rows[0].p95_value
+    else:
+        sketch = QuantileSketch.merge_all(QuantileSketch.from_bytes(row.sketch) for row in rows)
+        p95 = min(max(sketch.quantile(0.95), low), high)
+    return {
+        "count": count,
+        "min": low,
+        "max": high,
+        "mean": sum(row.sum_value for row in rows) / count,
+        "p95": p95,
+    }
+
+
+class RollupStore:
+    """Per-device and fleet-wide 1m/1h/1d rollups of telemetry metrics.
+
+    Ingestion appends samples to an in-memory buffer; a flush folds the
+    buffered samples into the ``telemetry_rollups`` table for every tier
+    at once, merging them into the buckets already stored. Each row keeps
+    count, min, max, sum and p95 plus a QuantileSketch, so rows of several
+    buckets combine into wider buckets without revisiting raw samples.
+
+    Flushes read, merge and write rows, and are serialized within the
+    process; several processes ingesting into one database would need a
+    row-level upsert instead. The samples of a failed flush go back into
+    the buffer for the next one; past ``_MAX_PENDING_FLUSHES`` times
+    ``flush_rows`` buffered samples, the oldest are dropped.
+    """
+
+    def __init__(
+        self,
+        tiers: Sequence[Tuple[str, int]] = TIERS,
+        retention_days: Optional[Dict[str, int]] = None,
+        accuracy: float = 0.01,
+        flush_rows: int = 500000,
+        flush_interval: float = 30.0,
+        target_points: int = 500,
+        max_points: int = 10000,
+    ):
+        self.tiers = tuple(sorted(tiers, key=lambda tier: tier[1]))
+        self.retention_days = dict(retention_days or {})
+        self.accuracy = accuracy
+        self.flush_rows = max(1, flush_rows)
+        self.flush_interval = flush_interval
+        self.target_points = max(1, target_points)
+        self.max_points = max(1, max_points)
+        self._lock = threading.Lock()  # guards the buffer
+        self._flush_lock = threading.Lock()  # one read-merge-write at a time
+        self._chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = []
+        self._pending = 0
+        self._oldest: Optional[float] = None
+
+        self._samples_rolled = 0
+        self._samples_dropped = 0
+        self._rows_written = 0
+        self._flushes = 0
+        self._last_flush_ms = 0.0
+
+    # Writing
+
+    def append(self, device_ids, timestamps, columns: Dict[str, np.ndarray]) -> int:
+        """Buffer samples of ``columns`` (metric name to values); NaNs are skipped."""
+        device_ids = np.asarray(device_ids, dtype=object)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        chunks = []
+        for metric, values in columns.items():
+            values = np.asarray(values, dtype=np.float64)
+            mask = ~np.isnan(values)
+            n = int(mask.sum())
+            if n:
+                metric_index = np.full(n, ROLLUP_METRICS.index(metric), dtype=np.int64)
+                chunks.append((device_ids[mask], timestamps[mask], metric_index, values[mask]))
+
+        appended = sum(len(chunk[3]) for chunk in chunks)
+        if appended:
+            with self._lock:
+                if self._oldest is None:
+                    self._oldest = time.monotonic()
+                self._chunks.extend(chunks)
+                self._pending += appended
+        return appended
+
+    def append_batch(self, batch, rows: Optional[np.ndarray] = None) -> int:
+        """Buffer the telemetry metrics of a TelemetryBatch, or of its ``rows`` (a mask)."""
+        if rows is None:
+            rows = slice(None)
+        return self.append(batch.device_ids[rows], batch.timestamps[rows],
+                           {col: batch.columns[col][rows] for col in TELEMETRY_FEATURES})
+
+    @property
+    def due(self) -> bool:
+        oldest = self._oldest
+        return self._pending >= self.flush_rows or (
+            oldest is not None and time.monotonic() - oldest >= self.flush_interval
+        )
+
+    def flush_due(self) -> int:
+        """Flush if enough samples are buffered or the oldest is old enough.
+
+        Returns right away when another flush is running.
+        """
+        if not self.due or not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            return self._flush()
+        finally:
+            self._flush_lock.release()
+
+    def flush(self) -> int:
+        """Fold every buffered sample into the stored rollups."""
+        with self._flush_lock:
+            return self._flush()
+
+    def _flush(self) -> int:
+        with self._lock:
+            chunks, self._chunks = self._chunks, []
+            self._pending, self._oldest = 0, None
+        if not chunks:
+            return 0
+        try:
+            return self._write(chunks)
+        except Exception:
+            self._requeue(chunks)
+            raise
+
+    def _requeue(self, chunks: List) -> None:
+        """Put the chunks of a failed flush back in front of the buffer."""
+        with self._lock:
+            self._chunks[:0] = chunks
+            self._pending += sum(len(chunk[3]) for chunk in chunks)
+            # Retry after a full flush interval rather than on the next append
+            self._oldest = time.monotonic()
+            limit = _MAX_PENDING_FLUSHES * self.flush_rows
+            while self._pending > limit and len(self._chunks) > 1:
+                dropped = len(self._chunks.pop(0)[3])
+                self._pending -= dropped
+                self._samples_dropped += dropped
+
+    def _write(self, chunks: List) -> int:
+        from app.core.database import SessionLocal
+
+        device_ids = np.concatenate([chunk[0] for chunk in chunks])
+        timestamps = np.concatenate([chunk[1] for chunk in chunks])
+        metrics = np.concatenate([chunk[2] for chunk in chunks])
+        values = np.concatenate([chunk[3] for chunk in chunks])
+        n = len(values)
+        # Every sample also counts towards the fleet-wide rollup
+        device_ids = np.concatenate([device_ids.astype(str), np.full(n, FLEET_DEVICE)])
+        timestamps = np.concatenate([timestamps, timestamps])
+        metrics = np.concatenate([metrics, metrics])
+        values = np.concatenate([values, values])
+
+        start = time.perf_counter()
+        with timed("db_write", "rollups"), SessionLocal() as db:
+            written = sum(
+                self._write_tier(db, tier, width, device_ids, timestamps, metrics, values)
+                for tier, width in self.tiers
+            )
+            self._prune(db)
+            db.commit()
+
+        self._samples_rolled += n
+        self._rows_written += written
+        self._flushes += 1
+        self._last_flush_ms = (time.perf_counter() - start) * 1000
+        return n
+
+    def _write_tier(self, db, tier: str, width: int, device_ids: np.ndarray, timestamps: np.ndarray,
+                    metrics: np.ndarray, values: np.ndarray) -> int:
+        from app.storage.tables import TelemetryRollup
+
+        # One group per (device, metric, bucket), numbered in sorted order
+        devices, device_index = np.unique(device_ids, return_inverse=True)
+        bucket_starts, bucket_index = np.unique(
+            np.floor(timestamps / width).astype(np.int64) * width, return_inverse=True
+        )
+        n_metrics, n_buckets = len(ROLLUP_METRICS), len(bucket_starts)
+        group = (device_index.astype(np.int64) * n_metrics + metrics) * n_buckets + bucket_index
+
+        order = np.argsort(group, kind="stable")
+        sorted_group, sorted_values = group[order], values[order]
+        first = np.flatnonzero(np.r_[True, sorted_group[1:] != sorted_group[:-1]])
+        ids = sorted_group[first]
+        counts = np.diff(np.r_[first, len(sorted_group)])
+        sums = np.add.reduceat(sorted_values, first)
+        mins = np.minimum.reduceat(sorted_values, first)
+        maxs = np.maximum.reduceat(sorted_values, first)
+
+        # Fold in the rows already stored for these groups
+        sketch_groups = [group]
+        sketch_keys = [QuantileSketch.bucket_keys(values, self.accuracy).astype(np.int64)]
+        sketch_counts = [np.ones(len(values), dtype=np.int64)]
+        stored = np.zeros(len(ids), dtype=bool)
+        rows = self._stored(db, tier, devices, bucket_starts)
+        if rows:
+            row_devices = np.array([row.device_id for row in rows], dtype=devices.dtype)
+            row_buckets = np.array([int(_epoch(row.bucket_start)) for row in rows], dtype=np.int64)
+            d = np.minimum(np.searchsorted(devices, row_devices), len(devices) - 1)
+            b = np.minimum(np.searchsorted(bucket_starts, row_buckets), n_buckets - 1)
+            row_ids = (d * n_metrics + [ROLLUP_METRICS.index(row.metric) for row in rows]) * n_buckets + b
+            i = np.minimum(np.searchsorted(ids, row_ids), len(ids) - 1)
+            # The query matched devices and bucket range separately; keep exact matches
+            match = (devices[d] == row_devices) & (bucket_starts[b] == row_buckets) & (ids[i] == row_ids)
+            i = i[match]
+            matched = [row for row, keep in zip(rows, match.tolist()) if keep]
+            stored[i] = True
+            counts[i] += [row.sample_count for row in matched]
+            sums[i] += [row.sum_value for row in matched]
+            mins[i] = np.minimum(mins[i], [row.min_value for row in matched])
+            maxs[i] = np.maximum(maxs[i], [row.max_value for row in matched])
+            for row_id, row in zip(ids[i].tolist(), matched):
+                accuracy, keys, key_counts = QuantileSketch.unpack(row.sketch)
+                if accuracy != self.accuracy:
+                    raise ValueError(f"Stored {tier} rollups use sketch accuracy {accuracy}, not {self.accuracy}")
+                sketch_groups.append(np.full(len(keys), row_id, dtype=np.int64))
+                sketch_keys.append(keys.astype(np.int64))
+                sketch_counts.append(key_counts.astype(np.int64))
+
+        # Merge all sketches of all groups at once: sorting by (group, key)
+        # turns every group, and every sketch bucket within it, into a run
+        sketch_groups = np.concatenate(sketch_groups)
+        sketch_keys = np.concatenate(sketch_keys)
+        sketch_counts = np.concatenate(sketch_counts)
+        order = np.lexsort((sketch_keys, sketch_groups))
+        sketch_groups, sketch_keys = sketch_groups[order], sketch_keys[order]
+        run = np.flatnonzero(np.r_[True, (sketch_groups[1:] != sketch_groups[:-1])
+                                   | (sketch_keys[1:] != sketch_keys[:-1])])
+        bucket_counts = np.add.reduceat(sketch_counts[order], run)
+        sketch_keys = sketch_keys[run]
+        bounds = np.r_[np.searchsorted(sketch_groups[run], ids), len(run)]
+
+        # p95 of every group: first sketch bucket whose cumulative count passes the rank
+        cumulative = np.cumsum(bucket_counts)
+        before = np.r_[0, cumulative][bounds[:-1]]
+        position = np.searchsorted(cumulative, before + 0.95 * (counts - 1), side="right")
+        p95 = np.clip(QuantileSketch.key_values(sketch_keys[position], self.accuracy), mins, maxs)
+
+        bucket_of = bucket_starts[ids % n_buckets].tolist()
+        metric_of = ((ids // n_buckets) % n_metrics).tolist()
+        device_of = devices[ids // n_buckets // n_metrics].tolist()
+        inserts, updates = [], []
+        for i in range(len(ids)):
+            row = {
+                "sample_count": int(counts[i]),
+                "min_value": float(mins[i]),
+                "max_value": float(maxs[i]),
+                "sum_value": float(sums[i]),
+                "p95_value": float(p95[i]),
+                "sketch": QuantileSketch.pack(self.accuracy, sketch_keys[bounds[i]:bounds[i + 1]],
+                                              bucket_counts[bounds[i]:bounds[i + 1]]),
+            }
+            key = {
+                "tier": tier,
+                "device_id": device_of[i],
+                "metric": ROLLUP_METRICS[metric_of[i]],
+                "bucket_start": datetime.utcfromtimestamp(bucket_of[i]),
+            }
+            if stored[i]:
+                updates.append({**row, **{f"key_{name}": value for name, value in key.items()}})
+            else:
+                inserts.append({**row, **key})
+
+        table = TelemetryRollup.__table__
+        if inserts:
+            db.execute(insert(table), inserts)
+        if updates:
+            db.execute(
+                update(table).where(
+                    table.c.tier == bindparam("key_tier"),
+                    table.c.device_id == bindparam("key_device_id"),
+                    table.c.metric == bindparam("key_metric"),
+                    table.c.bucket_start == bindparam("key_bucket_start"),
+                ),
+                updates,
+            )
+        return len(ids)
+
+    def _stored(self, db, tier: str, devices: np.ndarray, bucket_starts: np.ndarray) -> List:
+        """Stored rows of ``tier`` that may belong to the given devices and buckets."""
+        from app.storage.tables import TelemetryRollup
+
+        low = datetime.utcfromtimestamp(int(bucket_starts[0]))
+        high = datetime.utcfromtimestamp(int(bucket_starts[-1]))
+        rows = []
+        for i in range(0, len(devices), _DEVICE_CHUNK):
+            query = select(
+                TelemetryRollup.device_id, TelemetryRollup.metric, TelemetryRollup.bucket_start,
+                TelemetryRollup.sample_count, TelemetryRollup.min_value, TelemetryRollup.max_value,
+                TelemetryRollup.sum_value, TelemetryRollup.sketch,
+            ).where(
+                TelemetryRollup.tier == tier,
+                TelemetryRollup.device_id.in_(devices[i:i + _DEVICE_CHUNK].tolist()),
+                TelemetryRollup.bucket_start.between(low, high),
+            )
+            rows.extend(db.execute(query).all())
+        return rows
+
+    def _prune(self, db) -> None:
+        from app.storage.tables import TelemetryRollup
+
+        now = datetime.utcnow()
+        for tier, _ in self.tiers:
+            days = self.retention_days.get(tier, 0)
+            if days > 0:
+                db.execute(delete(TelemetryRollup).where(
+                    TelemetryRollup.tier == tier,
+                    TelemetryRollup.bucket_start < now - timedelta(days=days),
+                ))
+
+    # Reading
+
+    def select_tier(self, start_time: datetime, resolution: int) -> Tuple[str, int]:
+        """Coarsest tier no wider than ``resolution`` that still holds ``start_time``.
+
+        When no tier is fine enough (resolution below the narrowest bucket,
+        or the finer tiers were already pruned that far back), the finest
+        tier holding ``start_time`` is used.
+        """
+        now = datetime.utcnow()
+        held = [
+            (tier, width) for tier, width in self.tiers
+            if self.retention_days.get(tier, 0) <= 0
+            or start_time >= now - timedelta(days=self.retention_days[tier])
+        ] or [self.tiers[-1]]
+        fitting = [(tier, width) for tier, width in held if width <= resolution]
+        return fitting[-1] if fitting else held[0]
+
+    def series(
+        self,
+        metrics: Sequence[str],
+        start_time: Optional[datetime] = None,
+        end_time: Optional[datetime] = None,
+        resolution: str = "auto",
+        device_id: Optional[str] = None,
+    ) -> Dict:
+        """Rolled-up ``metrics`` of a device, or of the fleet, over a time range.
+
+        ``resolution`` is a bucket width such as ``5m`` or ``6h``, or
+        ``auto`` for about ``target_points`` buckets over the range (the
+        last day by default). The coarsest tier satisfying it is read and
+        its buckets are merged into buckets of the requested width. Raises
+        ValueError for an invalid range or resolution.
+        """
+        from app.core.database import SessionLocal
+        from app.storage.tables import TelemetryRollup
+
+        end_time = utc_naive(end_time) if end_time else datetime.utcnow()
+        start_time = utc_naive(start_time) if start_time else end_time - DEFAULT_RANGE
+        if start_time >= end_time:
+            raise ValueError("start_time must be before end_time")
+        span = _epoch(end_time) - _epoch(start_time)
+        seconds = parse_resolution(resolution)
+        if seconds is None:
+            seconds = max(1, int(span / self.target_points))
+        tier, width = self.select_tier(start_time, seconds)
+        step = max(width, seconds // width * width)
+        if span / step > self.max_points:
+            raise ValueError(f"Resolution {resolution} gives more than {self.max_points} buckets; use a coarser one")
+
+        first_bucket = datetime.utcfromtimestamp(_epoch(start_time) // width * width)
+        query = select(
+            TelemetryRollup.metric, TelemetryRollup.bucket_start, TelemetryRollup.sample_count,
+            TelemetryRollup.min_value, TelemetryRollup.max_value, TelemetryRollup.sum_value,
+            TelemetryRollup.p95_value, TelemetryRollup.sketch,
+        ).where(
+            TelemetryRollup.tier == tier,
+            TelemetryRollup.device_id == (device_id or FLEET_DEVICE),
+            TelemetryRollup.metric.in_(list(metrics)),
+            TelemetryRollup.bucket_start >= first_bucket,
+            TelemetryRollup.bucket_start <= end_time,
+        )
+        buckets: Dict[int, Dict[str, List]] = {}
+        with SessionLocal() as db:
+            for row in db.execute(query):
+                bucket = int(_epoch(row.bucket_start) // step * step)
+                buckets.setdefault(bucket, {}).setdefault(row.metric, []).append(row)
+
+        return {
+            "tier": tier,
+            "resolution_seconds": step,
+            "buckets": [
+                {
+                    "bucket_start": datetime.utcfromtimestamp(bucket).isoformat(),
+                    "device_id": device_id,
+                    **{metric: _summary(rows[metric]) if metric in rows else None for metric in metrics},
+                }
+                for bucket, rows in sorted(buckets.items())
+            ],
+        }
+
+    def stats(self) -> Dict:
+        """Buffer and flush counters."""
+        return {
+            "tiers": [tier for tier, _ in self.tiers],
+            "retention_days": self.retention_days,
+            "pending_samples": self._pending,
+            "samples_rolled": self._samples_rolled,
+            "samples_dropped": self._samples_dropped,
+            "rows_written": self._rows_written,
+            "flushes": self._flushes,
+            "last_flush_ms": round(self._last_flush_ms, 3),
+        }
+
+
+async def rollup_flush_loop(store: RollupStore) -> None:
+    """Flush due rollups while ingestion is idle, so buffered samples become visible."""
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(store.flush_interval)
+        try:
+            await loop.run_in_executor(None, store.flush_due)
+        except Exception as e:
+            logger.error(f"Scheduled rollup flush failed: {e}")
+
+
+telemetry_rollups = RollupStore(
+    retention_days=settings.ROLLUP_RETENTION_DAYS,
+    accuracy=settings.ROLLUP_SKETCH_ACCURACY,
+    flush_rows=settings.ROLLUP_FLUSH_ROWS,
+    flush_interval=settings.ROLLUP_FLUSH_INTERVAL,
+    target_points=settings.ROLLUP_TARGET_POINTS,
+    max_points=settings.ROLLUP_MAX_POINTS,
+)
@@ -0,0 +1,133 @@
+import math
+import struct
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+_HEADER = struct.Struct("<f")
+_KEY_DTYPE = np.dtype("<i2")
+_COUNT_DTYPE = np.dtype("<u4")
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with bounded relative error (DDSketch).
+
+    Values are counted in buckets whose bounds grow geometrically by
+    ``gamma = (1 + accuracy) / (1 - accuracy)``, so every quantile estimate
+    is within ``accuracy`` relative error of a true sample value, and two
+    sketches of the same accuracy merge exactly by adding bucket counts.
+    Negative values use mirrored buckets; values within ``MIN_VALUE`` of
+    zero share one bucket.
+
+    Buckets are stored sparsely as sorted ``keys`` with their ``counts``.
+    Keys are signed so that their order is the order of the values they
+    stand for: ``sign(x) * (index + INDEX_BIAS)``, and 0 for zero.
+    """
+
+    MIN_VALUE = 1e-9
+    INDEX_BIAS = 16000  # keeps keys within int16 down to an accuracy of 0.001
+
+    def __init__(self, accuracy: float = 0.01, keys: Optional[np.ndarray] = None,
+                 counts: Optional[np.ndarray] = None):
+        if not 0.001 <= accuracy < 1:
+            raise ValueError("Sketch accuracy must be between 0.001 and 1")
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.keys = np.empty(0, dtype=np.int32) if keys is None else keys
+        self.counts = np.empty(0, dtype=np.int64) if counts is None else counts
+
+    @property
+    def count(self) -> int:
+        return int(self.counts.sum())
+
+    # Building
+
+    @staticmethod
+    def bucket_keys(values: np.ndarray, accuracy: float = 0.01) -> np.ndarray:
+        """Bucket key of every value, for sketches of ``accuracy``."""
+        values = np.asarray(values, dtype=np.float64)
+        log_gamma = math.log((1 + accuracy) / (1 - accuracy))
+        magnitude = np.abs(values)
+        nonzero = magnitude > QuantileSketch.MIN_VALUE
+        index = np.zeros(len(values), dtype=np.int64)
+        index[nonzero] = np.ceil(np.log(magnitude[nonzero]) / log_gamma)
+        bias = QuantileSketch.INDEX_BIAS
+        index = np.clip(index, 1 - bias, bias - 1) + bias
+        return np.where(nonzero, np.sign(values).astype(np.int64) * index, 0).astype(np.int32)
+
+    @classmethod
+    def from_values(cls, values: np.ndarray, accuracy: float = 0.01) -> "QuantileSketch":
+        keys, counts = np.unique(cls.bucket_keys(values, accuracy), return_counts=True)
+        return cls(accuracy, keys.astype(np.int32), counts.astype(np.int64))
+
+    # Merging
+
+    @classmethod
+    def merge_all(cls, sketches: Iterable["QuantileSketch"]) -> "QuantileSketch":
+        """One sketch counting the values of all ``sketches``."""
+        sketches = list(sketches)
+        if not sketches:
+            return cls()
+        accuracy = sketches[0].accuracy
+        if any(sketch.accuracy != accuracy for sketch in sketches):
+            raise ValueError("Cannot merge sketches of different accuracy")
+        if len(sketches) == 1:
+            return cls(accuracy, sketches[0].keys.copy(), sketches[0].counts.copy())
+
+        keys = np.concatenate([sketch.keys for sketch in sketches])
+        counts = np.concatenate([sketch.counts for sketch in sketches])
+        merged, inverse = np.unique(keys, return_inverse=True)
+        return cls(accuracy, merged.astype(np.int32),
+                   np.bincount(inverse, weights=counts, minlength=len(merged)).astype(np.int64))
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        """Add the counts of ``other`` to this sketch."""
+        merged = QuantileSketch.merge_all([self, other])
+        self.keys, self.counts = merged.keys, merged.counts
+        return self
+
+    # Querying
+
+    @staticmethod
+    def key_values(keys: np.ndarray, accuracy: float = 0.01) -> np.ndarray:
+        """Representative value of every bucket key, for sketches of ``accuracy``."""
+        keys = np.asarray(keys, dtype=np.int64)
+        gamma = (1 + accuracy) / (1 - accuracy)
+        index = np.abs(keys) - QuantileSketch.INDEX_BIAS
+        # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+        values = 2.0 * np.power(gamma, index.astype(np.float64)) / (gamma + 1.0)
+        return np.sign(keys) * values
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated ``q``-quantile (0 <= q <= 1), None when empty."""
+        if not len(self.counts):
+            return None
+        cumulative = np.cumsum(self.counts)
+        rank = q * (cumulative[-1] - 1)
+        position = min(int(np.searchsorted(cumulative, rank, side="right")), len(self.keys) - 1)
+        return float(self.key_values(self.keys[position:position + 1], self.accuracy)[0])
+
+    # Serialization
+
+    @staticmethod
+    def pack(accuracy: float, keys: np.ndarray, counts: np.ndarray) -> bytes:
+        """Serialize sketch buckets without building a sketch."""
+        return _HEADER.pack(accuracy) + keys.astype(_KEY_DTYPE).tobytes() + counts.astype(_COUNT_DTYPE).tobytes()
+
+    @staticmethod
+    def unpack(data: bytes) -> Tuple[float, np.ndarray, np.ndarray]:
+        """``(accuracy, keys, counts)`` of serialized sketch buckets."""
+        (accuracy,) = _HEADER.unpack_from(data)
+        n = (len(data) - _HEADER.size) // (_KEY_DTYPE.itemsize + _COUNT_DTYPE.itemsize)
+        keys = np.frombuffer(data, dtype=_KEY_DTYPE, count=n, offset=_HEADER.size)
+        counts = np.frombuffer(data, dtype=_COUNT_DTYPE, count=n, offset=_HEADER.size + n * _KEY_DTYPE.itemsize)
+        # float32 header: round back to the accuracy that was configured
+        return round(accuracy, 6), keys, counts
+
+    def to_bytes(self) -> bytes:
+        return self.pack(self.accuracy, self.keys, self.counts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "QuantileSketch":
+        accuracy, keys, counts = cls.unpack(data)
+        return cls(accuracy, keys.astype(np.int32), counts.astype(np.int64))
@@ -0,0 +1,65 @@
+from sqlalchemy import Column, DateTime, Float, Index, Integer, LargeBinary, String
+
+from app.core.database import Base
+
+
+class TelemetrySample(Base):
+    """One telemetry sample, keyed by device and sample time."""
+
+    __tablename__ = "telemetry"
+
+    device_id = Column(String(128), primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)
+    packet_rate = Column(Float)
+    error_rate = Column(Float)
+    latency_p95 = Column(Float)
+    throughput = Column(Float)
+    cpu_usage = Column(Float)
+    memory_usage = Column(Float)
+    bandwidth_usage = Column(Float)
+
+    __table_args__ = (
+        # The primary key serves per-device range scans; this one serves
+        # fleet-wide time range scans.
+        Index("ix_telemetry_timestamp_device", "timestamp", "device_id"),
+    )
+
+
+class AnomalyRecord(Base):
+    """A telemetry sample flagged by the anomaly detector."""
+
+    __tablename__ = "anomalies"
+
+    device_id = Column(String(128), primary_key=True)
+    timestamp = Column(DateTime, primary_key=True)
+    anomaly_score = Column(Float, nullable=False)
+    predicted_latency = Column(Float)
+    severity = Column(String(16), nullable=False)
+    description = Column(String(255))
+
+    __table_args__ = (
+        Index("ix_anomalies_timestamp_device", "timestamp", "device_id"),
+    )
+
+
+class TelemetryRollup(Base):
+    """Aggregate of one metric of one device over a 1m, 1h or 1d bucket."""
+
+    __tablename__ = "telemetry_rollups"
+
+    tier = Column(String(8), primary_key=True)
+    device_id = Column(String(128), primary_key=True)
+    metric = Column(String(32), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    sample_count = Column(Integer, nullable=False)
+    min_value = Column(Float, nullable=False)
+    max_value = Column(Float, nullable=False)
+    sum_value = Column(Float, nullable=False)
+    p95_value = Column(Float, nullable=False)
+    # Serialized QuantileSketch, merged when buckets are combined
+    sketch = Column(LargeBinary, nullable=False)
+
+    __table_args__ = (
+        # Fleet-wide range scans and retention pruning
+        Index("ix_rollups_tier_bucket", "tier", "bucket_start"),
+    )
@@ -0,0 +1,11 @@
+from datetime import datetime, timezone
+
+
+def utc_naive(value: datetime) -> datetime:
+    """``value`` as a naive UTC datetime, the form timestamps are stored in.
+
+    Naive values are taken to be UTC already.
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
@@ -0,0 +1,98 @@
+"""Shared helpers for the benchmark scripts."""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# Make the application package importable when running `python benchmarks/<script>.py`
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of ``samples`` (0 when empty)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    """Summarize latencies in milliseconds."""
+    return {
+        "count": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def sample_record(rng) -> Dict[str, float]:
+    """A realistic-looking telemetry record drawn from ``rng`` (a NumPy Generator)."""
+    return {
+        "packet_rate": float(rng.normal(1000, 200)),
+        "error_rate": float(abs(rng.normal(0.01, 0.005))),
+        "latency_p95": float(rng.normal(50, 15)),
+        "throughput": float(rng.normal(500, 100)),
+        "cpu_usage": float(rng.normal(60, 20)),
+        "memory_usage": float(rng.normal(70, 15)),
+        "bandwidth_usage": float(rng.normal(40, 10)),
+    }
+
+
+def time_call(fn: Callable[[], object], min_seconds: float = 0.5, min_runs: int = 5,
+              max_runs: int = 1000) -> Dict[str, float]:
+    """Call ``fn`` repeatedly and summarize its latency.
+
+    Runs at least ``min_runs`` times and until ``min_seconds`` have passed,
+    after one untimed warm-up call.
+    """
+    fn()
+    samples_ms = []
+    deadline = time.perf_counter() + min_seconds
+    while len(samples_ms) < max_runs and (len(samples_ms) < min_runs or time.perf_counter() < deadline):
+        start = time.perf_counter()
+        fn()
+        samples_ms.append((time.perf_counter() - start) * 1000)
+    summary = latency_summary(samples_ms)
+    summary["mean_ms"] = round(sum(samples_ms) / len(samples_ms), 3)
+    return summary
+
+
+def _git(*args: str) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=PROJECT_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_metadata() -> Dict:
+    """Commit and environment a benchmark ran on, so results can be compared."""
+    import numpy
+    import sklearn
+
+    return {
+        "commit": _git("rev-parse", "HEAD") or None,
+        "dirty": bool(_git("status", "--porcelain", "--", ".")),
+        "started_at": datetime.utcnow().isoformat(),
+        "python": platform.python_version(),
+        "numpy": numpy.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_results(path: str, result: Dict) -> None:
+    """Write ``result`` with run metadata as JSON to ``path``."""
+    with open(path, "w") as f:
+        json.dump({"metadata": run_metadata(), **result}, f, indent=2)
@@ -0,0 +1,99 @@
+"""Compare two benchmark result files, e.g. from two commits.
+
+Matches measurements by their path in the JSON (list entries by fields
+such as batch_size or concurrency), and reports the relative change of
+latencies (lower is better) and rates (higher is better). Changes worse
+than --threshold are flagged as regressions; with --fail-on-regression
+the exit status is 1 when there are any.
+
+    python benchmarks/micro.py --output base.json
+    git checkout feature && python benchmarks/micro.py --output head.json
+    python benchmarks/compare.py base.json head.json --threshold 0.1
+"""
+
+import argparse
+import json
+import re
+import sys
+from typing import Dict
+
+# Fields naming a list entry, so entries match however lists are ordered
+IDENTITY_KEYS = ("function", "model", "endpoint", "mode", "batch_size", "concurrency", "rows")
+DEFAULT_METRICS = r"(^|\.)(p50_ms|p95_ms|mean_ms|seconds|\w*per_sec)$"
+
+
+def flatten(node, path: str = "") -> Dict[str, float]:
+    """Numeric leaves of a result document by path, without run metadata."""
+    leaves = {}
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if key != "metadata":
+                leaves.update(flatten(value, f"{path}.{key}" if path else key))
+    elif isinstance(node, list):
+        for i, item in enumerate(node):
+            identity = ""
+            if isinstance(item, dict):
+                identity = ",".join(f"{key}={item[key]}" for key in IDENTITY_KEYS if key in item)
+            leaves.update(flatten(item, f"{path}[{identity or i}]"))
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        leaves[path] = float(node)
+    return leaves
+
+
+def higher_is_better(path: str) -> bool:
+    return path.endswith("per_sec")
+
+
+def compare(base: Dict, head: Dict, pattern: str, threshold: float) -> list:
+    metric = re.compile(pattern)
+    base_leaves, head_leaves = flatten(base), flatten(head)
+    rows = []
+    for path in sorted(set(base_leaves) & set(head_leaves)):
+        if not metric.search(path):
+            continue
+        old, new = base_leaves[path], head_leaves[path]
+        change = (new - old) / old if old else 0.0
+        improvement = change if higher_is_better(path) else -change
+        if improvement < -threshold:
+            verdict = "regressed"
+        elif improvement > threshold:
+            verdict = "improved"
+        else:
+            verdict = ""
+        rows.append({"metric": path, "base": old, "head": new, "change": change, "verdict": verdict})
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base", help="Results of the baseline run")
+    parser.add_argument("head", help="Results of the run to check")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change that counts (0.1 = 10%%)")
+    parser.add_argument("--metrics", default=DEFAULT_METRICS, help="Regex selecting compared metric paths")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.head) as f:
+        head = json.load(f)
+
+    for name, document in (("base", base), ("head", head)):
+        metadata = document.get("metadata", {}) if isinstance(document, dict) else {}
+        print(f"{name}: commit {metadata.get('commit')}{' (dirty)' if metadata.get('dirty') else ''}, "
+              f"{metadata.get('platform')}, {metadata.get('cpus')} cpus")
+
+    rows = compare(base, head, args.metrics, args.threshold)
+    width = max((len(row["metric"]) for row in rows), default=10)
+    for row in rows:
+        print(f"{row['metric']:<{width}}  {row['base']:>14.3f}  {row['head']:>14.3f}  "
+              f"{row['change'] * 100:>+8.1f}%  {row['verdict']}")
+
+    regressions = [row for row in rows if row["verdict"] == "regressed"]
+    print(f"{len(rows)} metrics compared, {len(regressions)} regressed beyond {args.threshold:.0%}")
+    if regressions and args.fail_on_regression:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
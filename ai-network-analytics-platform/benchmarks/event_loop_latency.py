@@ -0,0 +1,119 @@
+"""Measure /health latency while /analytics/analyze is under load.
+
+Shows how much model inference stalls the event loop for each inference
+executor mode. Run from the project root:
+
+    python benchmarks/event_loop_latency.py --modes inline thread process
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import latency_summary, sample_record
+
+
+async def _analysis_load(client, records, stop: asyncio.Event) -> int:
+    sent = 0
+    while not stop.is_set():
+        await client.post("/api/v1/analytics/analyze", json=records[sent % len(records)])
+        sent += 1
+        # The in-memory transport never suspends on I/O, so yield explicitly
+        await asyncio.sleep(0)
+    return sent
+
+
+async def _probe_health(client, duration: float, interval: float) -> list:
+    """Probe /health on a fixed schedule.
+
+    Latency is measured from the scheduled send time, so time spent waiting
+    for a blocked event loop is counted rather than hidden.
+    """
+    latencies = []
+    loop_start = time.perf_counter()
+    n = 0
+    while True:
+        scheduled = loop_start + n * interval
+        if scheduled - loop_start >= duration:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        await client.get("/health")
+        latencies.append((time.perf_counter() - scheduled) * 1000)
+        n += 1
+    return latencies
+
+
+async def run_mode(app, executor, mode: str, concurrency: int, duration: float) -> dict:
+    import httpx
+
+    executor.shutdown()
+    executor.mode = mode
+    executor.start()
+
+    rng = np.random.default_rng(7)
+    records = [sample_record(rng) for _ in range(256)]
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up every worker so pool start-up is not measured
+        await asyncio.gather(*[
+            client.post("/api/v1/analytics/analyze", json=records[0])
+            for _ in range(executor.max_workers * 2)
+        ])
+
+        stop = asyncio.Event()
+        load = [asyncio.create_task(_analysis_load(client, records, stop)) for _ in range(concurrency)]
+        health = await _probe_health(client, duration, interval=0.01)
+        stop.set()
+        analyzed = sum(await asyncio.gather(*load))
+
+    executor.shutdown()
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "analyze_requests_per_sec": round(analyzed / duration, 1),
+        "health": latency_summary(health),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread", "process"])
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(tempfile.mkdtemp(prefix="analytics-bench-"))
+
+    from main import app
+    from app.ml.executor import inference_executor
+    from app.ml.models import train_sample_models
+
+    train_sample_models()
+
+    results = [
+        asyncio.run(run_mode(app, inference_executor, mode, args.concurrency, args.duration))
+        for mode in args.modes
+    ]
+
+    for result in results:
+        health = result["health"]
+        print(f"{result['mode']:>8}: analyze {result['analyze_requests_per_sec']:>8} req/s | "
+              f"/health p50 {health['p50_ms']} ms, p99 {health['p99_ms']} ms, max {health['max_ms']} ms")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
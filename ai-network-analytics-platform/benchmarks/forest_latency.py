@@ -0,0 +1,91 @@
+"""Compare compiled forest inference against scikit-learn.
+
+Trains the sample models, then times the anomaly detector and the
+performance predictor through scikit-learn and through the compiled NumPy
+engine at several batch sizes. Every batch is also checked for identical
+output.
+
+    python benchmarks/forest_latency.py --batch-sizes 1 16 256 4096
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import latency_summary, sample_record
+
+
+def _time(fn, X, repeats: int) -> list:
+    fn(X)  # warm up
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(X)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 256, 4096])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(tempfile.mkdtemp(prefix="analytics-bench-"))
+
+    from app.ml.models import TELEMETRY_FEATURES, train_sample_models
+    from app.ml.registry import model_registry
+
+    train_sample_models()
+    bundle = model_registry.active
+    detector, predictor = bundle.anomaly_detector, bundle.performance_predictor
+
+    def sklearn_anomaly(X):
+        return np.where(detector.model.predict(detector.scaler.transform(X)) == -1, 1, 0)
+
+    def sklearn_performance(X):
+        return predictor.model.predict(predictor.scaler.transform(X))
+
+    models = {
+        "anomaly_detector": (detector, sklearn_anomaly, detector.compiled.predict_anomalies_array),
+        "performance_predictor": (predictor, sklearn_performance, predictor.compiled.predict_performance_array),
+    }
+
+    rng = np.random.default_rng(7)
+    results = []
+    for batch_size in args.batch_sizes:
+        records = [sample_record(rng) for _ in range(batch_size)]
+        X = np.array([[record[col] for col in TELEMETRY_FEATURES] for record in records])
+        repeats = max(3, args.repeats if batch_size <= 256 else args.repeats // 10)
+
+        for name, (model, sklearn_fn, compiled_fn) in models.items():
+            X_model = X[:, [TELEMETRY_FEATURES.index(col) for col in model.feature_columns]]
+            sklearn_ms = latency_summary(_time(sklearn_fn, X_model, repeats))
+            compiled_ms = latency_summary(_time(compiled_fn, X_model, repeats))
+            results.append({
+                "model": name,
+                "batch_size": batch_size,
+                "identical": bool(np.array_equal(sklearn_fn(X_model), compiled_fn(X_model))),
+                "sklearn": sklearn_ms,
+                "compiled": compiled_ms,
+                "speedup_p50": round(sklearn_ms["p50_ms"] / max(compiled_ms["p50_ms"], 1e-6), 2),
+            })
+
+    for r in results:
+        print(f"{r['model']:>22} batch {r['batch_size']:>5}: sklearn p50 {r['sklearn']['p50_ms']:>9} ms | "
+              f"compiled p50 {r['compiled']['p50_ms']:>9} ms | x{r['speedup_p50']:<6} "
+              f"identical={r['identical']}")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
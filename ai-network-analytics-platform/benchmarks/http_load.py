@@ -0,0 +1,172 @@
+"""Local HTTP load generator for the analyze and ingest endpoints.
+
+Drives POST /api/v1/analytics/analyze and POST /api/v1/telemetry/ingest
+with a fixed number of concurrent clients for a fixed duration, once per
+endpoint and concurrency level, and reports requests/sec, latency
+percentiles and status codes. By default the app runs in-process over
+ASGI with its normal startup (models, inference workers, ingest
+pipeline); pass --url to load a running server over HTTP instead.
+
+    python benchmarks/http_load.py --concurrency 1,8,32 --duration 10
+    python benchmarks/http_load.py --url http://localhost:8000 --endpoints analyze --output load.json
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import latency_summary, sample_record, write_results
+
+ENDPOINTS = {
+    "analyze": "/api/v1/analytics/analyze",
+    "ingest": "/api/v1/telemetry/ingest",
+}
+
+
+def build_bodies(endpoint: str, n_bodies: int, rows_per_payload: int, n_devices: int, seed: int = 13) -> list:
+    rng = np.random.default_rng(seed)
+    if endpoint == "analyze":
+        return [sample_record(rng) for _ in range(n_bodies)]
+
+    start = time.time() - n_bodies * rows_per_payload
+    bodies = []
+    for i in range(n_bodies):
+        records = []
+        for j in range(rows_per_payload):
+            record = sample_record(rng)
+            record["device_id"] = f"device_{(i * rows_per_payload + j) % n_devices:05d}"
+            record["timestamp"] = start + i * rows_per_payload + j
+            records.append(record)
+        bodies.append({"records": records})
+    return bodies
+
+
+async def _client(client, path: str, bodies: list, offset: int, deadline: float, results: dict) -> None:
+    i = offset
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.post(path, json=bodies[i % len(bodies)])
+            status = response.status_code
+        except Exception as e:
+            status = type(e).__name__
+            response = None
+        results["latencies"].append((time.perf_counter() - start) * 1000)
+        results["status"][status] = results["status"].get(status, 0) + 1
+        i += 1
+        if status == 503 and response is not None:
+            # Back off as the ingest endpoint asks, scaled down for benchmarking
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")) / 100)
+        else:
+            # The in-memory transport never suspends on I/O, so yield explicitly
+            await asyncio.sleep(0)
+
+
+async def run_load(client, endpoint: str, concurrency: int, duration: float, bodies: list,
+                   rows_per_request: int) -> dict:
+    results = {"latencies": [], "status": {}}
+    start = time.perf_counter()
+    deadline = start + duration
+    await asyncio.gather(*[
+        _client(client, ENDPOINTS[endpoint], bodies, n * 7919, deadline, results)
+        for n in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - start
+
+    requests = len(results["latencies"])
+    succeeded = sum(count for status, count in results["status"].items() if status in (200, 202))
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 3),
+        "requests": requests,
+        "requests_per_sec": round(requests / elapsed, 1),
+        "rows_per_sec": round(succeeded * rows_per_request / elapsed, 1),
+        "status": {str(status): count for status, count in sorted(results["status"].items(), key=str)},
+        "latency": latency_summary(results["latencies"]),
+    }
+
+
+async def _wait_for_models(client, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not (await client.get("/health")).json().get("models_ready"):
+        if time.monotonic() > deadline:
+            raise RuntimeError("Models did not become ready")
+        await asyncio.sleep(0.1)
+
+
+async def _drain_ingest(client, timeout: float = 60.0) -> None:
+    """Wait until accepted telemetry is flushed, so it does not load the next run."""
+    deadline = time.monotonic() + timeout
+    while (await client.get("/api/v1/telemetry/stats")).json()["queue_depth"] and time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+
+
+async def run_all(client, args) -> list:
+    await _wait_for_models(client)
+    runs = []
+    for endpoint in args.endpoints:
+        rows = 1 if endpoint == "analyze" else args.rows_per_payload
+        bodies = build_bodies(endpoint, args.bodies, args.rows_per_payload, args.devices)
+        # Warm up connection pools, inference workers and caches
+        await run_load(client, endpoint, max(args.concurrency), args.warmup, bodies, rows)
+        for concurrency in args.concurrency:
+            if endpoint == "ingest":
+                await _drain_ingest(client)
+            run = await run_load(client, endpoint, concurrency, args.duration, bodies, rows)
+            runs.append(run)
+            print(f"{endpoint:>8} x{concurrency:<4}: {run['requests_per_sec']:>9} req/s, "
+                  f"{run['rows_per_sec']:>10} rows/s, p50 {run['latency']['p50_ms']} ms, "
+                  f"p99 {run['latency']['p99_ms']} ms, status {run['status']}")
+    return runs
+
+
+async def main_async(args) -> list:
+    import httpx
+
+    if args.url:
+        limits = httpx.Limits(max_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=args.url, timeout=30, limits=limits) as client:
+            return await run_all(client, args)
+
+    os.chdir(tempfile.mkdtemp(prefix="analytics-bench-"))
+    from main import app
+    from app.ml.models import train_sample_models
+
+    train_sample_models()
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=30) as client:
+            return await run_all(client, args)
+    finally:
+        await app.router.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server, e.g. http://localhost:8000")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--concurrency", default="1,8,32", help="Comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per endpoint and concurrency")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Seconds of unrecorded load per endpoint")
+    parser.add_argument("--rows-per-payload", type=int, default=50, help="Records per ingest request")
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--bodies", type=int, default=1000, help="Distinct request bodies cycled through")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+    args.concurrency = [int(n) for n in args.concurrency.split(",")]
+
+    output = os.path.abspath(args.output) if args.output else None
+    runs = asyncio.run(main_async(args))
+
+    if output:
+        write_results(output, {"target": args.url or "in-process", "runs": runs})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""Local load generator for /api/v1/telemetry/ingest.
+
+Drives the ingest endpoint with concurrent clients and reports accepted and
+rejected (503) payloads plus sustained flushed rows/sec. By default the app
+runs in-process; pass --url to target a running server instead.
+
+    python benchmarks/ingest_load.py --concurrency 16 --rows-per-payload 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import latency_summary, sample_record
+
+
+def build_payloads(n_payloads: int, rows_per_payload: int, n_devices: int, seed: int = 11) -> list:
+    rng = np.random.default_rng(seed)
+    start = time.time() - n_payloads * rows_per_payload
+    payloads = []
+    for i in range(n_payloads):
+        records = []
+        for j in range(rows_per_payload):
+            record = sample_record(rng)
+            record["device_id"] = f"device_{(i * rows_per_payload + j) % n_devices:05d}"
+            record["timestamp"] = start + i * rows_per_payload + j
+            records.append(record)
+        payloads.append({"records": records})
+    return payloads
+
+
+async def _client(client, payloads, next_index, results) -> None:
+    while True:
+        i = next_index[0]
+        if i >= len(payloads):
+            return
+        next_index[0] += 1
+        start = time.perf_counter()
+        response = await client.post("/api/v1/telemetry/ingest", json=payloads[i])
+        results["latencies"].append((time.perf_counter() - start) * 1000)
+        results[response.status_code] = results.get(response.status_code, 0) + 1
+        if response.status_code == 503:
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")) / 100)
+        else:
+            # The in-memory transport never suspends on I/O, so yield explicitly
+            await asyncio.sleep(0)
+
+
+async def run(client, args) -> dict:
+    payloads = build_payloads(args.payloads, args.rows_per_payload, args.devices)
+    results = {"latencies": []}
+    next_index = [0]
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_client(client, payloads, next_index, results) for _ in range(args.concurrency)])
+    submit_elapsed = time.perf_counter() - start
+
+    # Wait until everything accepted has been flushed
+    expected_rows = results.get(200, 0) * args.rows_per_payload
+    while True:
+        stats = (await client.get("/api/v1/telemetry/stats")).json()
+        if stats["rows_flushed"] + stats["rows_invalid"] >= expected_rows:
+            break
+        await asyncio.sleep(0.05)
+    total_elapsed = time.perf_counter() - start
+
+    return {
+        "payloads": args.payloads,
+        "rows_per_payload": args.rows_per_payload,
+        "concurrency": args.concurrency,
+        "accepted": results.get(200, 0),
+        "rejected_503": results.get(503, 0),
+        "accepted_rows_per_sec": round(expected_rows / submit_elapsed, 1),
+        "flushed_rows_per_sec": round(stats["rows_flushed"] / total_elapsed, 1),
+        "request_latency": latency_summary(results["latencies"]),
+        "pipeline": stats,
+    }
+
+
+async def main_async(args) -> dict:
+    import httpx
+
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, timeout=30) as client:
+            return await run(client, args)
+
+    os.chdir(tempfile.mkdtemp(prefix="analytics-bench-"))
+    from main import app
+    from app.core.database import init_db
+    from app.ingest.pipeline import ingest_pipeline
+    from app.ml.models import train_sample_models
+
+    await init_db()
+    if args.no_analysis:
+        ingest_pipeline.remove_sink("analysis")
+    else:
+        train_sample_models()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        result = await run(client, args)
+    await ingest_pipeline.stop()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="Base URL of a running server, e.g. http://localhost:8000")
+    parser.add_argument("--payloads", type=int, default=2000)
+    parser.add_argument("--rows-per-payload", type=int, default=50)
+    parser.add_argument("--devices", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--no-analysis", action="store_true", help="Measure ingestion without model scoring")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    result = asyncio.run(main_async(args))
+
+    print(f"accepted {result['accepted']} / rejected {result['rejected_503']} payloads")
+    print(f"accepted {result['accepted_rows_per_sec']} rows/s, "
+          f"sustained {result['flushed_rows_per_sec']} rows/s flushed")
+    print(f"request latency p50 {result['request_latency']['p50_ms']} ms, "
+          f"p99 {result['request_latency']['p99_ms']} ms")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
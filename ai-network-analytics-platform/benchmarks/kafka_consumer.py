@@ -0,0 +1,124 @@
+"""Throughput of the telemetry consumer on the in-memory broker.
+
+Fills a partitioned in-memory topic with telemetry messages and drains it
+with the consumer at several batch sizes, reporting rows/sec and per-batch
+latency. A per-message baseline scores the same messages one model call
+at a time.
+
+    python benchmarks/kafka_consumer.py --messages 50000 --batch-sizes 100,1000,5000
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from common import latency_summary, sample_record
+
+
+def build_messages(n_messages: int, records_per_message: int, n_devices: int,
+                   anomaly_rate: float, seed: int = 5) -> list:
+    rng = np.random.default_rng(seed)
+    start = time.time() - n_messages * records_per_message
+    messages = []
+    for i in range(n_messages):
+        records = []
+        for j in range(records_per_message):
+            record = sample_record(rng)
+            if rng.random() < anomaly_rate:
+                record["latency_p95"] *= 8
+                record["error_rate"] *= 20
+            record["device_id"] = f"device_{(i * records_per_message + j) % n_devices:05d}"
+            record["timestamp"] = start + i * records_per_message + j
+            records.append(record)
+        payload = records[0] if records_per_message == 1 else {"records": records}
+        messages.append((records[0]["device_id"].encode(), json.dumps(payload).encode()))
+    return messages
+
+
+def drain(messages: list, batch_size: int, partitions: int) -> dict:
+    from app.ingest.consumer import InMemoryBroker, TelemetryConsumer
+
+    broker = InMemoryBroker(partitions=partitions)
+    for key, value in messages:
+        broker.produce("network.telemetry", value, key)
+    consumer = TelemetryConsumer(broker, batch_size=batch_size, poll_timeout_ms=0)
+
+    batch_ms = []
+    start = time.perf_counter()
+    while True:
+        batch_start = time.perf_counter()
+        if not consumer.process_batch():
+            break
+        batch_ms.append((time.perf_counter() - batch_start) * 1000)
+    elapsed = time.perf_counter() - start
+
+    stats = consumer.stats()
+    return {
+        "batch_size": batch_size,
+        "rows_per_sec": round(stats["rows_scored"] / elapsed, 1),
+        "messages_per_sec": round(stats["messages"] / elapsed, 1),
+        "batch_latency": latency_summary(batch_ms),
+        "anomalies_published": len(broker.messages("anomaly.detection")),
+        "uncommitted": broker.lag(),
+        "consumer": stats,
+    }
+
+
+def per_message_baseline(messages: list, limit: int) -> dict:
+    from app.ml.inference import analyze_network_batch
+
+    sample = [json.loads(value) for _, value in messages[:limit]]
+    start = time.perf_counter()
+    rows = 0
+    for payload in sample:
+        records = payload.get("records", [payload])
+        analyze_network_batch(records)
+        rows += len(records)
+    elapsed = time.perf_counter() - start
+    return {"messages": len(sample), "rows_per_sec": round(rows / elapsed, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=50000)
+    parser.add_argument("--records-per-message", type=int, default=1)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--partitions", type=int, default=4)
+    parser.add_argument("--anomaly-rate", type=float, default=0.02)
+    parser.add_argument("--batch-sizes", default="100,1000,5000")
+    parser.add_argument("--baseline-messages", type=int, default=2000)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(tempfile.mkdtemp(prefix="analytics-bench-"))
+    from app.ml.models import train_sample_models
+
+    train_sample_models()
+    messages = build_messages(args.messages, args.records_per_message, args.devices, args.anomaly_rate)
+
+    result = {
+        "messages": args.messages,
+        "records_per_message": args.records_per_message,
+        "partitions": args.partitions,
+        "per_message_baseline": per_message_baseline(messages, args.baseline_messages),
+        "batched": [drain(messages, int(size), args.partitions) for size in args.batch_sizes.split(",")],
+    }
+
+    print(f"per-message scoring: {result['per_message_baseline']['rows_per_sec']} rows/s")
+    for run in result["batched"]:
+        print(f"batch {run['batch_size']:>6}: {run['rows_per_sec']} rows/s, "
+              f"batch p50 {run['batch_latency']['p50_ms']} ms, "
+              f"{run['anomalies_published']} anomalies published, {run['uncommitted']} uncommitted")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
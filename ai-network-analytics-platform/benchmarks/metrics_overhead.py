@@ -0,0 +1,122 @@
+"""Measure the cost of the Prometheus instrumentation.
+
+Runs the same workload in fresh interpreters with PROMETHEUS_ENABLED on
+and off: the per-call cost of an empty ``timed()`` block, and single-record
+analysis latency through the sklearn and compiled models.
+
+    python benchmarks/metrics_overhead.py --iterations 2000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import latency_summary
+
+
+def _child_prepare() -> dict:
+    from app.ml.models import train_sample_models
+    from app.ml.registry import model_registry
+
+    train_sample_models()
+    return {"version": model_registry.active.version}
+
+
+def _child_measure(version: str, iterations: int) -> dict:
+    import numpy as np
+
+    from app.core import metrics
+    from app.ml.inference import analyze_network_batch
+    from app.ml.models import analyze_network_data
+    from app.ml.registry import model_registry
+    from common import sample_record
+
+    calls = 200_000
+    start = time.perf_counter()
+    for _ in range(calls):
+        with metrics.timed("benchmark"):
+            pass
+    timer_ns = (time.perf_counter() - start) / calls * 1e9
+
+    model_registry.activate(version)
+    compiled = model_registry.load_compiled(version)
+    rng = np.random.default_rng(0)
+    records = [sample_record(rng) for _ in range(iterations)]
+
+    def measure(analyze) -> list:
+        for record in records[:50]:
+            analyze(record)
+        samples = []
+        for record in records:
+            start = time.perf_counter()
+            analyze(record)
+            samples.append((time.perf_counter() - start) * 1000)
+        return samples
+
+    sklearn_ms = measure(analyze_network_data)
+    model_registry.install(compiled)
+    compiled_ms = measure(lambda record: analyze_network_batch([record]))
+    return {
+        "metrics_enabled": metrics.ENABLED,
+        "timer_ns": round(timer_ns, 1),
+        "analyze_sklearn": latency_summary(sklearn_ms),
+        "analyze_compiled": latency_summary(compiled_ms),
+    }
+
+
+def _spawn(workdir: str, *args: str, env: dict = None) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", *args],
+        cwd=workdir, env={**os.environ, "PROMETHEUS_MULTIPROC_DIR": "", **(env or {})},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        if args.child[0] == "prepare":
+            result = _child_prepare()
+        else:
+            result = _child_measure(args.child[1], int(args.child[2]))
+        print(json.dumps(result))
+        return
+
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix="analytics-bench-")
+    version = _spawn(workdir, "prepare", env={"PROMETHEUS_ENABLED": "false"})["version"]
+
+    result = {"iterations": args.iterations}
+    for mode, flag in (("enabled", "true"), ("disabled", "false")):
+        result[mode] = _spawn(workdir, "measure", version, str(args.iterations),
+                              env={"PROMETHEUS_ENABLED": flag})
+    for path in ("analyze_sklearn", "analyze_compiled"):
+        result[f"{path}_overhead_us"] = round(
+            (result["enabled"][path]["p50_ms"] - result["disabled"][path]["p50_ms"]) * 1000, 1
+        )
+
+    for mode in ("enabled", "disabled"):
+        stats = result[mode]
+        print(f"metrics {mode:>8}: timed() {stats['timer_ns']} ns, "
+              f"analyze p50 sklearn {stats['analyze_sklearn']['p50_ms']} ms, "
+              f"compiled {stats['analyze_compiled']['p50_ms']} ms")
+    print(f"overhead per analysis: sklearn {result['analyze_sklearn_overhead_us']} us, "
+          f"compiled {result['analyze_compiled_overhead_us']} us")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
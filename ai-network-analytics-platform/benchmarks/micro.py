@@ -0,0 +1,139 @@
+"""Micro-benchmarks of the model entry points.
+
+Times analyze_network_data (one call per record) against
+analyze_network_batch, predict_anomalies and predict_performance at
+several batch sizes, and train_model of both models at several training
+set sizes, all on synthetic telemetry. Prediction runs on the models the
+service would serve (trained on the sample data), so results follow the
+INFERENCE_ENGINE settings.
+
+    python benchmarks/micro.py --batch-sizes 1,10,100,1000,10000 --train-sizes 1000,10000,50000
+    python benchmarks/micro.py --output micro-$(git rev-parse --short HEAD).json
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from common import sample_record, time_call, write_results
+
+
+def telemetry_frame(n_rows: int, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame([sample_record(rng) for _ in range(n_rows)])
+
+
+def _sizes(value: str) -> list:
+    return [int(size) for size in value.split(",")]
+
+
+def _throughput(rows: int, timing: dict) -> dict:
+    return {**timing, "rows_per_sec": round(rows / (timing["p50_ms"] / 1000), 1) if timing["p50_ms"] else 0.0}
+
+
+def bench_training(train_sizes: list, repeats: int) -> list:
+    from app.ml.models import NetworkAnomalyDetector, NetworkPerformancePredictor
+
+    results = []
+    model_dir = tempfile.mkdtemp(prefix="analytics-bench-models-")
+    for n_rows in train_sizes:
+        df = telemetry_frame(n_rows, seed=n_rows)
+        for name, cls in (("anomaly_detector", NetworkAnomalyDetector),
+                          ("performance_predictor", NetworkPerformancePredictor)):
+            seconds = []
+            for _ in range(repeats):
+                model = cls(model_path=model_dir)
+                start = time.perf_counter()
+                if not model.train_model(df):
+                    raise RuntimeError(f"{name} failed to train on {n_rows} rows")
+                seconds.append(time.perf_counter() - start)
+            best = min(seconds)
+            results.append({
+                "model": name,
+                "rows": n_rows,
+                "seconds": round(best, 3),
+                "rows_per_sec": round(n_rows / best, 1),
+            })
+    return results
+
+
+def bench_prediction(batch_sizes: list, min_seconds: float) -> list:
+    from app.ml.registry import model_registry
+
+    bundle = model_registry.active
+    results = []
+    for batch_size in batch_sizes:
+        df = telemetry_frame(batch_size, seed=batch_size)
+        for name, fn in (("predict_anomalies", bundle.anomaly_detector.predict_anomalies),
+                         ("predict_performance", bundle.performance_predictor.predict_performance)):
+            timing = time_call(lambda: fn(df), min_seconds=min_seconds, min_runs=3)
+            results.append({"function": name, "batch_size": batch_size, **_throughput(batch_size, timing)})
+    return results
+
+
+def bench_analyze(batch_sizes: list, min_seconds: float) -> list:
+    from app.ml.inference import analyze_network_batch
+    from app.ml.models import analyze_network_data
+
+    rng = np.random.default_rng(3)
+    results = []
+    for batch_size in batch_sizes:
+        records = [sample_record(rng) for _ in range(batch_size)]
+
+        def per_record():
+            for record in records:
+                analyze_network_data(record)
+
+        for name, fn in (("analyze_network_data", per_record),
+                         ("analyze_network_batch", lambda: analyze_network_batch(records))):
+            timing = time_call(fn, min_seconds=min_seconds, min_runs=3)
+            results.append({"function": name, "batch_size": batch_size, **_throughput(batch_size, timing)})
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-sizes", default="1,10,100,1000,10000")
+    parser.add_argument("--analyze-batch-sizes", default="1,10,100,1000",
+                        help="analyze_network_data runs once per record, so keep these smaller")
+    parser.add_argument("--train-sizes", default="1000,10000,50000")
+    parser.add_argument("--train-repeats", type=int, default=1, help="Best of this many fits is reported")
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="Minimum timing per measurement")
+    parser.add_argument("--skip", nargs="*", default=[], choices=["analyze", "prediction", "training"])
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(tempfile.mkdtemp(prefix="analytics-bench-"))
+    from app.core.config import settings
+    from app.ml.models import train_sample_models
+
+    train_sample_models()
+
+    result = {
+        "settings": {
+            "INFERENCE_ENGINE": settings.INFERENCE_ENGINE,
+            "INFERENCE_COMPILED_MAX_ROWS": settings.INFERENCE_COMPILED_MAX_ROWS,
+            "TRAINING_N_JOBS": settings.TRAINING_N_JOBS,
+        },
+        "analyze": [] if "analyze" in args.skip else bench_analyze(_sizes(args.analyze_batch_sizes), args.min_seconds),
+        "prediction": [] if "prediction" in args.skip else bench_prediction(_sizes(args.batch_sizes), args.min_seconds),
+        "training": [] if "training" in args.skip else bench_training(_sizes(args.train_sizes), args.train_repeats),
+    }
+
+    for run in result["analyze"] + result["prediction"]:
+        print(f"{run['function']:>22} batch {run['batch_size']:>6}: p50 {run['p50_ms']:>10} ms, "
+              f"{run['rows_per_sec']:>12} rows/s")
+    for run in result["training"]:
+        print(f"{run['model']:>22} train {run['rows']:>6}: {run['seconds']:>8} s, {run['rows_per_sec']:>12} rows/s")
+
+    if output:
+        write_results(output, result)
+
+
+if __name__ == "__main__":
+    main()
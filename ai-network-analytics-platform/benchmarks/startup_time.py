@@ -0,0 +1,149 @@
+"""Measure server cold-start time and model loading.
+
+Starts the application in fresh interpreters and reports, from process
+launch, when ``main`` is imported, when startup completes and /health
+answers, and when the background warm-up has loaded the models. Also
+compares loading a model version with and without memory-mapping.
+
+    python benchmarks/startup_time.py --runs 5
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import percentile
+
+
+def _child_prepare() -> dict:
+    from app.ml.models import train_sample_models
+    from app.ml.registry import model_registry
+
+    train_sample_models()
+    return {"version": model_registry.active.version}
+
+
+def _child_startup(launched_at: float) -> dict:
+    result = {"interpreter_s": time.time() - launched_at}
+    start = time.perf_counter()
+    from main import app
+    from app.ml.warmup import model_warmup
+    result["import_main_s"] = time.perf_counter() - start
+    result["ml_imported_at_startup"] = "sklearn" in sys.modules
+
+    async def run() -> None:
+        import httpx
+
+        await app.router.startup()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            response = await client.get("/health")
+            result["health_ready_s"] = time.time() - launched_at
+            result["health_status"] = response.status_code
+            await model_warmup.wait()
+            result["models_ready_s"] = time.time() - launched_at
+        result["warmup"] = model_warmup.stats()
+        await app.router.shutdown()
+
+    asyncio.run(run())
+    return result
+
+
+def _child_load(version: str) -> dict:
+    import resource
+
+    from app.ml.registry import model_registry
+
+    start = time.perf_counter()
+    import app.ml.models  # noqa: F401
+    import_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    model_registry.load(version)
+    return {
+        "import_models_s": import_s,
+        "load_s": time.perf_counter() - start,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _spawn(workdir: str, *args: str, env: dict = None) -> dict:
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", *args],
+        cwd=workdir, env={**os.environ, **(env or {})},
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _summary(values: list) -> dict:
+    return {
+        "p50_s": round(percentile(values, 50), 4),
+        "min_s": round(min(values), 4),
+        "max_s": round(max(values), 4),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode = args.child[0]
+        if mode == "prepare":
+            result = _child_prepare()
+        elif mode == "startup":
+            result = _child_startup(float(args.child[1]))
+        else:
+            result = _child_load(args.child[1])
+        print(json.dumps(result))
+        return
+
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix="analytics-bench-")
+    version = _spawn(workdir, "prepare")["version"]
+
+    runs = [_spawn(workdir, "startup", str(time.time())) for _ in range(args.runs)]
+    loads = {
+        mode: [_spawn(workdir, "load", version, env={"MODEL_LOAD_MMAP": flag}) for _ in range(args.runs)]
+        for mode, flag in (("mmap", "true"), ("copy", "false"))
+    }
+
+    result = {
+        "runs": args.runs,
+        "ml_imported_at_startup": any(run["ml_imported_at_startup"] for run in runs),
+        "import_main": _summary([run["import_main_s"] for run in runs]),
+        "health_ready": _summary([run["health_ready_s"] for run in runs]),
+        "models_ready": _summary([run["models_ready_s"] for run in runs]),
+        "warmup": runs[-1]["warmup"],
+        "model_load": {
+            mode: {
+                "load": _summary([r["load_s"] for r in samples]),
+                "max_rss_mb": round(max(r["max_rss_mb"] for r in samples), 1),
+            }
+            for mode, samples in loads.items()
+        },
+    }
+
+    print(f"import main      p50 {result['import_main']['p50_s']} s "
+          f"(ML libraries imported: {result['ml_imported_at_startup']})")
+    print(f"/health ready    p50 {result['health_ready']['p50_s']} s after launch")
+    print(f"models ready     p50 {result['models_ready']['p50_s']} s after launch")
+    for mode, stats in result["model_load"].items():
+        print(f"load ({mode:>4})     p50 {stats['load']['p50_s']} s, max RSS {stats['max_rss_mb']} MB")
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,30 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import uvicorn
+import asyncio
 import os
 from datetime import datetime
 
 # Import our custom modules
 from app.core.config import settings
-from app.api.v1.api import api_router
-from app.core.database import init_db
-from app.ml.models import load_models
 from app.core.logging import setup_logging
 
+# Configure logging before anything else logs; not in worker processes,
+# which re-import this file when the server is started with `python main.py`
+if __name__ != "__mp_main__":
+    setup_logging()
+
+from app.core import metrics
+from app.api.v1.api import api_router
+from app.core.database import close_db, init_db
+from app.ml.executor import inference_executor
+from app.ml.batching import inference_scheduler
+from app.ml.warmup import model_warmup
+from app.ingest.pipeline import ingest_pipeline
+from app.storage.archive import telemetry_archive
+from app.storage.rollups import rollup_flush_loop, telemetry_rollups
+
 # Create FastAPI application
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -29,15 +42,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Time every request (outermost, so it includes the other middleware)
+if metrics.ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
 # Include routers
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+def start_inference():
+    """Start model serving once warm-up has loaded the models."""
+    from app.ml.online import model_update_loop, model_updater
+
+    inference_executor.start()
+    if settings.INFERENCE_BATCHING_ENABLED:
+        inference_scheduler.start()
+    if settings.MODEL_UPDATE_MODE != "off":
+        app.state.model_update_task = asyncio.create_task(model_update_loop(model_updater))
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize application on startup."""
+    """Initialize application on startup.
+
+    ML libraries and models are loaded by a background warm-up, so /health
+    answers as soon as this returns.
+    """
+    metrics.remove_dead_process_files()
     await init_db()
-    load_models()
-    setup_logging()
+    ingest_pipeline.start()
+    if settings.ROLLUPS_ENABLED:
+        app.state.rollup_flush_task = asyncio.create_task(rollup_flush_loop(telemetry_rollups))
+    model_warmup.start(on_loaded=start_inference)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release resources on shutdown."""
+    await model_warmup.stop()
+    model_update_task = getattr(app.state, "model_update_task", None)
+    if model_update_task is not None:
+        model_update_task.cancel()
+    await ingest_pipeline.stop()
+    telemetry_archive.flush()
+    rollup_flush_task = getattr(app.state, "rollup_flush_task", None)
+    if rollup_flush_task is not None:
+        rollup_flush_task.cancel()
+    if settings.ROLLUPS_ENABLED:
+        telemetry_rollups.flush()
+    await inference_scheduler.stop()
+    inference_executor.shutdown()
+    await close_db()
 
 @app.get("/health")
 async def health_check():
@@ -45,9 +97,17 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
-        "version": settings.VERSION
+        "version": settings.VERSION,
+        "models_ready": model_warmup.ready
     }
 
+if metrics.ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        """Prometheus scrape endpoint."""
+        body, content_type = metrics.render_metrics()
+        return Response(content=body, media_type=content_type)
+
 @app.get("/")
 async def root():
     """Root endpoint."""
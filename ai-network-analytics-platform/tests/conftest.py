@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+import pytest
+
+# Settings are read at import; keep the metric files of test runs out of the tree
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus_multiproc_"))
+
+
+@pytest.fixture(scope="session")
+def sample_data():
+    from app.ml.models import _sample_training_data
+
+    return _sample_training_data()
+
+
+@pytest.fixture(scope="session")
+def trained_models(sample_data, tmp_path_factory):
+    """Anomaly detector and performance predictor fitted on the sample data."""
+    from app.ml.models import NetworkAnomalyDetector, NetworkPerformancePredictor
+
+    model_path = str(tmp_path_factory.mktemp("models"))
+    detector = NetworkAnomalyDetector(model_path)
+    predictor = NetworkPerformancePredictor(model_path)
+    assert detector.train_model(sample_data) and predictor.train_model(sample_data)
+    return detector, predictor
+
+
+@pytest.fixture
+def served_models(trained_models):
+    """Serve the trained models for the duration of a test."""
+    from app.ml.registry import ModelBundle, model_registry
+
+    previous = model_registry.active
+    model_registry.install(ModelBundle("test", *trained_models))
+    yield trained_models
+    model_registry.install(previous)
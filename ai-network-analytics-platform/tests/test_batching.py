@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from app.ml.batching import MicroBatchScheduler
+from app.ml.features import TELEMETRY_FEATURES
+
+RECORD = {col: 1.0 for col in TELEMETRY_FEATURES}
+
+
+def test_stop_resolves_every_request():
+    """A batch waiting for an in-flight slot and queued records fail on stop; running batches finish."""
+    release = asyncio.Event()
+
+    async def run_batch(records):
+        await release.wait()
+        return [{"row": i} for i in range(len(records))]
+
+    async def main():
+        scheduler = MicroBatchScheduler(max_batch_size=1, max_wait_ms=0, max_in_flight=1, run_batch=run_batch)
+        requests = [asyncio.create_task(scheduler.submit(dict(RECORD))) for _ in range(3)]
+        # First batch runs, the second waits for the in-flight slot, the third is queued
+        await asyncio.sleep(0.05)
+        stopping = asyncio.create_task(scheduler.stop())
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.wait_for(stopping, 1)
+        return await asyncio.wait_for(asyncio.gather(*requests, return_exceptions=True), 1)
+
+    results = asyncio.run(main())
+    assert results[0] == {"row": 0}
+    for result in results[1:]:
+        assert isinstance(result, RuntimeError)
+
+
+@pytest.mark.parametrize("max_batch_size", [1, 4])
+def test_each_caller_gets_its_own_row(max_batch_size):
+    async def run_batch(records):
+        return [{"value": record["value"]} for record in records]
+
+    async def main():
+        scheduler = MicroBatchScheduler(max_batch_size=max_batch_size, max_wait_ms=5, run_batch=run_batch)
+        results = await asyncio.gather(*[scheduler.submit({**RECORD, "value": i}) for i in range(10)])
+        await scheduler.stop()
+        return results
+
+    assert asyncio.run(main()) == [{"value": i} for i in range(10)]
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+
+from app.storage import cache as cache_module
+from app.storage.cache import ALL_DEVICES, LocalCacheBackend, ResultCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+    return now
+
+
+def test_hit_after_miss_and_expiry(clock):
+    cache = ResultCache(ttl=10.0)
+    assert cache.get_or_compute("device_1", "k", lambda: {"v": 1}) == {"v": 1}
+    assert cache.get_or_compute("device_1", "k", lambda: {"v": 2}) == {"v": 1}
+
+    clock[0] += 10.0
+    assert cache.get_or_compute("device_1", "k", lambda: {"v": 3}) == {"v": 3}
+    stats = cache.stats()
+    assert (stats["local_hits"], stats["misses"]) == (1, 2)
+
+
+def test_invalidating_devices_keeps_fleet_results():
+    cache = ResultCache()
+    cache.set("device_1", "k", 1)
+    cache.set("device_2", "k", 2)
+    cache.set(ALL_DEVICES, "k", 3)
+
+    cache.invalidate_devices(["device_1"])
+
+    assert cache.get("device_1", "k") is None
+    assert cache.get("device_2", "k") == 2
+    assert cache.get(ALL_DEVICES, "k") == 3
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_result_computed_across_an_invalidation_is_not_cached():
+    cache = ResultCache()
+
+    def compute():
+        # Telemetry of the device arrives while the result is computed
+        cache.invalidate_devices(["device_1"])
+        return "stale"
+
+    assert cache.get_or_compute("device_1", "k", compute) == "stale"
+    assert cache.get("device_1", "k") is None
+    assert cache.get_or_compute("device_1", "k", lambda: "fresh") == "fresh"
+    assert cache.get("device_1", "k") == "fresh"
+
+
+def test_async_result_computed_across_an_invalidation_is_not_cached():
+    cache = ResultCache(backend=LocalCacheBackend())
+
+    async def compute():
+        cache.invalidate_devices(["device_1"])
+        return "stale"
+
+    async def fresh():
+        return "fresh"
+
+    async def main():
+        assert await cache.get_or_compute_async("device_1", "k", compute) == "stale"
+        assert cache.get("device_1", "k") is None
+        assert await cache.get_or_compute_async("device_1", "k", fresh) == "fresh"
+        return await cache.get_or_compute_async("device_1", "k", compute)
+
+    assert asyncio.run(main()) == "fresh"
+
+
+def test_backend_serves_and_repopulates_local_tier():
+    cache = ResultCache(backend=LocalCacheBackend())
+    cache.set("device_1", "k", [1, 2])
+    cache.clear_local()
+
+    assert cache.get("device_1", "k") == [1, 2]
+    assert cache.get("device_1", "k") == [1, 2]
+    stats = cache.stats()
+    assert (stats["backend_hits"], stats["local_hits"]) == (1, 1)
+
+
+def test_backend_entries_expire(clock):
+    cache = ResultCache(ttl=5.0, backend=LocalCacheBackend())
+    cache.set("device_1", "k", 1)
+    cache.clear_local()
+    clock[0] += 5.0
+
+    assert cache.get("device_1", "k") is None
+
+
+def test_failing_backend_is_a_miss():
+    class FailingBackend(LocalCacheBackend):
+        def get(self, namespace, key):
+            raise ConnectionError("down")
+
+    cache = ResultCache(backend=FailingBackend())
+    assert cache.get_or_compute("device_1", "k", lambda: 1) == 1
+    assert cache.stats()["backend_errors"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResultCache(max_entries=2)
+    cache.set("device_1", "a", 1)
+    cache.set("device_1", "b", 2)
+    cache.get("device_1", "a")
+    cache.set("device_2", "c", 3)
+
+    assert cache.get("device_1", "b") is None
+    assert cache.get("device_1", "a") == 1
+    assert cache.get("device_2", "c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_fleet_lookups_are_reported_separately():
+    cache = ResultCache()
+    cache.get_or_compute(ALL_DEVICES, "k", lambda: 1)
+    cache.get_or_compute(ALL_DEVICES, "k", lambda: 1)
+    cache.get_or_compute("device_1", "k", lambda: 1)
+
+    stats = cache.stats()
+    assert stats["fleet"] == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+    assert (stats["local_hits"], stats["misses"]) == (1, 2)
@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_with_default_settings(tmp_path):
+    """The default SQLite file URL with DATABASE_ASYNC must build a pooled asyncio engine."""
+    env = {key: value for key, value in os.environ.items() if not key.startswith("DATABASE_")}
+    env["PYTHONPATH"] = PROJECT_ROOT
+    script = (
+        "from sqlalchemy.pool import AsyncAdaptedQueuePool\n"
+        "from app.core import database\n"
+        "assert database.async_engine is not None\n"
+        "assert isinstance(database.async_engine.pool, AsyncAdaptedQueuePool)\n"
+    )
+    # Run in a clean interpreter and directory, so no .env or earlier import applies
+    result = subprocess.run([sys.executable, "-c", script], cwd=tmp_path, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from app.ml.feature_store import DeviceFeatureStore
+
+
+def _mean(store, device_id):
+    _, features, _ = store.features([device_id])
+    return features[0, store.feature_names.index("x_mean_6")]
+
+
+def test_eviction_spares_devices_of_the_same_batch():
+    """A new device must not evict a stored device that also has rows in the batch."""
+    store = DeviceFeatureStore(columns=["x"], windows=(6,), ewma_alphas=(0.5,), max_devices=2)
+    store.update(["A", "B"], [1.0, 2.0], [[100.0], [7.0]])
+    store.update(["A", "C"], [3.0, 4.0], [[101.0], [5.0]])
+
+    assert "A" in store and "C" in store and "B" not in store
+    assert _mean(store, "A") == 100.5
+    assert _mean(store, "C") == 5.0
+    assert store.stats()["evictions"] == 1
+
+
+def _reference(values, windows, alpha):
+    """Features of one device computed directly from its samples."""
+    values = np.asarray(values, dtype=np.float32).astype(np.float64)
+    features = {"last": values[-1]}
+    for w in windows:
+        tail = values[-w:]
+        features[f"mean_{w}"] = tail.mean()
+        features[f"std_{w}"] = tail.std()
+        features[f"delta_{w}"] = tail[-1] - tail[0]
+    ewma = values[0]
+    for value in values[1:]:
+        ewma += alpha * (value - ewma)
+    features[f"ewma_{alpha:g}"] = ewma
+    return features
+
+
+def test_rolling_windows_match_direct_computation():
+    windows, alpha = (3, 5), 0.3
+    store = DeviceFeatureStore(columns=["x"], windows=windows, ewma_alphas=(alpha,), max_devices=4)
+    rng = np.random.default_rng(0)
+    samples = {"A": rng.normal(50, 10, 23), "B": rng.normal(5, 1, 7)}
+
+    # Interleaved batches of different sizes, wrapping the rings several times
+    t = 0.0
+    for start, size in [(0, 1), (1, 4), (5, 2), (7, 9), (16, 7)]:
+        device_ids, timestamps, rows = [], [], []
+        for device, values in samples.items():
+            for value in values[start:start + size]:
+                device_ids.append(device)
+                timestamps.append(t)
+                rows.append([value])
+                t += 1.0
+        if rows:
+            store.update(device_ids, timestamps, rows)
+
+    for device, values in samples.items():
+        _, features, _ = store.features([device])
+        expected = _reference(values, windows, alpha)
+        for stat, value in expected.items():
+            assert features[0, store.feature_names.index(f"x_{stat}")] == pytest.approx(value, rel=1e-9, abs=1e-9)
+
+
+def test_replay_returns_features_after_each_row():
+    store = DeviceFeatureStore(columns=["x"], windows=(2,), ewma_alphas=(0.5,), max_devices=2)
+    features = store.update(["A", "A", "A"], [1.0, 2.0, 3.0], [[1.0], [3.0], [8.0]], return_features=True)
+    means = features[:, store.feature_names.index("x_mean_2")]
+    np.testing.assert_allclose(means, [1.0, 2.0, 5.5])
+
+
+def test_least_recently_seen_device_is_evicted():
+    store = DeviceFeatureStore(columns=["x"], windows=(6,), ewma_alphas=(0.5,), max_devices=2)
+    store.update(["A", "B"], [10.0, 5.0], [[1.0], [2.0]])
+    store.update(["C"], [11.0], [[3.0]])
+
+    assert "B" not in store and "A" in store and "C" in store
+    device_ids, _, last_seen = store.features()
+    assert device_ids == ["C", "A"]
+    np.testing.assert_array_equal(last_seen, [11.0, 10.0])
+    # A reused slot starts from scratch
+    assert _mean(store, "C") == 3.0
+
+
+def test_batch_larger_than_the_store_drops_extra_devices():
+    store = DeviceFeatureStore(columns=["x"], windows=(2,), ewma_alphas=(0.5,), max_devices=2)
+    features = store.update(["A", "B", "C"], [1.0, 2.0, 3.0], [[1.0], [2.0], [3.0]], return_features=True)
+
+    assert len(store) == 2 and "C" not in store
+    assert np.isnan(features[2]).all()
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest, RandomForestRegressor
+
+from app.core.config import settings
+from app.ml.forest import CompiledAnomalyDetector, CompiledForest, CompiledPerformancePredictor, average_path_length
+from app.ml.models import compile_forest
+
+
+def _rows(sample_data, columns, n=300):
+    # Beyond the training range too, to reach the outermost leaves
+    X = sample_data[columns].values[:n].copy()
+    X[::7] *= 3.0
+    return X
+
+
+def test_compiled_detector_matches_isolation_forest(trained_models, sample_data):
+    detector, _ = trained_models
+    X = _rows(sample_data, detector.feature_columns)
+
+    expected = detector.model.score_samples(detector.scaler.transform(X))
+    np.testing.assert_array_equal(detector.compiled.score_samples(X), expected)
+    np.testing.assert_array_equal(detector.compiled.predict_anomalies_array(X),
+                                  np.where(detector.model.predict(detector.scaler.transform(X)) == -1, 1, 0))
+
+
+def test_compiled_predictor_matches_random_forest(trained_models, sample_data):
+    _, predictor = trained_models
+    X = _rows(sample_data, predictor.feature_columns)
+    X_scaled = predictor.scaler.transform(X)
+
+    np.testing.assert_allclose(predictor.compiled.predict_performance_array(X),
+                               predictor.model.predict(X_scaled), rtol=1e-12)
+    per_tree = np.stack([tree.predict(X_scaled.astype(np.float32)) for tree in predictor.model.estimators_])
+    np.testing.assert_array_equal(predictor.compiled.forest.leaf_values(X_scaled), per_tree)
+
+
+def test_feature_subsampled_isolation_forest():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, 6))
+    model = IsolationForest(n_estimators=25, max_features=0.5, random_state=0).fit(X)
+    compiled = CompiledAnomalyDetector(
+        [f"f{i}" for i in range(6)], np.zeros(6), np.ones(6), compile_forest(model),
+        {"offset": float(model.offset_),
+         "denominator": len(model.estimators_) * average_path_length(model._max_samples)},
+    )
+    np.testing.assert_allclose(compiled.score_samples(X), model.score_samples(X), rtol=1e-12)
+
+
+@pytest.mark.parametrize("mmap_mode", [None, "r"])
+def test_saved_forest_loads_identically(trained_models, sample_data, tmp_path, mmap_mode):
+    _, predictor = trained_models
+    predictor.compiled.save(str(tmp_path))
+    loaded = CompiledPerformancePredictor.load(str(tmp_path), mmap_mode=mmap_mode)
+    assert isinstance(loaded.forest, CompiledForest)
+
+    X = _rows(sample_data, predictor.feature_columns, 50)
+    np.testing.assert_array_equal(loaded.predict_performance_array(X), predictor.compiled.predict_performance_array(X))
+
+
+def test_missing_values_follow_the_trained_branch():
+    rng = np.random.default_rng(1)
+    X = rng.normal(size=(400, 3))
+    y = X[:, 0] * 2 + rng.normal(scale=0.1, size=400)
+    X[rng.random(X.shape) < 0.1] = np.nan
+    model = RandomForestRegressor(n_estimators=10, random_state=0)
+    try:
+        model.fit(X, y)
+    except ValueError:
+        pytest.skip("this scikit-learn version does not fit forests on missing values")
+
+    forest = compile_forest(model)
+    np.testing.assert_allclose(forest.sum_values(X) / forest.n_trees, model.predict(X), rtol=1e-12)
+
+
+def test_engines_agree(trained_models, sample_data, monkeypatch):
+    detector, predictor = trained_models
+    X_anomaly = _rows(sample_data, detector.feature_columns, 100)
+    X_performance = _rows(sample_data, predictor.feature_columns, 100)
+
+    results = {}
+    for engine in ("compiled", "sklearn"):
+        monkeypatch.setattr(settings, "INFERENCE_ENGINE", engine)
+        results[engine] = (detector.score_anomalies_array(X_anomaly),
+                           predictor.predict_performance_interval_array(X_performance, 0.9))
+
+    for compiled, reference in zip(results["compiled"], results["sklearn"]):
+        for a, b in zip(compiled, reference):
+            np.testing.assert_allclose(a, b, rtol=1e-9)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from app.ml.features import TELEMETRY_FEATURES
+from app.ml.inference import analyze_network_batch
+from app.ml.models import analyze_network_data
+from app.ml.registry import ModelBundle, ModelNotReady, model_registry
+
+NUMERIC_KEYS = ["anomaly_score", "predicted_latency", "model_confidence"]
+
+
+def _records(sample_data, n=64):
+    return sample_data[TELEMETRY_FEATURES].head(n).to_dict("records")
+
+
+def _assert_same(batch_result, row_result):
+    assert batch_result["is_anomaly"] == row_result["is_anomaly"]
+    for key in NUMERIC_KEYS:
+        assert batch_result[key] == pytest.approx(row_result[key], rel=1e-9, abs=1e-12)
+    assert batch_result["predicted_latency_interval"] == pytest.approx(
+        row_result["predicted_latency_interval"], rel=1e-9)
+
+
+def test_batch_matches_per_row_analysis(served_models, sample_data):
+    records = _records(sample_data)
+    batch = analyze_network_batch(records)
+
+    assert len(batch) == len(records)
+    assert any(result["is_anomaly"] for result in batch)
+    for batch_result, record in zip(batch, records):
+        _assert_same(batch_result, analyze_network_data(record))
+
+
+def test_columnar_payload_matches_rows(served_models, sample_data):
+    records = _records(sample_data, 16)
+    columnar = {col: [record[col] for record in records] for col in TELEMETRY_FEATURES}
+
+    for by_column, by_row in zip(analyze_network_batch(columnar), analyze_network_batch(records)):
+        _assert_same(by_column, by_row)
+
+
+def test_empty_batch(served_models):
+    assert analyze_network_batch([]) == []
+
+
+def test_missing_feature_is_a_client_error(served_models, sample_data):
+    record = _records(sample_data, 1)[0]
+    del record["latency_p95"]
+    with pytest.raises(ValueError, match="latency_p95") as error:
+        analyze_network_batch([record])
+    assert not isinstance(error.value, ModelNotReady)
+
+
+def test_untrained_models_are_not_ready(trained_models, sample_data):
+    from app.ml.models import NetworkAnomalyDetector, NetworkPerformancePredictor
+
+    previous = model_registry.active
+    model_registry.install(ModelBundle(None, NetworkAnomalyDetector(), NetworkPerformancePredictor()))
+    try:
+        with pytest.raises(ModelNotReady):
+            analyze_network_batch(_records(sample_data, 2))
+    finally:
+        model_registry.install(previous)
+
+
+def test_results_follow_row_order(served_models, sample_data):
+    records = _records(sample_data, 32)
+    forward = analyze_network_batch(records)
+    backward = analyze_network_batch(records[::-1])
+    np.testing.assert_allclose([r["anomaly_score"] for r in forward],
+                               [r["anomaly_score"] for r in backward[::-1]])
@@ -0,0 +1,100 @@
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+
+from app.ingest.pipeline import (
+    ColumnarBuffer,
+    IngestPayloadTooLarge,
+    IngestQueueFull,
+    TelemetryIngestPipeline,
+    count_rows,
+)
+
+
+def _records(n, device_id="device_1"):
+    return {"records": [{"device_id": device_id, "timestamp": i, "cpu_usage": float(i)} for i in range(n)]}
+
+
+def test_count_rows():
+    assert count_rows(_records(3)) == 3
+    assert count_rows({"device_id": "device_1", "cpu_usage": [1.0, 2.0]}) == 2
+    assert count_rows({"device_id": "device_1", "cpu_usage": 1.0}) == 1
+
+
+def test_buffer_normalizes_every_payload_shape():
+    buffer = ColumnarBuffer()
+    assert buffer.add_payload({"device_id": "a", "timestamp": "1970-01-01T00:00:10Z", "cpu_usage": 1.0}) == 0
+    assert buffer.add_payload({"device_id": "b", "timestamp": [20, 21], "cpu_usage": [2.0, 3.0]}) == 0
+    assert buffer.add_payload({"records": [{"device_id": "c", "timestamp": 30, "cpu_usage": "bad"}]}) == 1
+
+    batch = buffer.drain()
+    assert len(buffer) == 0
+    assert batch.device_ids.tolist() == ["a", "b", "b"]
+    np.testing.assert_array_equal(batch.timestamps, [10.0, 20.0, 21.0])
+    np.testing.assert_array_equal(batch.columns["cpu_usage"], [1.0, 2.0, 3.0])
+    assert np.isnan(batch.columns["memory_usage"]).all()
+
+
+def test_row_budget_applies_backpressure_until_flushed():
+    flushed = []
+
+    async def main():
+        pipeline = TelemetryIngestPipeline(max_queue_size=10, batch_size=100, flush_interval_ms=10,
+                                           workers=1, max_queued_rows=5, max_payload_rows=3)
+
+        async def sink(batch):
+            flushed.append(len(batch))
+
+        pipeline.add_sink("test", sink)
+        assert pipeline.submit(_records(3)) == 3
+        assert pipeline.submit(_records(2)) == 2
+        with pytest.raises(IngestQueueFull):
+            pipeline.submit(_records(1))
+        with pytest.raises(IngestPayloadTooLarge):
+            pipeline.submit(_records(4))
+        assert pipeline.queued_rows == 5
+
+        await pipeline.stop()
+        stats = pipeline.stats()
+        # The flushed rows no longer count against the budget
+        assert pipeline.submit(_records(3)) == 3
+        await pipeline.stop()
+        return stats
+
+    stats = asyncio.run(main())
+    assert stats["queued_rows"] == 0
+    assert (stats["payloads_accepted"], stats["payloads_rejected"]) == (2, 2)
+    assert sum(flushed) == 8
+
+
+def test_payload_count_applies_backpressure():
+    async def main():
+        pipeline = TelemetryIngestPipeline(max_queue_size=2, workers=1)
+
+        async def flush(batch):
+            pass
+
+        pipeline._flush = flush
+        pipeline.submit(_records(1))
+        pipeline.submit(_records(1))
+        with pytest.raises(IngestQueueFull):
+            pipeline.submit(_records(1))
+        await pipeline.stop()
+        return pipeline.queued_rows
+
+    assert asyncio.run(main()) == 0
+
+
+@pytest.mark.parametrize("error, status", [(IngestPayloadTooLarge, 413), (IngestQueueFull, 503)])
+def test_ingest_endpoint_status(monkeypatch, error, status):
+    from app.api.v1 import api
+
+    def submit(payload):
+        raise error("rejected")
+
+    monkeypatch.setattr(api.ingest_pipeline, "submit", submit)
+    with pytest.raises(HTTPException) as excinfo:
+        asyncio.run(api.ingest_telemetry_data(_records(1)))
+    assert excinfo.value.status_code == status
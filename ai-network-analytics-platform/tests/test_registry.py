@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.ml.registry import ModelRegistry
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path), keep_versions=2)
+
+
+def _stored(registry):
+    return sorted(os.listdir(registry.versions_dir))
+
+
+def test_publish_activates_and_writes_current(registry, trained_models):
+    activated = []
+    registry.subscribe(activated.append)
+
+    version = registry.publish(*trained_models, metadata={"source": "test"})
+
+    assert registry.active.version == version
+    assert registry.current_version() == version
+    assert [bundle.version for bundle in activated] == [version]
+    [stored] = registry.list_versions()
+    assert stored["version"] == version and stored["active"]
+    assert stored["metadata"] == {"source": "test"}
+
+
+def test_publish_without_activation(registry, trained_models):
+    active = registry.publish(*trained_models)
+    staged = registry.publish(*trained_models, activate=False)
+
+    assert registry.active.version == active
+    assert registry.current_version() == active
+    assert registry.activate(staged).version == staged
+    assert registry.current_version() == staged
+
+
+def test_loaded_version_predicts_like_the_published_models(registry, trained_models, sample_data):
+    version = registry.publish(*trained_models)
+    bundle = ModelRegistry(registry.root).load_current()
+
+    assert bundle.version == version
+    rows = sample_data.head(50)
+    detector, predictor = trained_models
+    for loaded, expected in zip(bundle.anomaly_detector.score_anomalies(rows), detector.score_anomalies(rows)):
+        np.testing.assert_allclose(loaded, expected)
+    np.testing.assert_allclose(bundle.performance_predictor.predict_performance(rows),
+                               predictor.predict_performance(rows))
+
+
+def test_rollback_returns_to_the_previous_version(registry, trained_models):
+    first = registry.publish(*trained_models)
+    second = registry.publish(*trained_models)
+
+    assert registry.rollback().version == first
+    assert registry.current_version() == first
+    # Rolling back consumed the history; the next rollback falls back to older versions
+    with pytest.raises(RuntimeError):
+        registry.rollback()
+    assert registry.activate(second).version == second
+
+
+def test_rollback_after_restart_uses_stored_versions(registry, trained_models):
+    first = registry.publish(*trained_models)
+    registry.publish(*trained_models)
+
+    restarted = ModelRegistry(registry.root)
+    restarted.load_current()
+    assert restarted.rollback().version == first
+
+
+def test_rollback_without_history_fails(registry, trained_models):
+    registry.publish(*trained_models)
+    with pytest.raises(RuntimeError):
+        registry.rollback()
+
+
+def test_old_versions_are_pruned(registry, trained_models):
+    versions = [registry.publish(*trained_models) for _ in range(4)]
+
+    assert _stored(registry) == versions[-2:]
+    assert registry.active.version == versions[-1]
+
+
+def test_pruning_keeps_the_active_version(registry, trained_models):
+    first = registry.publish(*trained_models)
+    registry.publish(*trained_models)
+    registry.rollback()
+    # Two newer versions; the active oldest one is not deleted
+    newer = [registry.publish(*trained_models, activate=False) for _ in range(2)]
+    registry._prune()
+
+    assert registry.active.version == first
+    assert _stored(registry) == [first] + newer
+
+
+def test_unknown_version(registry, trained_models):
+    registry.publish(*trained_models)
+    with pytest.raises(LookupError):
+        registry.activate("missing")
+    with pytest.raises(LookupError):
+        registry.load(".hidden")
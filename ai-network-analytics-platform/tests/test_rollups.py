@@ -0,0 +1,87 @@
+import os
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPT = """
+import asyncio
+import time
+
+from sqlalchemy import func, select
+
+from app.core.database import SessionLocal, init_db
+from app.ingest.pipeline import ColumnarBuffer, rollup_sink, storage_sink
+from app.storage.rollups import FLEET_DEVICE, telemetry_rollups
+from app.storage.tables import TelemetryRollup, TelemetrySample
+
+START = int(time.time()) // 60 * 60
+
+
+def batch(offsets):
+    buffer = ColumnarBuffer()
+    buffer.add_payload({"records": [
+        {"device_id": "device_1", "timestamp": START + offset, "cpu_usage": 10.0}
+        for offset in offsets
+    ]})
+    return buffer.drain()
+
+
+def rolled_up():
+    with SessionLocal() as db:
+        return db.scalar(select(TelemetryRollup.sample_count).where(
+            TelemetryRollup.tier == "1m",
+            TelemetryRollup.device_id == FLEET_DEVICE,
+            TelemetryRollup.metric == "cpu_usage",
+        ))
+
+
+async def main():
+    await init_db()
+    # A duplicate within a batch and one of an earlier batch
+    for offsets in ([0, 1, 1], [1, 2]):
+        flushed = batch(offsets)
+        await storage_sink(flushed)
+        await rollup_sink(flushed)
+    telemetry_rollups.flush()
+    with SessionLocal() as db:
+        stored = db.scalar(select(func.count()).select_from(TelemetrySample))
+    assert stored == 3, stored
+    assert rolled_up() == 3, rolled_up()
+
+    # A failed flush keeps its samples for the next one
+    flushed = batch([3])
+    await storage_sink(flushed)
+    await rollup_sink(flushed)
+    write = telemetry_rollups._write
+    telemetry_rollups._write = lambda chunks: 1 / 0
+    try:
+        telemetry_rollups.flush()
+    except ZeroDivisionError:
+        pass
+    telemetry_rollups._write = write
+    assert telemetry_rollups.stats()["pending_samples"] == 1
+    telemetry_rollups.flush()
+    assert rolled_up() == 4, rolled_up()
+
+
+asyncio.run(main())
+"""
+
+
+def _run(tmp_path, database_async):
+    env = {key: value for key, value in os.environ.items() if not key.startswith("DATABASE_")}
+    env["PYTHONPATH"] = PROJECT_ROOT
+    env["DATABASE_ASYNC"] = database_async
+    result = subprocess.run([sys.executable, "-c", SCRIPT], cwd=tmp_path, env=env,
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_rollups_count_stored_rows_only(tmp_path):
+    """Rollups skip the rows the telemetry table rejects as duplicates and survive a failed flush."""
+    _run(tmp_path, "false")
+
+
+def test_rollups_count_stored_rows_only_async(tmp_path):
+    _run(tmp_path, "true")
@@ -8,9 +8,14 @@ Contact: bgside2368@gmail.com
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
+import heapq
+import io
 import json
+import os
+import threading
 import time
 import uuid
+from array import array
 from datetime import datetime
 from typing import Dict, List, Optional
 
@@ -21,7 +26,32 @@ CORS(app)
 devices = {}
 device_metrics = {}
 
+# A device's state and history are guarded by one of these locks, picked by
+# device_id; take it before the fleet_stats or alert_engine locks
+DEVICE_LOCK_SHARDS = 64
+device_locks = [threading.Lock() for _ in range(DEVICE_LOCK_SHARDS)]
+
+def device_lock(device_id: str) -> threading.Lock:
+    return device_locks[hash(device_id) % DEVICE_LOCK_SHARDS]
+
+# Device status is stored as a small int code
+STATUS_CODES = {"offline": 0, "online": 1}
+STATUS_NAMES = {code: status for status, code in STATUS_CODES.items()}
+
+# Metric samples kept per device
+METRICS_HISTORY_SIZE = 1000
+
+# Alert thresholds
+LOW_BATTERY_THRESHOLD = 20
+OFFLINE_TIMEOUT_SECONDS = 300
+
+# Rejected readings listed in a bulk ingestion summary
+BULK_ERRORS_REPORTED = 20
+
 class IoTDevice:
+    __slots__ = ("device_id", "name", "device_type", "location", "status_code", "last_seen",
+                 "battery_level", "signal_strength", "created_at")
+
     def __init__(self, device_id: str, name: str, device_type: str, location: str):
         self.device_id = device_id
         self.name = name
@@ -33,6 +63,14 @@ class IoTDevice:
         self.signal_strength = 0
         self.created_at = datetime.utcnow().isoformat()
 
+    @property
+    def status(self) -> str:
+        return STATUS_NAMES[self.status_code]
+
+    @status.setter
+    def status(self, value: str):
+        self.status_code = STATUS_CODES[value]
+
     def to_dict(self):
         return {
             "device_id": self.device_id,
@@ -46,6 +84,274 @@ class IoTDevice:
             "created_at": self.created_at
         }
 
+class MetricsRingBuffer:
+    """Fixed-capacity metrics history of one device.
+
+    Samples are kept in parallel typed arrays (epoch timestamp, battery,
+    signal, status code). The arrays grow up to ``capacity`` samples and
+    are then overwritten in place, oldest first, so appending is O(1) and
+    a device never holds more than ``capacity`` samples (17 bytes each).
+    """
+    __slots__ = ("capacity", "timestamps", "battery", "signal", "status", "_next")
+
+    def __init__(self, capacity: int = METRICS_HISTORY_SIZE):
+        self.capacity = capacity
+        self.timestamps = array('d')
+        self.battery = array('f')
+        self.signal = array('f')
+        self.status = array('B')
+        self._next = 0  # slot the next sample overwrites once full
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def append(self, timestamp: float, battery_level: float, signal_strength: float, status_code: int):
+        if len(self.timestamps) < self.capacity:
+            self.timestamps.append(timestamp)
+            self.battery.append(battery_level)
+            self.signal.append(signal_strength)
+            self.status.append(status_code)
+        else:
+            i = self._next
+            self.timestamps[i] = timestamp
+            self.battery[i] = battery_level
+            self.signal[i] = signal_strength
+            self.status[i] = status_code
+            self._next = (i + 1) % self.capacity
+
+    def entries(self, device_id: str, limit: Optional[int] = None) -> List[Dict]:
+        """Samples oldest first, as metrics entries"""
+        n = len(self.timestamps)
+        count = n if not limit or limit > n else max(0, limit)
+        start = self._next + n - count
+        return [
+            {
+                "device_id": device_id,
+                "timestamp": datetime.utcfromtimestamp(self.timestamps[i]).isoformat(),
+                # float32 storage; round away the representation error
+                "battery_level": round(self.battery[i], 4),
+                "signal_strength": round(self.signal[i], 4),
+                "status": STATUS_NAMES[self.status[i]]
+            }
+            for i in ((start + k) % n for k in range(count))
+        ]
+
+class GroupStats:
+    """Device counts and online battery/signal sums of one group of devices"""
+    __slots__ = ("total", "online", "battery_sum", "signal_sum")
+
+    def __init__(self):
+        self.total = 0
+        self.online = 0
+        self.battery_sum = 0
+        self.signal_sum = 0
+
+    def count(self, status_code: int, battery_level: float, signal_strength: float, sign: int):
+        self.total += sign
+        if status_code == STATUS_CODES["online"]:
+            self.online += sign
+            self.battery_sum += sign * battery_level
+            self.signal_sum += sign * signal_strength
+            if not self.online:
+                # Drop floating point residue of adding and removing values
+                self.battery_sum = self.signal_sum = 0
+
+    def to_dict(self):
+        return {
+            "total_devices": self.total,
+            "online_devices": self.online,
+            "offline_devices": self.total - self.online,
+            "averages": {
+                "battery_level": round(self.battery_sum / self.online, 2) if self.online else 0,
+                "signal_strength": round(self.signal_sum / self.online, 2) if self.online else 0
+            }
+        }
+
+class FleetStats:
+    """Fleet-wide and per device_type/location aggregates.
+
+    Kept current as devices change: take snapshot() of a tracked device
+    before mutating it and pass it to update() afterwards, so reading
+    them is O(1).
+    """
+    BREAKDOWNS = ("device_type", "location")
+
+    def __init__(self):
+        self.fleet = GroupStats()
+        self.groups = {by: {} for by in self.BREAKDOWNS}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def snapshot(device: IoTDevice) -> tuple:
+        """The fields of a device the aggregates depend on"""
+        return (device.device_type, device.location, device.status_code,
+                device.battery_level, device.signal_strength)
+
+    def _count(self, snapshot: tuple, sign: int):
+        values = snapshot[2:]
+        self.fleet.count(*values, sign)
+        for key, groups in zip(snapshot[:2], self.groups.values()):
+            group = groups.get(key)
+            if group is None:
+                group = groups[key] = GroupStats()
+            group.count(*values, sign)
+            if not group.total:
+                del groups[key]
+
+    def add(self, device: IoTDevice):
+        with self._lock:
+            self._count(self.snapshot(device), 1)
+
+    def update(self, before: tuple, device: IoTDevice):
+        """Replace the contribution of a device, given its snapshot() before the change"""
+        with self._lock:
+            self._count(before, -1)
+            self._count(self.snapshot(device), 1)
+
+    def overview(self) -> Dict:
+        with self._lock:
+            return self.fleet.to_dict()
+
+    def breakdown(self, by: str) -> Dict[str, Dict]:
+        with self._lock:
+            return {key: group.to_dict() for key, group in self.groups[by].items()}
+
+fleet_stats = FleetStats()
+
+class AlertEngine:
+    """Active alerts, raised and cleared as device state changes.
+
+    A standing condition has one alert, keyed by (type, device_id), whose
+    id and timestamp stay the same until the condition clears. Reporting
+    devices are tracked in a heap of last_seen expiry deadlines, so
+    finding the ones that went silent only looks at the top of the heap.
+    """
+
+    def __init__(self, offline_timeout: float = OFFLINE_TIMEOUT_SECONDS):
+        self.offline_timeout = offline_timeout
+        self.active = {}
+        self._deadlines = {}  # device_id -> current expiry of last_seen
+        self._expiry = []  # (deadline, device_id), at most one per device
+        self._lock = threading.Lock()
+
+    def _raise(self, alert_type: str, severity: str, device: IoTDevice, message: str):
+        alert = self.active.get((alert_type, device.device_id))
+        if alert is not None:
+            alert["message"] = message
+            return
+        self.active[(alert_type, device.device_id)] = {
+            "id": str(uuid.uuid4()),
+            "type": alert_type,
+            "severity": severity,
+            "device_id": device.device_id,
+            "device_name": device.name,
+            "message": message,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+
+    def _clear(self, alert_type: str, device_id: str):
+        self.active.pop((alert_type, device_id), None)
+
+    def check(self, device: IoTDevice):
+        """Raise or clear the alerts of a device after it changed"""
+        with self._lock:
+            if device.battery_level < LOW_BATTERY_THRESHOLD:
+                self._raise("low_battery", "warning", device,
+                            f"Device {device.name} has low battery ({device.battery_level}%)")
+            else:
+                self._clear("low_battery", device.device_id)
+
+            if device.status == "offline":
+                self._raise("device_offline", "critical", device, f"Device {device.name} is offline")
+            else:
+                self._clear("device_offline", device.device_id)
+
+    def alerts(self) -> List[Dict]:
+        with self._lock:
+            return [dict(alert) for alert in self.active.values()]
+
+    def seen(self, device: IoTDevice, now: float):
+        """Push back the offline deadline of a device that reported"""
+        with self._lock:
+            if device.device_id not in self._deadlines:
+                heapq.heappush(self._expiry, (now + self.offline_timeout, device.device_id))
+            self._deadlines[device.device_id] = now + self.offline_timeout
+
+    def tracking(self, device_id: str) -> bool:
+        """Whether a device has an offline deadline pending"""
+        with self._lock:
+            return device_id in self._deadlines
+
+    def expired(self, now: float) -> List[str]:
+        """Remove and return the devices not seen since their deadline"""
+        stale = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                _, device_id = heapq.heappop(self._expiry)
+                deadline = self._deadlines[device_id]
+                if deadline > now:
+                    # Seen again since this entry was pushed
+                    heapq.heappush(self._expiry, (deadline, device_id))
+                else:
+                    del self._deadlines[device_id]
+                    stale.append(device_id)
+        return stale
+
+alert_engine = AlertEngine()
+
+@app.before_request
+def expire_stale_devices():
+    """Mark devices offline once not seen for OFFLINE_TIMEOUT_SECONDS"""
+    for device_id in alert_engine.expired(time.time()):
+        device = devices[device_id]
+        with device_lock(device_id):
+            if alert_engine.tracking(device_id):
+                continue  # reported again since it expired
+            before = fleet_stats.snapshot(device)
+            device.status = "offline"
+            fleet_stats.update(before, device)
+            alert_engine.check(device)
+
+def apply_metrics(device: IoTDevice, data: Dict, now: float):
+    """Apply one metrics reading to a device and record it in its history.
+
+    The reading has passed reading_error() and the caller holds
+    device_lock(device.device_id).
+    """
+    battery_level = max(0, min(100, data.get('battery_level', device.battery_level)))
+    signal_strength = max(0, min(100, data.get('signal_strength', device.signal_strength)))
+
+    before = fleet_stats.snapshot(device)
+    device.status = "online"
+    device.last_seen = datetime.utcfromtimestamp(now).isoformat()
+    device.battery_level = battery_level
+    device.signal_strength = signal_strength
+    fleet_stats.update(before, device)
+    alert_engine.seen(device, now)
+    alert_engine.check(device)
+
+    # Store metrics for historical tracking (last METRICS_HISTORY_SIZE samples)
+    history = device_metrics.get(device.device_id)
+    if history is None:
+        history = device_metrics[device.device_id] = MetricsRingBuffer()
+    history.append(now, device.battery_level, device.signal_strength, device.status_code)
+
+def reading_error(reading) -> Optional[str]:
+    """Why a metrics reading cannot be applied, or None"""
+    if not isinstance(reading, dict):
+        return "Reading must be an object"
+    if not isinstance(reading.get('device_id'), str) or reading['device_id'] not in devices:
+        return "Device not found"
+    for key in ('battery_level', 'signal_strength'):
+        value = reading.get(key, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            return f"{key} must be a number"
+    return None
+
+def device_dict(device: IoTDevice) -> Dict:
+    with device_lock(device.device_id):
+        return device.to_dict()
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -60,7 +366,7 @@ def health_check():
 def get_devices():
     """Get all IoT devices"""
     return jsonify({
-        "devices": [device.to_dict() for device in devices.values()],
+        "devices": [device_dict(device) for device in list(devices.values())],
         "total": len(devices)
     })
 
@@ -80,7 +386,10 @@ def register_device():
         location=data['location']
     )
 
-    devices[device_id] = device
+    with device_lock(device_id):
+        devices[device_id] = device
+        fleet_stats.add(device)
+        alert_engine.check(device)
 
     return jsonify({
         "message": "Device registered successfully",
@@ -93,7 +402,7 @@ def get_device(device_id):
     if device_id not in devices:
         return jsonify({"error": "Device not found"}), 404
 
-    return jsonify(devices[device_id].to_dict())
+    return jsonify(device_dict(devices[device_id]))
 
 @app.route('/api/v1/devices/<device_id>/metrics', methods=['POST'])
 def update_device_metrics(device_id):
@@ -101,39 +410,94 @@ def update_device_metrics(device_id):
     if device_id not in devices:
         return jsonify({"error": "Device not found"}), 404
 
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    error = reading_error(dict(data, device_id=device_id) if isinstance(data, dict) else data)
+    if error is not None:
+        return jsonify({"error": error}), 400
+
     device = devices[device_id]
 
     # Update device status and metrics
-    device.status = "online"
-    device.last_seen = datetime.utcnow().isoformat()
+    with device_lock(device_id):
+        apply_metrics(device, data, time.time())
+        updated = device.to_dict()
 
-    if 'battery_level' in data:
-        device.battery_level = max(0, min(100, data['battery_level']))
+    return jsonify({
+        "message": "Metrics updated successfully",
+        "device": updated
+    })
 
-    if 'signal_strength' in data:
-        device.signal_strength = max(0, min(100, data['signal_strength']))
+@app.route('/api/v1/devices/metrics', methods=['POST'])
+def bulk_update_device_metrics():
+    """Update metrics of many devices in one request.
+
+    The body is a JSON list of readings (or {"readings": [...]}), or
+    NDJSON (application/x-ndjson) with one reading per line, read as it
+    streams in. Each reading is {"device_id", "battery_level",
+    "signal_strength"}; readings that cannot be applied are skipped and
+    counted in the summary.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        stream = request.stream
+        if isinstance(stream, io.RawIOBase):
+            # Reading lines straight off the raw input stream is slow
+            stream = io.BufferedReader(stream, 1 << 16)
+        readings = (line for line in stream if line.strip())
+        ndjson = True
+    else:
+        data = request.get_json(silent=True)
+        readings = data.get('readings') if isinstance(data, dict) else data
+        if not isinstance(readings, list):
+            return jsonify({"error": "Body must be a list of readings, {\"readings\": [...]} or NDJSON"}), 400
+        ndjson = False
+
+    now = time.time()
+    accepted = 0
+    rejected = 0
+    updated = set()
+    errors = []
+    for index, reading in enumerate(readings):
+        error = None
+        if ndjson:
+            try:
+                reading = json.loads(reading)
+            except ValueError:
+                error = "Invalid JSON"
+        error = error or reading_error(reading)
+
+        if error is None:
+            with device_lock(reading['device_id']):
+                apply_metrics(devices[reading['device_id']], reading, now)
+            updated.add(reading['device_id'])
+            accepted += 1
+        else:
+            rejected += 1
+            if len(errors) < BULK_ERRORS_REPORTED:
+                errors.append({"index": index, "error": error})
 
-    # Store metrics for historical tracking
-    metrics_entry = {
-        "device_id": device_id,
-        "timestamp": device.last_seen,
-        "battery_level": device.battery_level,
-        "signal_strength": device.signal_strength,
-        "status": device.status
-    }
+    return jsonify({
+        "message": "Metrics updated successfully",
+        "accepted": accepted,
+        "rejected": rejected,
+        "devices_updated": len(updated),
+        "errors": errors
+    })
 
-    if device_id not in device_metrics:
-        device_metrics[device_id] = []
-    device_metrics[device_id].append(metrics_entry)
+@app.route('/api/v1/devices/<device_id>/metrics', methods=['GET'])
+def get_device_metrics(device_id):
+    """Get the metrics history of a device, oldest first"""
+    if device_id not in devices:
+        return jsonify({"error": "Device not found"}), 404
 
-    # Keep only last 1000 metrics per device
-    if len(device_metrics[device_id]) > 1000:
-        device_metrics[device_id] = device_metrics[device_id][-1000:]
+    limit = request.args.get('limit', type=int)
+    with device_lock(device_id):
+        history = device_metrics.get(device_id)
+        metrics = history.entries(device_id, limit) if history is not None else []
 
     return jsonify({
-        "message": "Metrics updated successfully",
-        "device": device.to_dict()
+        "device_id": device_id,
+        "metrics": metrics,
+        "total": len(metrics)
     })
 
 @app.route('/api/v1/devices/<device_id>/command', methods=['POST'])
@@ -163,62 +527,38 @@ def send_command(device_id):
 @app.route('/api/v1/metrics', methods=['GET'])
 def get_network_metrics():
     """Get overall network metrics"""
-    total_devices = len(devices)
-    online_devices = sum(1 for device in devices.values() if device.status == "online")
-    offline_devices = total_devices - online_devices
-
-    avg_battery = 0
-    avg_signal = 0
-
-    if total_devices > 0:
-        online_devices_list = [d for d in devices.values() if d.status == "online"]
-        if online_devices_list:
-            avg_battery = sum(d.battery_level for d in online_devices_list) / len(online_devices_list)
-            avg_signal = sum(d.signal_strength for d in online_devices_list) / len(online_devices_list)
+    stats = fleet_stats.overview()
 
     return jsonify({
         "network_overview": {
-            "total_devices": total_devices,
-            "online_devices": online_devices,
-            "offline_devices": offline_devices,
-            "network_status": "healthy" if online_devices > 0 else "degraded"
-        },
-        "averages": {
-            "battery_level": round(avg_battery, 2),
-            "signal_strength": round(avg_signal, 2)
+            "total_devices": stats["total_devices"],
+            "online_devices": stats["online_devices"],
+            "offline_devices": stats["offline_devices"],
+            "network_status": "healthy" if stats["online_devices"] > 0 else "degraded"
         },
+        "averages": stats["averages"],
+        "timestamp": datetime.utcnow().isoformat()
+    })
+
+@app.route('/api/v1/metrics/breakdown', methods=['GET'])
+def get_network_metrics_breakdown():
+    """Get network metrics per device_type or location"""
+    by = request.args.get('by', 'device_type')
+    if by not in FleetStats.BREAKDOWNS:
+        return jsonify({"error": f"by must be one of: {', '.join(FleetStats.BREAKDOWNS)}"}), 400
+
+    groups = fleet_stats.breakdown(by)
+    return jsonify({
+        "by": by,
+        "groups": groups,
+        "total_groups": len(groups),
         "timestamp": datetime.utcnow().isoformat()
     })
 
 @app.route('/api/v1/alerts', methods=['GET'])
 def get_alerts():
     """Get active alerts for the IoT network"""
-    alerts = []
-
-    # Check for low battery devices
-    for device in devices.values():
-        if device.battery_level < 20:
-            alerts.append({
-                "id": str(uuid.uuid4()),
-                "type": "low_battery",
-                "severity": "warning",
-                "device_id": device.device_id,
-                "device_name": device.name,
-                "message": f"Device {device.name} has low battery ({device.battery_level}%)",
-                "timestamp": datetime.utcnow().isoformat()
-            })
-
-        # Check for offline devices (not seen for more than 5 minutes)
-        if device.status == "offline":
-            alerts.append({
-                "id": str(uuid.uuid4()),
-                "type": "device_offline",
-                "severity": "critical",
-                "device_id": device.device_id,
-                "device_name": device.name,
-                "message": f"Device {device.name} is offline",
-                "timestamp": datetime.utcnow().isoformat()
-            })
+    alerts = alert_engine.alerts()
 
     return jsonify({
         "alerts": alerts,
@@ -231,4 +571,6 @@ if __name__ == '__main__':
     print("❤️  Health Check: http://localhost:5000/health")
     print("📞 Support Contact: bgside2368@gmail.com")
 
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # Development server; serve production through gunicorn (see gunicorn.conf.py)
+    app.run(host=os.environ.get('API_HOST', '0.0.0.0'), port=int(os.environ.get('API_PORT', 5000)),
+            debug=os.environ.get('FLASK_DEBUG') == '1', threaded=True)
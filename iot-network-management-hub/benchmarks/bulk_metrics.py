@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark bulk metrics ingestion against the single-reading endpoint
+
+Sends the same readings as one POST /api/v1/devices/<id>/metrics per
+reading, and as batches to POST /api/v1/devices/metrics, both as a JSON
+list and as NDJSON, and reports readings per second for each. Runs
+against the app in-process through the Flask test client, or against a
+running hub with --url.
+
+    python benchmarks/bulk_metrics.py --devices 1000 --readings 20000 --batch-size 1000
+    python benchmarks/bulk_metrics.py --url http://localhost:5000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestClient:
+    """Flask test client with the same call shape as a requests session"""
+
+    def __init__(self):
+        from app import app
+        self.client = app.test_client()
+
+    def post(self, path, json=None, data=None, headers=None):
+        return self.client.post(path, json=json, data=data, headers=headers)
+
+    def get(self, path):
+        return self.client.get(path)
+
+    def status(self, response):
+        return response.status_code
+
+    def body(self, response):
+        return response.get_json()
+
+
+class HttpClient:
+    def __init__(self, url: str):
+        import requests
+        self.url = url.rstrip('/')
+        self.session = requests.Session()
+
+    def post(self, path, json=None, data=None, headers=None):
+        return self.session.post(self.url + path, json=json, data=data, headers=headers)
+
+    def get(self, path):
+        return self.session.get(self.url + path)
+
+    def status(self, response):
+        return response.status_code
+
+    def body(self, response):
+        return response.json()
+
+
+def make_readings(device_ids: list, n_readings: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "device_id": rng.choice(device_ids),
+            "battery_level": round(rng.uniform(5, 100), 1),
+            "signal_strength": round(rng.uniform(0, 100), 1)
+        }
+        for _ in range(n_readings)
+    ]
+
+
+def run_single(client, readings: list) -> int:
+    accepted = 0
+    for reading in readings:
+        response = client.post(f"/api/v1/devices/{reading['device_id']}/metrics", json=reading)
+        accepted += client.status(response) == 200
+    return accepted
+
+
+def run_bulk(client, readings: list, batch_size: int, ndjson: bool) -> int:
+    accepted = 0
+    for i in range(0, len(readings), batch_size):
+        batch = readings[i:i + batch_size]
+        if ndjson:
+            body = "".join(json.dumps(reading) + "\n" for reading in batch)
+            response = client.post("/api/v1/devices/metrics", data=body,
+                                   headers={"Content-Type": "application/x-ndjson"})
+        else:
+            response = client.post("/api/v1/devices/metrics", json=batch)
+        accepted += client.body(response)["accepted"]
+    return accepted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk metrics ingestion")
+    parser.add_argument("--url", help="Base URL of a running hub, e.g. http://localhost:5000")
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--readings", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    client = HttpClient(args.url) if args.url else TestClient()
+    device_ids = []
+    for i in range(args.devices):
+        response = client.post("/api/v1/devices", json={
+            "name": f"bench-{i}", "device_type": "sensor", "location": f"site-{i % 10}"
+        })
+        device_ids.append(client.body(response)["device"]["device_id"])
+    readings = make_readings(device_ids, args.readings)
+
+    modes = (
+        ("single", lambda: run_single(client, readings)),
+        ("bulk_json", lambda: run_bulk(client, readings, args.batch_size, ndjson=False)),
+        ("bulk_ndjson", lambda: run_bulk(client, readings, args.batch_size, ndjson=True)),
+    )
+    results = {"target": args.url or "in-process", "devices": args.devices,
+               "readings": args.readings, "batch_size": args.batch_size, "runs": []}
+    for mode, run in modes:
+        start = time.perf_counter()
+        accepted = run()
+        elapsed = time.perf_counter() - start
+        result = {
+            "mode": mode,
+            "accepted": accepted,
+            "seconds": round(elapsed, 3),
+            "readings_per_sec": round(accepted / elapsed, 1)
+        }
+        results["runs"].append(result)
+        print(f"{mode:>12}: {accepted} readings in {result['seconds']} s, {result['readings_per_sec']} readings/s")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark per-device metrics history storage
+
+Compares the previous list-of-dicts history (truncated with [-1000:] on
+every write past 1000 entries) with MetricsRingBuffer:
+
+  * fleet: --devices devices (100k by default) with --samples samples each
+  * steady state: --full-devices devices written past capacity, where
+    every append used to copy the whole list
+
+Reports append cost and traced memory for both.
+
+    python benchmarks/metrics_history.py --devices 100000 --samples 10
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import METRICS_HISTORY_SIZE, STATUS_CODES, MetricsRingBuffer
+
+
+def legacy_append(history: dict, device_id: str, now: float, battery: float, signal: float):
+    """The list-based history this benchmark compares against"""
+    entry = {
+        "device_id": device_id,
+        "timestamp": datetime.utcfromtimestamp(now).isoformat(),
+        "battery_level": battery,
+        "signal_strength": signal,
+        "status": "online"
+    }
+    if device_id not in history:
+        history[device_id] = []
+    history[device_id].append(entry)
+    if len(history[device_id]) > METRICS_HISTORY_SIZE:
+        history[device_id] = history[device_id][-METRICS_HISTORY_SIZE:]
+
+
+def ring_append(history: dict, device_id: str, now: float, battery: float, signal: float):
+    buffer = history.get(device_id)
+    if buffer is None:
+        buffer = history[device_id] = MetricsRingBuffer()
+    buffer.append(now, battery, signal, STATUS_CODES["online"])
+
+
+def run(append, n_devices: int, n_samples: int) -> dict:
+    device_ids = [f"device-{i:06d}" for i in range(n_devices)]
+    history = {}
+    now = time.time()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    for sample in range(n_samples):
+        for i, device_id in enumerate(device_ids):
+            append(history, device_id, now + sample, float((i + sample) % 100), float((i * 7 + sample) % 100))
+    elapsed = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    appends = n_devices * n_samples
+    return {
+        "devices": n_devices,
+        "samples_per_device": n_samples,
+        "append_us": round(elapsed / appends * 1e6, 3),
+        "appends_per_sec": round(appends / elapsed, 1),
+        "memory_mb": round(memory / 2**20, 1),
+        "bytes_per_device": round(memory / n_devices),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-device metrics history storage")
+    parser.add_argument("--devices", type=int, default=100000)
+    parser.add_argument("--samples", type=int, default=10)
+    parser.add_argument("--full-devices", type=int, default=100)
+    parser.add_argument("--full-samples", type=int, default=2 * METRICS_HISTORY_SIZE)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, append in (("list", legacy_append), ("ring_buffer", ring_append)):
+        results[name] = {
+            "fleet": run(append, args.devices, args.samples),
+            "steady_state": run(append, args.full_devices, args.full_samples),
+        }
+        for phase, result in results[name].items():
+            print(f"{name:>12} {phase:>12}: {result['devices']} devices x {result['samples_per_device']} samples, "
+                  f"{result['append_us']} us/append, {result['memory_mb']} MB "
+                  f"({result['bytes_per_device']} bytes/device)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
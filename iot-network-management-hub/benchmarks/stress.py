@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+"""
+Concurrency stress test of the device store
+
+Writer threads register devices and post readings to them, through both
+the single-reading and the bulk endpoint, while reader threads poll the
+device list, network metrics and alerts. Afterwards it checks through
+the API that device counts, fleet aggregates, breakdowns, alerts and
+every device's history agree with what the writers sent. Exits with
+status 1 on any inconsistency or failed request.
+
+In-process runs use a tiny thread switch interval to provoke races.
+Against a running hub (--url) the hub must start empty.
+
+    python benchmarks/stress.py --writers 16 --devices 400 --readings 20000
+    python benchmarks/stress.py --url http://localhost:5000
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bulk_metrics import HttpClient, TestClient
+
+
+def writer(client, n: int, args, device_ids: list, sent: Counter, failures: list, lock: threading.Lock):
+    rng = random.Random(n)
+    own = []
+    for i in range(args.devices // args.writers):
+        response = client.post("/api/v1/devices", json={
+            "name": f"stress-{n}-{i}", "device_type": f"type-{i % 3}", "location": f"site-{(n + i) % 5}"
+        })
+        if client.status(response) != 201:
+            failures.append(("register", client.status(response)))
+            continue
+        own.append(client.body(response)["device"]["device_id"])
+    with lock:
+        device_ids.extend(own)
+
+    counts = Counter()
+    remaining = args.readings // args.writers
+    while remaining > 0:
+        batch = [
+            {
+                "device_id": rng.choice(device_ids),
+                "battery_level": rng.randint(0, 100),
+                "signal_strength": rng.randint(0, 100)
+            }
+            for _ in range(min(remaining, rng.choice((1, args.batch_size))))
+        ]
+        remaining -= len(batch)
+        if len(batch) == 1:
+            response = client.post(f"/api/v1/devices/{batch[0]['device_id']}/metrics", json=batch[0])
+            ok = client.status(response) == 200
+        else:
+            response = client.post("/api/v1/devices/metrics", json=batch)
+            ok = client.status(response) == 200 and client.body(response)["accepted"] == len(batch)
+        if not ok:
+            failures.append(("metrics", client.status(response)))
+            continue
+        counts.update(reading["device_id"] for reading in batch)
+    with lock:
+        sent.update(counts)
+
+
+def reader(client, stop: threading.Event, failures: list):
+    paths = ["/api/v1/devices", "/api/v1/metrics", "/api/v1/metrics/breakdown?by=location", "/api/v1/alerts"]
+    while not stop.is_set():
+        for path in paths:
+            response = client.get(path)
+            if client.status(response) != 200:
+                failures.append((path, client.status(response)))
+
+
+def check(client, sent: Counter, n_devices: int) -> list:
+    problems = []
+    device_list = client.body(client.get("/api/v1/devices"))["devices"]
+    devices = {device["device_id"]: device for device in device_list}
+    online = [device for device in device_list if device["status"] == "online"]
+
+    metrics = client.body(client.get("/api/v1/metrics"))
+    overview = metrics["network_overview"]
+    if overview["total_devices"] != len(devices) or len(devices) != n_devices:
+        problems.append(f"total_devices {overview['total_devices']}, listed {len(devices)}, registered {n_devices}")
+    if overview["online_devices"] != len(online):
+        problems.append(f"online_devices {overview['online_devices']}, listed online {len(online)}")
+    for key in ("battery_level", "signal_strength"):
+        expected = sum(device[key] for device in online) / len(online) if online else 0
+        if abs(metrics["averages"][key] - expected) > 0.01:
+            problems.append(f"average {key} {metrics['averages'][key]}, expected {expected:.2f}")
+
+    for by in ("device_type", "location"):
+        groups = client.body(client.get(f"/api/v1/metrics/breakdown?by={by}"))["groups"]
+        expected = Counter(device[by] for device in device_list)
+        if {key: group["total_devices"] for key, group in groups.items()} != dict(expected):
+            problems.append(f"breakdown by {by} does not match the device list")
+
+    alerts = client.body(client.get("/api/v1/alerts"))["alerts"]
+    for alert_type, condition in (("low_battery", lambda device: device["battery_level"] < 20),
+                                  ("device_offline", lambda device: device["status"] == "offline")):
+        alerted = sorted(alert["device_id"] for alert in alerts if alert["type"] == alert_type)
+        if alerted != sorted(device_id for device_id, device in devices.items() if condition(device)):
+            problems.append(f"{alert_type} alerts do not match device state")
+
+    for device_id, device in devices.items():
+        history = client.body(client.get(f"/api/v1/devices/{device_id}/metrics"))["metrics"]
+        if len(history) != min(sent[device_id], 1000):
+            problems.append(f"{device_id}: {len(history)} samples in history, {sent[device_id]} sent")
+        elif history and history[-1]["battery_level"] != device["battery_level"]:
+            problems.append(f"{device_id}: last sample does not match the device")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrency stress test of the device store")
+    parser.add_argument("--url", help="Base URL of a running hub, e.g. http://localhost:5000")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--devices", type=int, default=400, help="Devices registered, split across writers")
+    parser.add_argument("--readings", type=int, default=20000, help="Readings sent, split across writers")
+    parser.add_argument("--batch-size", type=int, default=50, help="Readings per bulk request")
+    parser.add_argument("--switch-interval", type=float, default=1e-5,
+                        help="sys.setswitchinterval for in-process runs")
+    args = parser.parse_args()
+
+    if args.url:
+        make_client = partial(HttpClient, args.url)
+    else:
+        sys.setswitchinterval(args.switch_interval)
+        make_client = TestClient
+
+    device_ids = []
+    sent = Counter()
+    failures = []
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    readers = [threading.Thread(target=reader, args=(make_client(), stop, failures)) for _ in range(args.readers)]
+    writers = [threading.Thread(target=writer, args=(make_client(), n, args, device_ids, sent, failures, lock))
+               for n in range(args.writers)]
+    start = time.perf_counter()
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    sys.setswitchinterval(0.005)
+    problems = [f"{path}: status {status}" for path, status in failures[:20]]
+    problems += check(make_client(), sent, len(device_ids))
+    print(f"{args.writers} writers, {args.readers} readers: {len(device_ids)} devices, "
+          f"{sum(sent.values())} readings in {elapsed:.2f} s, {len(failures)} failed requests")
+    for problem in problems[:50]:
+        print(f"  {problem}")
+    print("consistent" if not problems else f"{len(problems)} problems")
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -129,7 +129,7 @@ python3 -c "import app; print('✅ Application imports successfully')"
 
 # Start the IoT Network Management Hub
 print_status "Starting IoT Network Management Hub..."
-nohup python3 app.py > logs/iot_hub.log 2>&1 &
+nohup gunicorn -c gunicorn.conf.py wsgi:app > logs/iot_hub.log 2>&1 &
 APP_PID=$!
 
 # Wait for application to start
@@ -164,7 +164,7 @@ print_status ""
 print_status "🔧 Useful commands:"
 print_status "   Stop application: kill $APP_PID"
 print_status "   View logs: tail -f logs/iot_hub.log"
-print_status "   Restart: python3 app.py"
+print_status "   Restart: gunicorn -c gunicorn.conf.py wsgi:app"
 print_status "   Stop services: docker stop iot-mongodb iot-redis iot-mqtt"
 print_status "   Remove services: docker rm iot-mongodb iot-redis iot-mqtt"
 
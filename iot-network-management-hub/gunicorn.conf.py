@@ -0,0 +1,20 @@
+"""
+Gunicorn configuration for serving the IoT Network Management Hub
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+import os
+
+bind = f"{os.environ.get('API_HOST', '0.0.0.0')}:{os.environ.get('API_PORT', '5000')}"
+
+# Devices, metrics and alerts live in process memory, so a single worker
+# serves all requests from a pool of threads
+workers = 1
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", "16"))
+
+timeout = 30
+keepalive = 5
+accesslog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
@@ -0,0 +1,35 @@
+import pytest
+
+import app as hub
+
+
+@pytest.fixture
+def client():
+    return hub.app.test_client()
+
+
+def register(client):
+    response = client.post('/api/v1/devices', json={"name": "sensor", "device_type": "sensor", "location": "lab"})
+    return response.get_json()["device"]["device_id"]
+
+
+@pytest.mark.parametrize("body", [{"battery_level": "50"}, {"signal_strength": None}, None, [1, 2]])
+def test_invalid_metrics_leave_device_unchanged(client, body):
+    device_id = register(client)
+    overview = client.get('/api/v1/metrics').get_json()["network_overview"]
+
+    response = client.post(f'/api/v1/devices/{device_id}/metrics', json=body)
+    assert response.status_code == 400
+
+    device = client.get(f'/api/v1/devices/{device_id}').get_json()
+    assert device["status"] == "offline"
+    assert client.get('/api/v1/metrics').get_json()["network_overview"] == overview
+    assert not client.get(f'/api/v1/devices/{device_id}/metrics').get_json()["metrics"]
+
+    # A valid reading afterwards is counted as usual
+    client.post(f'/api/v1/devices/{device_id}/metrics', json={"battery_level": 50})
+    after = client.get('/api/v1/metrics').get_json()["network_overview"]
+    assert after["online_devices"] == overview["online_devices"] + 1
+    assert after["offline_devices"] == overview["offline_devices"] - 1
+    alerts = client.get('/api/v1/alerts').get_json()["alerts"]
+    assert not [alert for alert in alerts if alert["device_id"] == device_id]
@@ -0,0 +1,9 @@
+#!/usr/bin/env python3
+
+"""
+WSGI entry point of the IoT Network Management Hub
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import app